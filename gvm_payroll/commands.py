@@ -0,0 +1,126 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-payroll-ledger")
+@click.option("--company", help="Only rebuild the ledger rows of this company")
+@click.option("--batch-size", type=int, default=500, help="Salary Slips posted per batch")
+@pass_context
+def rebuild_payroll_ledger(context, company=None, batch_size=500):
+	"""Recompute the Payroll Monthly Ledger from submitted Salary Slips"""
+	import frappe
+
+	from gvm_payroll.gvm_payroll.utils.payroll_ledger import rebuild_payroll_ledger
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		slip_count = rebuild_payroll_ledger(company=company, batch_size=batch_size)
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Posted {slip_count} Salary Slips to the Payroll Monthly Ledger")
+
+
+@click.command("run-annual-increment")
+@click.option("--company", required=True, help="Company whose employees are incremented")
+@click.option("--date", "increment_date", required=True, help="Increment date (YYYY-MM-DD)")
+@click.option("--dry-run", is_flag=True, help="Only list the planned increments")
+@click.option("--batch-size", type=int, help="Salary Structure Assignments created per batch")
+@pass_context
+def run_annual_increment(context, company, increment_date, dry_run=False, batch_size=None):
+	"""Move every employee due on an increment date one cell up their Pay Matrix level"""
+	import frappe
+
+	from gvm_payroll.gvm_payroll.api.annual_increment import validate_increment_date
+	from gvm_payroll.gvm_payroll.utils.annual_increment import apply_increment_plan, get_increment_plan
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		increment_date = validate_increment_date(company, increment_date)
+		rows, skipped = get_increment_plan(company, increment_date)
+		for row in skipped:
+			click.echo(f"Skipped {row['employee']}: {row['reason']}")
+
+		if dry_run:
+			for row in rows:
+				click.echo(f"{row.employee} level {row.level}: {row.current_basic} -> {row.new_basic}")
+			click.echo(f"{len(rows)} employees would be incremented")
+			return
+
+		result = apply_increment_plan(company, increment_date, rows, batch_size=batch_size)
+		for row in result.failed:
+			click.echo(f"Failed {row['employee']}: {row['reason']}")
+		for stats in result.batches:
+			click.echo(f"Batch {stats['chunk']}: {stats['rows']} employees in {stats['seconds']}s")
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Created {len(result.created)} Salary Structure Assignments")
+
+
+@click.command("make-bank-payment-file")
+@click.option("--company", required=True, help="Company paying the salaries")
+@click.option("--bank-name", required=True, help="Bank Name on the Salary Slips")
+@click.option("--from-date", required=True, help="Start of the pay period (YYYY-MM-DD)")
+@click.option("--to-date", required=True, help="End of the pay period (YYYY-MM-DD)")
+@click.option("--payment-type", type=click.Choice(["NEFT", "RTGS"]), help="Default: chosen per payment by amount")
+@click.option("--value-date", help="Value date of the transfers (YYYY-MM-DD), default today")
+@click.option("--debit-account", help="Company account debited for the batch")
+@click.option("--output", required=True, type=click.Path(dir_okay=False), help="File to write")
+@pass_context
+def make_bank_payment_file(context, company, bank_name, from_date, to_date, output, **options):
+	"""Write the NEFT/RTGS bulk upload file of the Salary Slips paid through a bank"""
+	import frappe
+
+	from gvm_payroll.gvm_payroll.utils.bank_payment_file import write_bank_payment_file
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		filters = frappe._dict(
+			company=company, bank_name=bank_name, from_date=from_date, to_date=to_date, **options
+		)
+		with open(output, "wb") as f:
+			batch = write_bank_payment_file(f, filters)
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Wrote {batch.record_count} payments totalling {batch.total_amount:.2f} to {output}")
+	click.echo(f"Hash total {batch.hash_total}, SHA-256 {batch.checksum}")
+
+
+@click.command("check-report-indexes")
+@click.option("--company", help="Company whose slips are queried, default the site's default company")
+@click.option("--from-date", help="Start of the period (YYYY-MM-DD), default the start of last month")
+@click.option("--to-date", help="End of the period (YYYY-MM-DD), default the end of that month")
+@pass_context
+def check_report_indexes(context, company=None, from_date=None, to_date=None):
+	"""EXPLAIN the payroll report queries and check they use the report indexes"""
+	import frappe
+
+	from gvm_payroll.gvm_payroll.utils.report_indexes import check_report_indexes
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		results = check_report_indexes(company, from_date, to_date)
+	finally:
+		frappe.destroy()
+
+	for result in results:
+		status = "OK" if result.ok else "MISSING"
+		click.echo(f"{status:8} {result.query} on {result.doctype}: uses {result.used_index or 'no index'}")
+
+	if not all(result.ok for result in results):
+		click.echo("Run bench migrate to add the indexes; on small tables the optimizer may still prefer a scan")
+		raise SystemExit(1)
+
+
+commands = [rebuild_payroll_ledger, run_annual_increment, make_bank_payment_file, check_report_indexes]
@@ -0,0 +1,136 @@
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate
+from frappe.utils.background_jobs import is_job_enqueued
+
+from gvm_payroll.gvm_payroll.doctype.ind_payroll_setting.ind_payroll_setting import get_increment_dates_list
+from gvm_payroll.gvm_payroll.utils.annual_increment import apply_increment_plan, get_increment_plan
+
+INCREMENT_JOB_TIMEOUT = 7200
+
+
+@frappe.whitelist()
+def run_annual_increment(
+	company: str, increment_date: str, dry_run: int = 1, batch_size: int | None = None
+):
+	"""
+	Annual increment of every due employee of the company on an increment date
+	from IND Payroll Setting. With dry_run the planned increments are returned
+	without creating anything; otherwise the Salary Structure Assignments are
+	created by a background job whose progress is published to the user and
+	kept in a checkpoint readable through get_annual_increment_status.
+	"""
+	frappe.has_permission("Salary Structure Assignment", "read", throw=True)
+	increment_date = validate_increment_date(company, increment_date)
+
+	if cint(dry_run):
+		rows, skipped = get_increment_plan(company, increment_date)
+		return {"dry_run": True, "rows": rows, "skipped": skipped}
+
+	frappe.has_permission("Salary Structure Assignment", "submit", throw=True)
+
+	job_id = get_increment_job_id(company, increment_date)
+	if is_job_enqueued(job_id):
+		frappe.throw(
+			_("An increment run is already in progress for {0} on {1}").format(company, increment_date)
+		)
+
+	set_increment_job_status(company, increment_date, status="Queued")
+	frappe.enqueue(
+		"gvm_payroll.gvm_payroll.api.annual_increment.run_annual_increment_job",
+		queue="long",
+		timeout=INCREMENT_JOB_TIMEOUT,
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		company=company,
+		increment_date=str(increment_date),
+		batch_size=batch_size,
+	)
+	return {"queued": True, "job_id": job_id}
+
+
+@frappe.whitelist()
+def get_annual_increment_status(company: str, increment_date: str):
+	"""Last checkpoint of the increment run of the company on the date."""
+	frappe.has_permission("Salary Structure Assignment", "read", throw=True)
+	return frappe.cache().get_value(get_increment_job_key(company, getdate(increment_date)))
+
+
+def run_annual_increment_job(company, increment_date, batch_size=None):
+	"""Background job: plan and apply the increment run, checkpointing after every batch."""
+	increment_date = getdate(increment_date)
+	set_increment_job_status(company, increment_date, status="Running")
+	try:
+		rows, skipped = get_increment_plan(company, increment_date)
+		progress = {"processed": 0, "total": len(rows), "skipped": len(skipped)}
+		set_increment_job_status(company, increment_date, **progress)
+
+		def checkpoint(stats):
+			progress["processed"] += stats["rows"]
+			set_increment_job_status(company, increment_date, last_batch=stats, **progress)
+			publish_increment_progress(company, increment_date)
+
+		result = apply_increment_plan(company, increment_date, rows, batch_size=batch_size, on_batch=checkpoint)
+	except Exception as e:
+		frappe.db.rollback()
+		set_increment_job_status(company, increment_date, status="Failed", error=str(e))
+		frappe.log_error(title=f"Annual increment failed for {company} on {increment_date}")
+		publish_increment_progress(company, increment_date)
+		raise
+
+	set_increment_job_status(
+		company,
+		increment_date,
+		status="Completed",
+		created=len(result.created),
+		failed=result.failed,
+		batches=result.batches,
+	)
+	publish_increment_progress(company, increment_date)
+
+
+def validate_increment_date(company, increment_date):
+	"""The increment date as a date, if it is one of the company's increment dates."""
+	if not company or not increment_date:
+		frappe.throw(_("Company and Increment Date are required"))
+
+	increment_date = getdate(increment_date)
+	allowed = {(getdate(date).month, getdate(date).day) for date in get_increment_dates_list(company)}
+	if (increment_date.month, increment_date.day) not in allowed:
+		frappe.throw(
+			_("{0} is not an increment date in IND Payroll Setting for {1}").format(
+				frappe.format(increment_date, "Date"), company
+			)
+		)
+	return increment_date
+
+
+def get_increment_job_id(company, increment_date):
+	return f"annual_increment::{company}::{increment_date}"
+
+
+def get_increment_job_key(company, increment_date):
+	return f"gvm_payroll:annual_increment_job:{company}:{increment_date}"
+
+
+def set_increment_job_status(company, increment_date, **status):
+	"""Merge ``status`` into the run checkpoint kept in the site cache."""
+	key = get_increment_job_key(company, increment_date)
+	checkpoint = frappe.cache().get_value(key) or {}
+	if status.get("status") == "Queued":
+		checkpoint = {}
+	checkpoint.update(status)
+	frappe.cache().set_value(key, checkpoint)
+
+
+def publish_increment_progress(company, increment_date):
+	frappe.publish_realtime(
+		"annual_increment_progress",
+		{
+			"company": company,
+			"increment_date": str(increment_date),
+			**(frappe.cache().get_value(get_increment_job_key(company, increment_date)) or {}),
+		},
+		user=frappe.session.user,
+	)
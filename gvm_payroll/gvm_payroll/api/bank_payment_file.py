@@ -0,0 +1,36 @@
+import tempfile
+
+import frappe
+from frappe import _
+
+from gvm_payroll.gvm_payroll.api.report_export import SPOOL_SIZE, get_file_response
+from gvm_payroll.gvm_payroll.utils.bank_payment_file import (
+	get_bank_payment_layout,
+	write_bank_payment_file,
+)
+
+
+@frappe.whitelist()
+def download_bank_payment_file(filters: str | dict):
+	"""
+	NEFT/RTGS bulk upload file of the salary slips paid through one bank, in
+	the layout configured for its bank name. The batch-control totals and the
+	SHA-256 of the file are sent in response headers so they can be keyed into
+	the bank portal alongside the upload.
+	"""
+	if not frappe.get_doc("Report", "Bank Statement").is_permitted():
+		frappe.throw(_("You don't have access to Report: {0}").format("Bank Statement"), frappe.PermissionError)
+
+	filters = frappe._dict(frappe.parse_json(filters))
+	layout = get_bank_payment_layout(filters.get("bank_name"))
+
+	output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+	batch = write_bank_payment_file(output, filters, layout)
+
+	filename = f"{frappe.scrub(filters.bank_name)}_{batch.batch_reference}.{layout.extension}"
+	response = get_file_response(output, filename, layout.mimetype)
+	response.headers["X-Record-Count"] = str(batch.record_count)
+	response.headers["X-Total-Amount"] = f"{batch.total_amount:.2f}"
+	response.headers["X-Hash-Total"] = str(batch.hash_total)
+	response.headers["X-Checksum-SHA256"] = batch.checksum
+	return response
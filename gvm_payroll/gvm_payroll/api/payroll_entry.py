@@ -1,14 +1,98 @@
 import frappe
 from frappe.utils import getdate, nowdate, date_diff, add_days
+from frappe.utils.background_jobs import is_job_enqueued
+
+from gvm_payroll.gvm_payroll.utils.additional_salary_batch import (
+	get_existing_additional_salaries,
+	get_existing_drafts,
+	insert_additional_salaries,
+	submit_additional_salaries,
+	validate_additional_salary_rows,
+)
+
+QUARTER_JOB_TIMEOUT = 3600
 
 
 @frappe.whitelist()
-def create_quarter_additional_salaries(payroll_entry: str):
+def create_quarter_additional_salaries(
+	payroll_entry: str, batch_size: int | None = None, commit_interval: int | None = None
+):
 	"""
-	Create Additional Salary records for employees in the given Payroll Entry
-	using their assigned quarter charges. The payroll_date is set to the midpoint
-	between start_date and end_date (inclusive).
+	Queue creation of Additional Salary records for employees in the given
+	Payroll Entry using their assigned quarter charges. Progress is published
+	to the Payroll Entry form and kept in a checkpoint readable through
+	get_quarter_job_status. Re-running after a failure resumes: charges that
+	already have a submitted Additional Salary are skipped and drafts left
+	behind are submitted again.
+	"""
+	pe = get_quarter_payroll_entry(payroll_entry)
+
+	job_id = get_quarter_job_id(pe.name)
+	if is_job_enqueued(job_id):
+		frappe.throw("Quarter charges are already being attached for this Payroll Entry.")
+
+	set_quarter_job_status(pe.name, status="Queued")
+	frappe.enqueue(
+		"gvm_payroll.gvm_payroll.api.payroll_entry.run_quarter_additional_salaries",
+		queue="long",
+		timeout=QUARTER_JOB_TIMEOUT,
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		payroll_entry=pe.name,
+		batch_size=batch_size,
+		commit_interval=commit_interval,
+	)
+	return {"queued": True, "job_id": job_id}
+
+
+@frappe.whitelist()
+def get_quarter_job_status(payroll_entry: str):
+	"""Last checkpoint of the quarter charges job for the Payroll Entry.
+
+	A job still marked queued or running that is no longer in the queue was
+	killed before it could record its failure, so it is reported as failed.
 	"""
+	frappe.has_permission("Payroll Entry", "read", payroll_entry, throw=True)
+	checkpoint = frappe.cache().get_value(get_quarter_job_key(payroll_entry))
+	if (
+		checkpoint
+		and checkpoint.get("status") in ("Queued", "Running")
+		and not is_job_enqueued(get_quarter_job_id(payroll_entry))
+	):
+		checkpoint.update(status="Failed", error="The job stopped before it finished")
+	return checkpoint
+
+
+def run_quarter_additional_salaries(payroll_entry, batch_size=None, commit_interval=None):
+	"""Background job: attach quarter charges and publish the outcome to the Payroll Entry form."""
+	set_quarter_job_status(payroll_entry, status="Running")
+	try:
+		result = make_quarter_additional_salaries(
+			payroll_entry, batch_size=batch_size, commit_interval=commit_interval
+		)
+	except Exception as e:
+		frappe.db.rollback()
+		set_quarter_job_status(payroll_entry, status="Failed", error=str(e))
+		frappe.log_error(title=f"Quarter Additional Salaries failed for {payroll_entry}")
+		publish_quarter_progress(payroll_entry)
+		raise
+
+	set_quarter_job_status(
+		payroll_entry,
+		status="Completed",
+		created=len(result["created"]),
+		skipped=len(result["skipped"]),
+	)
+	frappe.publish_realtime(
+		"quarter_additional_salaries_done",
+		{**result, "payroll_entry": payroll_entry},
+		doctype="Payroll Entry",
+		docname=payroll_entry,
+	)
+
+
+def get_quarter_payroll_entry(payroll_entry):
 	if not payroll_entry:
 		frappe.throw("Payroll Entry is required")
 
@@ -28,63 +112,166 @@ def create_quarter_additional_salaries(payroll_entry: str):
 	if end < start:
 		frappe.throw("End Date cannot be before Start Date.")
 
+	return pe
+
+
+def make_quarter_additional_salaries(payroll_entry, batch_size=None, commit_interval=None):
+	"""
+	Create Additional Salary records for employees in the given Payroll Entry
+	using their assigned quarter charges. The payroll_date is set to the midpoint
+	between start_date and end_date (inclusive). Rows are validated together,
+	inserted in chunks of batch_size and submitted one by one through the
+	Additional Salary controller, committing every commit_interval chunks.
+	Rows the controller rejects stay in draft and are reported as skipped;
+	the next run submits those drafts again instead of creating new ones.
+	"""
+	pe = get_quarter_payroll_entry(payroll_entry)
+
+	start = getdate(pe.start_date)
+	end = getdate(pe.end_date)
 	diff = date_diff(end, start)
 	midpoint = add_days(start, diff // 2)
 	payroll_date = midpoint or getdate(nowdate())
 
-	created = []
+	rows = []
 	skipped = []
 
-	for row in pe.employees:
-		if not row.employee:
-			continue
+	# Everything the loop needs is prefetched: one query each for the employees'
+	# quarters, the quarters' charges and the Additional Salaries already made.
+	employees = [row.employee for row in pe.employees if row.employee]
+	employee_quarters = get_employee_quarters(employees)
+	quarter_charges = get_quarter_charges({quarter for quarter in employee_quarters.values() if quarter})
+	existing = get_existing_additional_salaries("Payroll Entry", pe.name)
+	drafts = get_existing_drafts("Payroll Entry", pe.name)
+	resubmit = {}
 
-		emp = frappe.get_doc("Employee", row.employee)
-		quarter = emp.get("custom_quarter")
+	for employee in employees:
+		quarter = employee_quarters.get(employee)
 		if not quarter:
-			skipped.append({"employee": emp.name, "reason": "No quarter set"})
+			skipped.append({"employee": employee, "reason": "No quarter set"})
 			continue
 
-		q_doc = frappe.get_doc("Quarter", quarter)
-		if not q_doc.charges:
-			skipped.append({"employee": emp.name, "reason": "No charges in quarter"})
+		charges = quarter_charges.get(quarter)
+		if not charges:
+			skipped.append({"employee": employee, "reason": "No charges in quarter"})
 			continue
 
-		for charge in q_doc.charges:
-			if not charge.charge or charge.amount is None:
+		for charge, amount in charges:
+			if (employee, charge) in existing:
+				# A draft left by an earlier run whose submit failed or never ran
+				draft = drafts.pop((employee, charge), None)
+				if draft:
+					resubmit[draft] = {"employee": employee, "salary_component": charge}
+				else:
+					skipped.append({"employee": employee, "component": charge, "reason": "Already exists"})
 				continue
 
-			exists = frappe.db.exists(
-				"Additional Salary",
-				{
-					"ref_doctype": "Payroll Entry",
-					"ref_docname": pe.name,
-					"employee": emp.name,
-					"salary_component": charge.charge,
-					"docstatus": ["!=", 2],
-				},
-			)
-			if exists:
-				skipped.append({"employee": emp.name, "component": charge.charge, "reason": "Already exists"})
-				continue
+			rows.append({"employee": employee, "salary_component": charge, "amount": amount})
+			existing.add((employee, charge))
+
+	rows, errors = validate_additional_salary_rows(rows, pe.company, payroll_date)
+	skipped.extend(
+		{"employee": row["employee"], "component": row["salary_component"], "reason": row["reason"]}
+		for row in errors
+	)
 
-			additional = frappe.get_doc(
-				{
-					"doctype": "Additional Salary",
-					"employee": emp.name,
-					"salary_component": charge.charge,
-					"amount": charge.amount,
-					"company": pe.company,
-					"payroll_date": payroll_date,
-					"overwrite_salary_structure_amount": 1,
-					"ref_doctype": "Payroll Entry",
-					"ref_docname": pe.name,
-				}
-			)
-			additional.insert(ignore_permissions=True)
-			additional.submit()
-			created.append(additional.name)
+	progress = {"processed": 0, "total": len(rows) + len(resubmit)}
+
+	def checkpoint(stats):
+		progress["processed"] += stats["rows"]
+		set_quarter_job_status(pe.name, status="Running", **progress)
+		publish_quarter_progress(pe.name)
+
+	result = insert_additional_salaries(
+		rows,
+		pe.company,
+		payroll_date,
+		"Payroll Entry",
+		pe.name,
+		submit=True,
+		batch_size=batch_size,
+		commit_interval=commit_interval,
+		on_chunk=checkpoint,
+	)
+	resubmitted = submit_additional_salaries(
+		list(resubmit), batch_size=batch_size, commit_interval=commit_interval, on_chunk=checkpoint
+	)
+
+	rows_by_name = dict(zip(result.created, rows, strict=True))
+	rows_by_name.update(resubmit)
+	skipped.extend(
+		{
+			"employee": rows_by_name[row["name"]]["employee"],
+			"component": rows_by_name[row["name"]]["salary_component"],
+			"reason": row["reason"],
+		}
+		for row in result.failed + resubmitted.failed
+	)
 
 	frappe.db.commit()
-	return {"created": created, "skipped": skipped, "payroll_date": payroll_date}
+	return {
+		"created": result.submitted + resubmitted.submitted,
+		"skipped": skipped,
+		"payroll_date": payroll_date,
+		"chunks": result.chunks + resubmitted.chunks,
+	}
+
+
+def get_employee_quarters(employees):
+	"""``{employee: custom_quarter}`` for ``employees`` in one query."""
+	if not employees:
+		return {}
+
+	return dict(
+		frappe.get_all(
+			"Employee",
+			filters={"name": ["in", list(set(employees))]},
+			fields=["name", "custom_quarter"],
+			as_list=True,
+		)
+	)
+
+
+def get_quarter_charges(quarters):
+	"""``{quarter: [(charge, amount)]}`` in row order, skipping incomplete charge rows."""
+	if not quarters:
+		return {}
+
+	charges = {}
+	for quarter, charge, amount in frappe.get_all(
+		"Quarter Charges",
+		filters={"parenttype": "Quarter", "parent": ["in", list(quarters)]},
+		fields=["parent", "charge", "amount"],
+		order_by="parent, idx",
+		as_list=True,
+	):
+		if charge and amount is not None:
+			charges.setdefault(quarter, []).append((charge, amount))
+	return charges
+
+
+def get_quarter_job_id(payroll_entry):
+	return f"quarter_additional_salaries::{payroll_entry}"
+
+
+def get_quarter_job_key(payroll_entry):
+	return f"gvm_payroll:quarter_job:{payroll_entry}"
+
+
+def set_quarter_job_status(payroll_entry, **status):
+	"""Merge ``status`` into the job checkpoint kept in the site cache."""
+	key = get_quarter_job_key(payroll_entry)
+	checkpoint = frappe.cache().get_value(key) or {}
+	if status.get("status") == "Queued":
+		checkpoint = {}
+	checkpoint.update(status)
+	frappe.cache().set_value(key, checkpoint)
+
 
+def publish_quarter_progress(payroll_entry):
+	frappe.publish_realtime(
+		"quarter_additional_salaries_progress",
+		{"payroll_entry": payroll_entry, **(frappe.cache().get_value(get_quarter_job_key(payroll_entry)) or {})},
+		doctype="Payroll Entry",
+		docname=payroll_entry,
+	)
@@ -0,0 +1,105 @@
+"""Streaming CSV/XLSX export for the gvm_payroll reports.
+
+The standard report export first builds the complete ``data`` list and then
+converts it, which for a year of slips is the largest memory spike on the
+site. Exportable reports expose ``get_export(filters, page_size)`` returning
+their columns and a row generator that walks the slips page by page; this
+module writes those rows as they come into a CSV writer or a write-only
+openpyxl workbook backed by a temporary file, so memory stays flat however
+many rows there are.
+
+The file is streamed back from disk. It cannot be streamed while the rows are
+still being produced because the database connection is released when the
+request handler returns, before the response body is sent.
+"""
+
+import csv
+import io
+import tempfile
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+EXPORTABLE_REPORTS = {
+	"Salary Summary": "gvm_payroll.gvm_payroll.report.salary_summary.salary_summary.get_export",
+	"Deduction Summary": "gvm_payroll.gvm_payroll.report.deduction_summary.deduction_summary.get_export",
+	"Bank Payment Sheet": "gvm_payroll.gvm_payroll.report.bank_payment_sheet.bank_payment_sheet.get_export",
+}
+
+FILE_FORMATS = {
+	"CSV": ("csv", "text/csv; charset=utf-8"),
+	"Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Spool to disk past this size; smaller exports stay in memory
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+@frappe.whitelist()
+def export_report(report_name: str, filters: str | dict | None = None, file_format: str = "CSV"):
+	"""Download a gvm_payroll report as CSV or XLSX, streaming its rows into the file."""
+	if report_name not in EXPORTABLE_REPORTS:
+		frappe.throw(_("Report {0} cannot be exported this way").format(report_name))
+	if file_format not in FILE_FORMATS:
+		frappe.throw(_("Unsupported export format {0}").format(file_format))
+
+	if not frappe.get_doc("Report", report_name).is_permitted():
+		frappe.throw(_("You don't have access to Report: {0}").format(report_name), frappe.PermissionError)
+
+	filters = frappe._dict(frappe.parse_json(filters) if filters else {})
+	if not filters.get("company"):
+		frappe.throw(_("Company is required"))
+
+	columns, rows = frappe.get_attr(EXPORTABLE_REPORTS[report_name])(
+		filters, page_size=cint(frappe.conf.get("gvm_payroll_export_page_size")) or None
+	)
+	columns = [column for column in columns if not column.get("hidden")]
+
+	output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+	if file_format == "CSV":
+		write_csv(output, columns, rows)
+	else:
+		write_xlsx(output, columns, rows, report_name)
+
+	extension, mimetype = FILE_FORMATS[file_format]
+	filename = f"{frappe.scrub(report_name)}_{now_datetime().strftime('%Y%m%d_%H%M%S')}.{extension}"
+	return get_file_response(output, filename, mimetype)
+
+
+def get_file_response(output, filename, mimetype):
+	"""Attachment response streaming the file ``output`` from its start."""
+	output.seek(0)
+	response = Response(wrap_file(frappe.local.request.environ, output), mimetype=mimetype, direct_passthrough=True)
+	response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+	return response
+
+
+def write_csv(output, columns, rows):
+	text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+	writer = csv.writer(text)
+	writer.writerow([column.get("label") for column in columns])
+	for row in rows:
+		writer.writerow([get_cell(row, column) for column in columns])
+	text.flush()
+	# Hand the buffer back without closing it along with the wrapper
+	text.detach()
+
+
+def write_xlsx(output, columns, rows, sheet_name):
+	from openpyxl import Workbook
+
+	# Write-only workbooks keep no rows in memory once they are appended
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(title=sheet_name[:31])
+	sheet.append([column.get("label") for column in columns])
+	for row in rows:
+		sheet.append([get_cell(row, column) for column in columns])
+	workbook.save(output)
+
+
+def get_cell(row, column):
+	value = row.get(column.get("fieldname"))
+	return "" if value is None else value
@@ -0,0 +1,37 @@
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from gvm_payroll.gvm_payroll.report.annual_statement.annual_statement import get_statement_amounts
+from gvm_payroll.gvm_payroll.utils.tax_projection import HEAD_INDEX, project_annual_tax
+
+
+@frappe.whitelist()
+def get_what_if_tax_projection(
+	company: str, fiscal_year: str, employee: str | None = None, adjustments: str | dict | None = None
+):
+	"""
+	Annual Statement tax projection for a company (or one employee) with the
+	monthly amounts of some heads scaled, e.g. ``{"basic": 1.04, "da": 1.1}``
+	for a pay revision. Returns one row per employee with the statement's
+	summary fields.
+	"""
+	frappe.has_permission("Salary Slip", "read", throw=True)
+
+	adjustments = frappe.parse_json(adjustments) if adjustments else {}
+	for head in adjustments:
+		if head not in HEAD_INDEX:
+			frappe.throw(_("Unknown statement head {0}").format(head))
+
+	statement = get_statement_amounts(
+		frappe._dict(company=company, fiscal_year=fiscal_year, employee=employee)
+	)
+	if not statement.employees:
+		return []
+
+	amounts = statement.amounts
+	for head, factor in adjustments.items():
+		amounts[..., HEAD_INDEX[head]] *= flt(factor)
+
+	projection = project_annual_tax(amounts, statement.income_tax, statement.months_passed)
+	return projection.rows(statement.employees)
@@ -2,6 +2,16 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on("Bulk Additional Salary", {
+	onload(frm) {
+		// Progress of the background create/submit job, published after every chunk.
+		// onload runs for every document opened, so replace the previous listener.
+		frappe.realtime.off("bulk_additional_salary_progress");
+		frappe.realtime.on("bulk_additional_salary_progress", (data) => {
+			if (!data || data.docname !== frm.doc.name) return;
+			show_job_progress(frm, data);
+		});
+	},
+
 	refresh(frm) {
 		// Remove all custom buttons first and clear flags
 		frm.page.clear_actions();
@@ -13,11 +23,81 @@ frappe.ui.form.on("Bulk Additional Salary", {
 			return;
 		}
 
+		// A job still marked queued or running whose worker died is treated as failed
+		const job_stopped = frm.doc.__onload && frm.doc.__onload.job_stopped;
+
+		// While a job is queued or running, only show its progress
+		if (["Queued", "Running"].includes(frm.doc.job_status) && !job_stopped) {
+			show_job_progress(frm, {
+				action: frm.doc.job_action,
+				status: frm.doc.job_status,
+				processed: frm.doc.processed_rows,
+				total: frm.doc.total_rows,
+			});
+			return;
+		}
+
+		// A failed create job resumes from the rows that have no Additional Salary yet
+		if ((frm.doc.job_status === "Failed" || job_stopped) && frm.doc.job_action === "Create") {
+			const btn = frm.page.add_button(__("Resume Creating Additional Salaries"), () =>
+				create_bulk_additional_salary(frm)
+			);
+			if (btn) {
+				$(btn).removeClass("btn-default btn-secondary btn-primary").addClass("btn-dark");
+				frm.page.btn_create_additional_salaries = btn;
+			}
+			return;
+		}
+
 		// After saving: check if additional salaries exist
 		check_and_show_buttons(frm);
 	},
 });
 
+function show_job_progress(frm, data) {
+	if (data.done) {
+		frm.dashboard.hide_progress();
+		if (data.status === "Failed") {
+			frappe.msgprint({
+				title: __("Error"),
+				message: data.error || __("Could not process Additional Salaries"),
+				indicator: "red",
+			});
+		} else if (data.action === "Create" && data.result?.skipped?.length) {
+			// Repeated charge rows; only the first row for each employee and component is created
+			frappe.msgprint({
+				title: __("Some charge rows were skipped"),
+				message: `<ul>${data.result.skipped
+					.map(
+						(row) =>
+							`<li>${row.employee} / ${row.salary_component}: ${frappe.utils.escape_html(row.reason)}</li>`
+					)
+					.join("")}</ul>`,
+				indicator: "orange",
+			});
+		} else if (data.action === "Create") {
+			frappe.msgprint(__("Additional Salary records created"));
+		} else if (data.result?.failed?.length) {
+			// Rejected by the Additional Salary validation; these stay in draft
+			frappe.msgprint({
+				title: __("Some Additional Salaries were not submitted"),
+				message: `<ul>${data.result.failed
+					.map((row) => `<li>${row.name}: ${frappe.utils.escape_html(row.reason)}</li>`)
+					.join("")}</ul>`,
+				indicator: "orange",
+			});
+		} else {
+			frappe.msgprint(__("All Additional Salary records submitted"));
+		}
+		frm.reload_doc();
+		return;
+	}
+
+	const title = data.action === "Submit" ? __("Submitting Additional Salaries") : __("Creating Additional Salaries");
+	const percent = data.total ? (data.processed / data.total) * 100 : 0;
+	frm.dashboard.show_progress(title, percent, __("{0} of {1} rows", [data.processed || 0, data.total || 0]));
+}
+
 async function check_and_show_buttons(frm) {
 	// Check if additional salaries have been created for this document
 	const additional_salaries = await frappe.db.get_list("Additional Salary", {
@@ -110,10 +190,8 @@ async function create_bulk_additional_salary(frm) {
 			args: {
 				docname: frm.doc.name,
 			},
-			freeze: true,
-			freeze_message: __("Creating Additional Salaries..."),
 		});
-		frappe.msgprint(__("Additional Salary records created"));
+		frappe.show_alert({ message: __("Creating Additional Salaries in the background..."), indicator: "blue" });
 		frm.reload_doc();
 	} catch (e) {
 		console.error(e);
@@ -132,10 +210,8 @@ async function submit_additional_salaries(frm) {
 			args: {
 				docname: frm.doc.name,
 			},
-			freeze: true,
-			freeze_message: __("Submitting Additional Salaries..."),
 		});
-		frappe.msgprint(__("All Additional Salary records submitted"));
+		frappe.show_alert({ message: __("Submitting Additional Salaries in the background..."), indicator: "blue" });
 		frm.reload_doc();
 	} catch (e) {
 		console.error(e);
@@ -2,16 +2,30 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils.background_jobs import is_job_enqueued
+
+from gvm_payroll.gvm_payroll.utils.additional_salary_batch import (
+	get_existing_additional_salaries,
+	insert_additional_salaries,
+	validate_additional_salary_rows,
+)
+from gvm_payroll.gvm_payroll.utils.additional_salary_batch import submit_additional_salaries as submit_batch
+
+JOB_TIMEOUT = 3600
 
 
 class BulkAdditionalSalary(Document):
-	pass
+	def onload(self):
+		# A worker killed mid-job never records its failure; let the form offer a restart
+		if self.job_status in ("Queued", "Running") and not is_job_enqueued(get_job_id(self.name)):
+			self.set_onload("job_stopped", True)
 
 
 @frappe.whitelist()
-def create_additional_salaries(docname: str):
-	"""Create Additional Salary docs from Bulk Additional Salary rows."""
+def create_additional_salaries(docname: str, batch_size: int | None = None, commit_interval: int | None = None):
+	"""Queue creation of draft Additional Salary docs from Bulk Additional Salary rows."""
 	doc = frappe.get_doc("Bulk Additional Salary", docname)
 
 	if not doc.company or not doc.payroll_date:
@@ -20,55 +34,204 @@ def create_additional_salaries(docname: str):
 	if not doc.charges:
 		frappe.throw("Please add at least one charge row")
 
-	created = []
+	# Rows are inserted without building each document, so check the permission once here
+	frappe.has_permission("Additional Salary", "create", throw=True)
+
+	# Validate every row up front so a bad row does not leave a partial set of drafts.
+	# Repeated rows are not errors: the first one is created and the rest are reported.
+	rows, _duplicates = get_pending_rows(doc)
+	_rows, errors = validate_additional_salary_rows(rows, doc.company, doc.payroll_date)
+	if errors:
+		throw_row_errors(errors)
+
+	return enqueue_job(doc, "Create", batch_size, commit_interval)
+
+
+@frappe.whitelist()
+def submit_additional_salaries(docname: str, batch_size: int | None = None, commit_interval: int | None = None):
+	"""Queue submission of all draft Additional Salary records linked to Bulk Additional Salary."""
+	doc = frappe.get_doc("Bulk Additional Salary", docname)
+
+	# Each document checks it again on submit; fail here before queueing the job
+	frappe.has_permission("Additional Salary", "submit", throw=True)
+
+	if not get_draft_additional_salaries(docname):
+		frappe.throw("No draft Additional Salary records found to submit")
+
+	return enqueue_job(doc, "Submit", batch_size, commit_interval)
+
+
+def enqueue_job(doc, action, batch_size=None, commit_interval=None):
+	job_id = get_job_id(doc.name)
+	if is_job_enqueued(job_id):
+		frappe.throw(_("A job is already running for {0}").format(doc.name))
+
+	doc.db_set({"job_action": action, "job_status": "Queued", "last_error": None})
+	frappe.enqueue(
+		"gvm_payroll.gvm_payroll.doctype.bulk_additional_salary.bulk_additional_salary.run_job",
+		queue="long",
+		timeout=JOB_TIMEOUT,
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		docname=doc.name,
+		action=action,
+		batch_size=batch_size,
+		commit_interval=commit_interval,
+	)
+	return {"queued": True, "job_id": job_id}
+
+
+def run_job(docname, action, batch_size=None, commit_interval=None):
+	"""Background job: create or submit the Additional Salaries, checkpointing after every chunk.
+
+	A retried job resumes where the last one stopped: creation skips charge
+	rows that already have an Additional Salary and submission only picks up
+	the remaining drafts.
+	"""
+	doc = frappe.get_doc("Bulk Additional Salary", docname)
+	doc.db_set("job_status", "Running")
+	frappe.db.commit()
+
+	try:
+		if action == "Create":
+			result = create_pending_additional_salaries(doc, batch_size, commit_interval)
+		else:
+			result = submit_draft_additional_salaries(doc, batch_size, commit_interval)
+	except Exception as e:
+		frappe.db.rollback()
+		doc.db_set({"job_status": "Failed", "last_error": str(e)})
+		frappe.db.commit()
+		frappe.log_error(title=f"Bulk Additional Salary {action} failed for {docname}")
+		publish_progress(doc, done=True)
+		raise
+
+	doc.db_set("job_status", "Completed")
+	frappe.db.commit()
+	publish_progress(doc, done=True, result=result)
+
+
+def create_pending_additional_salaries(doc, batch_size=None, commit_interval=None):
+	rows, duplicates = get_pending_rows(doc)
+	already_processed = len(doc.charges) - len(rows)
+
+	rows, errors = validate_additional_salary_rows(rows, doc.company, doc.payroll_date)
+	if errors:
+		throw_row_errors(errors)
+
+	doc.db_set({"processed_rows": already_processed, "total_rows": already_processed + len(rows)})
+
+	result = insert_additional_salaries(
+		rows,
+		doc.company,
+		doc.payroll_date,
+		"Bulk Additional Salary",
+		doc.name,
+		batch_size=batch_size,
+		commit_interval=commit_interval,
+		on_chunk=lambda stats: checkpoint(doc, stats),
+	)
+	frappe.db.commit()
+	return {"created": len(result.created), "skipped": duplicates, "chunks": result.chunks}
+
+
+def submit_draft_additional_salaries(doc, batch_size=None, commit_interval=None):
+	drafts = get_draft_additional_salaries(doc.name)
+	submitted = frappe.db.count(
+		"Additional Salary",
+		{"ref_doctype": "Bulk Additional Salary", "ref_docname": doc.name, "docstatus": 1},
+	)
+	doc.db_set({"processed_rows": submitted, "total_rows": submitted + len(drafts)})
+
+	result = submit_batch(
+		drafts,
+		batch_size=batch_size,
+		commit_interval=commit_interval,
+		on_chunk=lambda stats: checkpoint(doc, stats),
+	)
+	frappe.db.commit()
+	return {"submitted": len(result.submitted), "failed": result.failed, "chunks": result.chunks}
+
+
+def get_pending_rows(doc):
+	"""Complete charge rows that do not have an Additional Salary yet, and the repeated rows.
+
+	Only the first row for an employee and component is created; the later
+	ones are returned as ``duplicates`` with the reason.
+	"""
+	existing = get_existing_additional_salaries("Bulk Additional Salary", doc.name)
+	rows = []
+	duplicates = []
+	first_rows = {}
+
 	for row in doc.charges:
 		if not row.employee or not row.salary_component or row.amount is None:
 			continue
 
-		additional = frappe.get_doc(
-			{
-				"doctype": "Additional Salary",
-				"naming_series": "HR-ADS-.YY.-.MM.-",
-				"employee": row.employee,
-				"salary_component": row.salary_component,
-				"amount": row.amount,
-				"company": doc.company,
-				"payroll_date": doc.payroll_date,
-				"overwrite_salary_structure_amount": 1,
-				"ref_doctype": "Bulk Additional Salary",
-				"ref_docname": doc.name,
-			}
-		)
-		additional.insert()
-		created.append(additional.name)
-
-	return {"created": created}
+		key = (row.employee, row.salary_component)
+		if key in first_rows:
+			duplicates.append(
+				{
+					"employee": row.employee,
+					"salary_component": row.salary_component,
+					"reason": _("Row {0} repeats row {1}").format(row.idx, first_rows[key]),
+				}
+			)
+			continue
 
+		first_rows[key] = row.idx
+		if key not in existing:
+			rows.append(
+				{"employee": row.employee, "salary_component": row.salary_component, "amount": row.amount}
+			)
 
-@frappe.whitelist()
-def submit_additional_salaries(docname: str):
-	"""Submit all draft Additional Salary records linked to Bulk Additional Salary."""
-	doc = frappe.get_doc("Bulk Additional Salary", docname)
-	
-	# Get all draft additional salaries for this document
-	additional_salaries = frappe.get_all(
+	return rows, duplicates
+
+
+def get_draft_additional_salaries(docname):
+	return frappe.get_all(
 		"Additional Salary",
 		filters={
 			"ref_doctype": "Bulk Additional Salary",
 			"ref_docname": docname,
 			"docstatus": 0,  # Draft
 		},
-		fields=["name"],
+		pluck="name",
+		order_by="name",
 	)
-	
-	if not additional_salaries:
-		frappe.throw("No draft Additional Salary records found to submit")
-	
-	submitted = []
-	for salary in additional_salaries:
-		salary_doc = frappe.get_doc("Additional Salary", salary.name)
-		salary_doc.submit()
-		submitted.append(salary.name)
-	
-	frappe.db.commit()
-	return {"submitted": submitted}
+
+
+def checkpoint(doc, stats):
+	"""Record a finished chunk on the doc (in the chunk's transaction) and publish progress."""
+	doc.db_set("processed_rows", doc.processed_rows + stats["rows"], update_modified=False)
+	publish_progress(doc, stats=stats)
+
+
+def publish_progress(doc, done=False, result=None, stats=None):
+	frappe.publish_realtime(
+		"bulk_additional_salary_progress",
+		{
+			"docname": doc.name,
+			"action": doc.job_action,
+			"status": doc.job_status,
+			"processed": doc.processed_rows,
+			"total": doc.total_rows,
+			"error": doc.last_error,
+			"chunk": stats,
+			"result": result,
+			"done": done,
+		},
+		doctype=doc.doctype,
+		docname=doc.name,
+	)
+
+
+def throw_row_errors(errors):
+	frappe.throw(
+		"<br>".join(f"{row['employee']} / {row['salary_component']}: {row['reason']}" for row in errors),
+		title=_("Invalid Charge Rows"),
+	)
+
+
+def get_job_id(docname):
+	return f"bulk_additional_salary::{docname}"
@@ -1,9 +1,31 @@
 # Copyright (c) 2025, Samuael Ketema and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from gvm_payroll.gvm_payroll.doctype.bulk_additional_salary.bulk_additional_salary import get_pending_rows
+
 
 class TestBulkAdditionalSalary(FrappeTestCase):
-	pass
+	def test_repeated_rows_reported(self):
+		doc = frappe.get_doc(
+			{
+				"doctype": "Bulk Additional Salary",
+				"charges": [
+					{"employee": "EMP-1", "salary_component": "Canteen", "amount": 100},
+					{"employee": "EMP-2", "salary_component": "Canteen", "amount": 100},
+					{"employee": "EMP-1", "salary_component": "Canteen", "amount": 150},
+				],
+			}
+		)
+
+		rows, duplicates = get_pending_rows(doc)
+
+		self.assertEqual(
+			[(row["employee"], row["amount"]) for row in rows],
+			[("EMP-1", 100), ("EMP-2", 100)],
+		)
+		self.assertEqual(len(duplicates), 1)
+		self.assertEqual(duplicates[0]["employee"], "EMP-1")
+		self.assertIn("Row 3", duplicates[0]["reason"])
@@ -0,0 +1,149 @@
+// Copyright (c) 2026, Samuael Ketema and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("IND Payroll Setting", {
+	onload(frm) {
+		// Progress of the background increment run, published after every batch.
+		// onload runs for every document opened, so replace the previous listener;
+		// the setting is named after its company.
+		frappe.realtime.off("annual_increment_progress");
+		frappe.realtime.on("annual_increment_progress", (data) => {
+			if (!data || data.company !== frm.doc.name) return;
+			show_increment_progress(frm, data);
+		});
+	},
+
+	refresh(frm) {
+		if (frm.doc.__islocal || !frm.doc.company) return;
+
+		frm.add_custom_button(__("Run Annual Increment"), () => open_increment_dialog(frm));
+	},
+});
+
+async function open_increment_dialog(frm) {
+	const { message: dates } = await frappe.call({
+		method: "gvm_payroll.gvm_payroll.doctype.ind_payroll_setting.ind_payroll_setting.get_increment_dates_list",
+		args: { company: frm.doc.company },
+	});
+
+	const d = new frappe.ui.Dialog({
+		title: __("Run Annual Increment"),
+		size: "large",
+		fields: [
+			{
+				fieldname: "increment_date",
+				fieldtype: "Select",
+				label: __("Increment Date"),
+				options: (dates || []).join("\n"),
+				default: (dates || [])[0],
+				reqd: 1,
+			},
+			{
+				fieldname: "preview_html",
+				fieldtype: "HTML",
+			},
+		],
+		secondary_action_label: __("Preview"),
+		secondary_action: async () => {
+			const values = d.get_values();
+			if (!values) return;
+			const { message } = await frappe.call({
+				method: "gvm_payroll.gvm_payroll.api.annual_increment.run_annual_increment",
+				args: { company: frm.doc.company, increment_date: values.increment_date, dry_run: 1 },
+				freeze: true,
+				freeze_message: __("Preparing Preview..."),
+			});
+			render_increment_preview(d, message);
+		},
+		primary_action_label: __("Run Increment"),
+		primary_action: (values) => {
+			frappe.confirm(
+				__("Create Salary Structure Assignments for every due employee on {0}?", [
+					frappe.datetime.str_to_user(values.increment_date),
+				]),
+				async () => {
+					await frappe.call({
+						method: "gvm_payroll.gvm_payroll.api.annual_increment.run_annual_increment",
+						args: { company: frm.doc.company, increment_date: values.increment_date, dry_run: 0 },
+						freeze: true,
+						freeze_message: __("Queuing Increment Run..."),
+					});
+					d.hide();
+					frappe.show_alert({ message: __("Increment run queued"), indicator: "blue" });
+				}
+			);
+		},
+	});
+
+	d.show();
+}
+
+function render_increment_preview(d, data) {
+	const rows = data?.rows || [];
+	const skipped = data?.skipped || [];
+	const format = (value) => format_currency(value, null, 0);
+
+	let html = `<p>${__("{0} employees to increment, {1} skipped", [rows.length, skipped.length])}</p>`;
+	if (rows.length) {
+		html += `<div style="max-height: 320px; overflow-y: auto;">
+			<table class="table table-bordered table-sm">
+				<thead><tr>
+					<th>${__("Employee")}</th>
+					<th>${__("Level")}</th>
+					<th class="text-right">${__("Current Basic")}</th>
+					<th class="text-right">${__("New Basic")}</th>
+				</tr></thead>
+				<tbody>
+				${rows
+					.map(
+						(row) => `<tr>
+							<td>${row.employee}: ${frappe.utils.escape_html(row.employee_name || "")}</td>
+							<td>${row.level}</td>
+							<td class="text-right">${format(row.current_basic)}</td>
+							<td class="text-right">${format(row.new_basic)}</td>
+						</tr>`
+					)
+					.join("")}
+				</tbody>
+			</table>
+		</div>`;
+	}
+	if (skipped.length) {
+		html += `<p class="text-muted">${__("Skipped")}</p><ul>
+			${skipped.map((row) => `<li>${row.employee}: ${frappe.utils.escape_html(row.reason)}</li>`).join("")}
+		</ul>`;
+	}
+
+	d.fields_dict.preview_html.$wrapper.html(html);
+}
+
+function show_increment_progress(frm, data) {
+	if (["Completed", "Failed"].includes(data.status)) {
+		frm.dashboard.hide_progress();
+		if (data.status === "Failed") {
+			frappe.msgprint({
+				title: __("Error"),
+				message: data.error || __("Could not run the annual increment"),
+				indicator: "red",
+			});
+			return;
+		}
+
+		const failed = data.failed || [];
+		let message = __("{0} Salary Structure Assignments created", [data.created || 0]);
+		if (failed.length) {
+			message += `<br>${__("Failed")}:<ul>${failed
+				.map((row) => `<li>${row.employee}: ${frappe.utils.escape_html(row.reason)}</li>`)
+				.join("")}</ul>`;
+		}
+		frappe.msgprint({ title: __("Annual Increment"), message, indicator: failed.length ? "orange" : "green" });
+		return;
+	}
+
+	const percent = data.total ? (data.processed / data.total) * 100 : 0;
+	frm.dashboard.show_progress(
+		__("Annual Increment"),
+		percent,
+		__("{0} of {1} employees", [data.processed || 0, data.total || 0])
+	);
+}
@@ -16,57 +16,20 @@ frappe.ui.form.on("Pay Matrix", {
 async function render_matrix(frm) {
 	if (!frm.doc.name) return;
 
-	// Fetch all Pay Matrix Levels for this Pay Matrix
-	const level_list = await frappe.db.get_list("Pay Matrix Level", {
-		filters: { pay_matrix: frm.doc.name },
-		fields: ["name"],
-		order_by: "level asc",
+	// Whole level x year grid, pivoted and sorted (1 < 1A < 2) on the server
+	const { message: grid } = await frappe.call({
+		method: "gvm_payroll.gvm_payroll.doctype.pay_matrix.pay_matrix.get_pay_matrix_grid",
+		args: { pay_matrix: frm.doc.name },
 	});
 
-	if (!level_list.length) {
+	const levels = grid?.levels || [];
+	const all_years = grid?.years || [];
+
+	if (!levels.length) {
 		$(frm.fields_dict.matrix_html.wrapper).html("<p>No data found.</p>");
 		return;
 	}
 
-	// Fetch full doc for each level to get the child table
-	const levels = [];
-	for (const lvl of level_list) {
-		const full_doc = await frappe.db.get_doc("Pay Matrix Level", lvl.name);
-		levels.push(full_doc);
-	}
-
-	// Sort levels numerically
-	// Sort levels with numeric part first, then alpha suffix (e.g., 1 < 1A < 2)
-	const parseLevel = (val) => {
-		const m = String(val || "").match(/^(\d+)([A-Za-z]*)$/);
-		return {
-			num: m ? parseInt(m[1], 10) : Number.MAX_SAFE_INTEGER,
-			suffix: m ? m[2] || "" : "",
-		};
-	};
-	levels.sort((a, b) => {
-		const pa = parseLevel(a.level);
-		const pb = parseLevel(b.level);
-		if (pa.num !== pb.num) return pa.num - pb.num;
-		return pa.suffix.localeCompare(pb.suffix);
-	});
-
-	// Prepare matrix data
-	let all_years = new Set();
-	const matrix_data = {};
-
-	levels.forEach((lvl) => {
-		matrix_data[lvl.level] = {};
-		if (lvl.years && lvl.years.length) {
-			lvl.years.forEach((y) => {
-				matrix_data[lvl.level][y.year] = y.amount;
-				all_years.add(y.year);
-			});
-		}
-	});
-
-	all_years = Array.from(all_years).sort((a, b) => a - b);
-
 	// Build HTML table with styling
 	let html = `
 	<div class="pm-table-wrapper">
@@ -91,7 +54,7 @@ async function render_matrix(frm) {
 		html += `<tr>
 					<td class="pm-header pm-row">${year}</td>`;
 		levels.forEach((lvl) => {
-			let amount = matrix_data[lvl.level][year] || "";
+			let amount = lvl.amounts[year] || "";
 			if (amount !== "") {
 				amount = Number(amount).toLocaleString(); // add comma
 			}
@@ -4,9 +4,100 @@
 import frappe
 from frappe.model.document import Document
 
+from gvm_payroll.gvm_payroll.utils.pay_matrix_index import (
+	bump_pay_matrix_version,
+	get_level_sort_key,
+	get_pay_matrix_index,
+	get_year_sort_key,
+)
+
+PAY_MATRIX_GRID_CACHE_KEY = "gvm_payroll:pay_matrix_grid"
+
 
 class PayMatrix(Document):
-	pass
+	def on_trash(self):
+		clear_pay_matrix_cache(self.name)
+
+	def after_rename(self, old, new, merge=False):
+		clear_pay_matrix_cache(old, new)
+
+
+@frappe.whitelist()
+def get_pay_matrix_grid(pay_matrix: str):
+	"""
+	Level x year grid of a Pay Matrix for the matrix view: ``levels`` sorted
+	like 1 < 1A < 2, each with its ``amounts`` by year, and the sorted union of
+	``years``. Built with one query and cached per Pay Matrix until one of its
+	levels changes.
+	"""
+	frappe.has_permission("Pay Matrix", "read", pay_matrix, throw=True)
+
+	cache = frappe.cache()
+	grid = cache.hget(PAY_MATRIX_GRID_CACHE_KEY, pay_matrix)
+	if grid is None:
+		grid = build_pay_matrix_grid(pay_matrix)
+		cache.hset(PAY_MATRIX_GRID_CACHE_KEY, pay_matrix, grid)
+	return grid
+
+
+def build_pay_matrix_grid(pay_matrix):
+	level = frappe.qb.DocType("Pay Matrix Level")
+	item = frappe.qb.DocType("Matrix Level Items")
+
+	rows = (
+		frappe.qb.from_(level)
+		.left_join(item)
+		.on((item.parent == level.name) & (item.parenttype == "Pay Matrix Level") & (item.parentfield == "years"))
+		.select(level.name, level.level, level.pay_band, level.grade, item.year, item.amount)
+		.where(level.pay_matrix == pay_matrix)
+		.orderby(level.name)
+		.orderby(item.idx)
+	).run(as_dict=True)
+
+	levels = {}
+	years = set()
+	for row in rows:
+		entry = levels.setdefault(
+			row.name,
+			{"name": row.name, "level": row.level, "pay_band": row.pay_band, "grade": row.grade, "amounts": {}},
+		)
+		if row.year is not None:
+			entry["amounts"][row.year] = row.amount
+			years.add(row.year)
+
+	return {
+		"levels": sorted(levels.values(), key=lambda entry: get_level_sort_key(entry["level"])),
+		"years": sorted(years, key=get_year_sort_key),
+	}
+
+
+def clear_pay_matrix_cache(*pay_matrices):
+	"""Drop the cached grids and compiled indexes of ``pay_matrices``."""
+	for pay_matrix in {pay_matrix for pay_matrix in pay_matrices if pay_matrix}:
+		frappe.cache().hdel(PAY_MATRIX_GRID_CACHE_KEY, pay_matrix)
+	bump_pay_matrix_version(*pay_matrices)
+
+
+@frappe.whitelist()
+def get_designation_pay(designation: str, pay_matrix: str, years_experienced: int | None = None):
+	"""
+	Level a Designation maps to in a Pay Matrix and, when years_experienced is
+	given, the amount at that cell (or the closest lower one), resolved through
+	the compiled Pay Matrix index.
+	"""
+	frappe.has_permission("Pay Matrix", "read", pay_matrix, throw=True)
+
+	index = get_pay_matrix_index(pay_matrix)
+	level = index.get_designation_level(designation)
+	if not level:
+		return None
+
+	cell = index.amount_at(level, years_experienced) if years_experienced is not None else None
+	return {
+		"level": level,
+		"cell": cell[0] if cell else None,
+		"amount": cell[1] if cell else None,
+	}
 
 
 @frappe.whitelist()
@@ -1,9 +1,73 @@
 # Copyright (c) 2025, Samuael Ketema and Contributors
 # See license.txt
 
-# import frappe
+import numpy as np
 from frappe.tests.utils import FrappeTestCase
 
+from gvm_payroll.gvm_payroll.utils.pay_matrix_index import PayMatrixIndex, PayMatrixLevelCells
+
+
+def make_index():
+	levels = {
+		"PML-2": PayMatrixLevelCells("PML-2", "2", {1: 130.0, 2: 140.0}.items()),
+		"PML-1": PayMatrixLevelCells("PML-1", "1", {3: 120.0, 1: 100.0, 2: 110.0}.items()),
+		"PML-1A": PayMatrixLevelCells("PML-1A", "1A", {1: 115.0, 2: 125.0}.items()),
+	}
+	return PayMatrixIndex("_Test Pay Matrix", levels, {"Clerk": "PML-1"})
+
 
 class TestPayMatrix(FrappeTestCase):
-	pass
+	def test_level_order(self):
+		index = make_index()
+
+		self.assertEqual(index.level_names, ["PML-1", "PML-1A", "PML-2"])
+		self.assertEqual(index.get_level("1A").name, "PML-1A")
+		self.assertEqual(index.next_level("PML-1A"), "PML-2")
+		self.assertIsNone(index.next_level("PML-2"))
+		self.assertEqual(index.get_designation_level("Clerk"), "PML-1")
+
+	def test_cell_lookups(self):
+		index = make_index()
+
+		self.assertEqual(index.amount_at("PML-1", 2), (2, 110.0))
+		# Past the top the closest lower cell applies; below the first there is none
+		self.assertEqual(index.amount_at("PML-1", 5), (3, 120.0))
+		self.assertIsNone(index.amount_at("PML-1", 0))
+		self.assertIsNone(index.amount_at("Unknown", 1))
+
+		self.assertEqual(index.next_cell("PML-1", 2), (3, 120.0))
+		self.assertIsNone(index.next_cell("PML-1", 3))
+
+		self.assertEqual(index.next_higher_cell("PML-2", 130), (2, 140.0))
+		self.assertEqual(index.next_higher_cell("PML-2", 130, inclusive=True), (1, 130.0))
+		self.assertIsNone(index.next_higher_cell("PML-2", 140))
+
+	def test_promotion(self):
+		index = make_index()
+
+		# One notional increment to 120, then the first cell of 1A paying at least that
+		self.assertEqual(index.promote("PML-1", 2), ("PML-1A", 2, 125.0))
+		self.assertEqual(index.promote("PML-1", 1, to_level="2"), ("PML-2", 1, 130.0))
+		# At the top of a level there is no increment to give
+		self.assertEqual(index.promote("PML-1", 3), ("PML-1A", 2, 125.0))
+		self.assertIsNone(index.promote("PML-1", 0))
+		self.assertIsNone(index.promote("PML-2", 1))
+		self.assertEqual(
+			index.promotion_map("PML-1A"),
+			{1: ("PML-2", 1, 130.0), 2: ("PML-2", 1, 130.0)},
+		)
+
+	def test_bulk_lookups_match_single(self):
+		index = make_index()
+
+		cells, amounts = index.bulk_amount_at(["PML-1", "PML-2", "Unknown", "PML-1"], [2, 9, 1, 0])
+		self.assertEqual(cells.tolist(), [2, 2, -1, -1])
+		self.assertEqual(amounts[:2].tolist(), [110.0, 140.0])
+		self.assertTrue(np.isnan(amounts[2:]).all())
+
+		cells, amounts = index.bulk_next_higher_cell(["PML-1", "PML-1A", "PML-2"], [105, 125, 140])
+		self.assertEqual(cells.tolist(), [2, -1, -1])
+		self.assertEqual(amounts[0], 110.0)
+
+		cells, amounts = index.bulk_next_higher_cell(["PML-1A"], [125], inclusive=True)
+		self.assertEqual((cells.tolist(), amounts.tolist()), ([2], [125.0]))
@@ -4,6 +4,16 @@
 # import frappe
 from frappe.model.document import Document
 
+from gvm_payroll.gvm_payroll.doctype.pay_matrix.pay_matrix import clear_pay_matrix_cache
+
 
 class PayMatrixLevel(Document):
-	pass
+	def on_update(self):
+		previous = self.get_doc_before_save()
+		clear_pay_matrix_cache(self.pay_matrix, previous and previous.pay_matrix)
+
+	def on_trash(self):
+		clear_pay_matrix_cache(self.pay_matrix)
+
+	def after_rename(self, old, new, merge=False):
+		clear_pay_matrix_cache(self.pay_matrix)
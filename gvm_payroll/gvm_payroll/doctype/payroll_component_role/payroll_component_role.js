@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Samuael Ketema and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Payroll Component Role", {
+// 	refresh(frm) {
+
+// 	},
+// });
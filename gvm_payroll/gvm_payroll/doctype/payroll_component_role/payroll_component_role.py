@@ -0,0 +1,73 @@
+# Copyright (c) 2026, Samuael Ketema and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+COMPONENT_ROLE_VERSION_KEY = "gvm_payroll:component_role_version"
+
+# {(site, company): (version, {role: salary_component})}, kept for the life of the worker
+_component_role_maps = {}
+
+
+class PayrollComponentRole(Document):
+	def validate(self):
+		seen = set()
+		for row in self.roles:
+			if row.role in seen:
+				frappe.throw(_("Row {0}: Role {1} is mapped more than once").format(row.idx, row.role))
+			seen.add(row.role)
+
+	def on_update(self):
+		bump_component_role_version()
+
+	def on_trash(self):
+		bump_component_role_version()
+
+	def after_rename(self, old, new, merge=False):
+		bump_component_role_version()
+
+
+def bump_component_role_version(doc=None, method=None):
+	"""Invalidate every worker's cached role maps by changing the shared version.
+
+	The version changes only once the transaction commits; bumping it earlier
+	lets another worker reload the old rows and cache them under the new version.
+	"""
+	frappe.db.after_commit.add(set_component_role_version)
+
+
+def set_component_role_version():
+	frappe.cache().set_value(COMPONENT_ROLE_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def get_component_role_map(company):
+	"""``{role: salary_component}`` configured for ``company``.
+
+	The map is cached in process memory and reloaded only when the version in
+	the site cache changes, so a report pays one cache read per call.
+	"""
+	if not company:
+		return {}
+
+	version = frappe.cache().get_value(COMPONENT_ROLE_VERSION_KEY)
+	key = (frappe.local.site, company)
+	cached = _component_role_maps.get(key)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	# Matched on the company field, not the name, which no longer equals it after a rename
+	ComponentRole = frappe.qb.DocType("Payroll Component Role")
+	ComponentRoleItem = frappe.qb.DocType("Payroll Component Role Item")
+	role_map = dict(
+		frappe.qb.from_(ComponentRoleItem)
+		.join(ComponentRole)
+		.on(ComponentRoleItem.parent == ComponentRole.name)
+		.select(ComponentRoleItem.role, ComponentRoleItem.salary_component)
+		.where(ComponentRoleItem.parenttype == "Payroll Component Role")
+		.where(ComponentRole.company == company)
+		.run()
+	)
+	_component_role_maps[key] = (version, role_map)
+	return role_map
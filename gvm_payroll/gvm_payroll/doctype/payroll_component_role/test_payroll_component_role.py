@@ -0,0 +1,82 @@
+# Copyright (c) 2026, Samuael Ketema and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from gvm_payroll.gvm_payroll.doctype.payroll_component_role.payroll_component_role import (
+	get_component_role_map,
+)
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_component_roles
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import SalarySlipFacts
+
+TEST_COMPANY = "_Test Role Company"
+
+
+class TestPayrollComponentRole(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete("Payroll Component Role", {"name": TEST_COMPANY})
+		frappe.db.delete("Payroll Component Role Item", {"parent": TEST_COMPANY})
+
+	def test_role_mapped_once(self):
+		doc = make_component_role({"basic": "Basic Salary"})
+		doc.append("roles", {"role": "basic", "salary_component": "Basic Pay"})
+		doc.flags.ignore_links = True
+
+		self.assertRaises(frappe.ValidationError, doc.save)
+
+	def test_role_map_follows_changes(self):
+		self.assertEqual(get_component_role_map(TEST_COMPANY), {})
+
+		doc = make_component_role({"basic": "Basic Salary", "lic": "LIC Premium"})
+		# The cached map is only reloaded once the change commits
+		self.assertEqual(get_component_role_map(TEST_COMPANY), {})
+		frappe.db.after_commit.run()
+		self.assertEqual(get_component_role_map(TEST_COMPANY), {"basic": "Basic Salary", "lic": "LIC Premium"})
+
+		doc.roles[0].salary_component = "Basic Pay"
+		doc.save()
+		frappe.db.after_commit.run()
+		self.assertEqual(get_component_role_map(TEST_COMPANY)["basic"], "Basic Pay")
+
+		doc.delete()
+		frappe.db.after_commit.run()
+		self.assertEqual(get_component_role_map(TEST_COMPANY), {})
+
+	def test_mapping_wins_over_aliases(self):
+		facts = make_facts(earnings=("Basic Salary", "Special Basic", "Dearness Allowence"), deductions=("LIC",))
+		roles = ("basic", "da", "lic")
+
+		self.assertEqual(
+			get_component_roles(TEST_COMPANY, facts, roles),
+			{"basic": "Basic Salary", "da": "Dearness Allowence", "lic": "LIC"},
+		)
+
+		make_component_role({"basic": "Special Basic"})
+		frappe.db.after_commit.run()
+		self.assertEqual(
+			get_component_roles(TEST_COMPANY, facts, roles),
+			{"basic": "Special Basic", "da": "Dearness Allowence", "lic": "LIC"},
+		)
+
+
+def make_component_role(roles):
+	doc = frappe.get_doc(
+		{
+			"doctype": "Payroll Component Role",
+			"company": TEST_COMPANY,
+			"roles": [{"role": role, "salary_component": component} for role, component in roles.items()],
+		}
+	)
+	doc.flags.ignore_links = True
+	return doc.insert()
+
+
+def make_facts(earnings=(), deductions=()):
+	"""Facts with no slips, only the non-zero components per table the resolver reads."""
+	components = [*earnings, *deductions]
+	present = {
+		"earnings": dict.fromkeys(earnings, True),
+		"deductions": dict.fromkeys(deductions, True),
+	}
+	return SalarySlipFacts(("name",), [], components, {}, present)
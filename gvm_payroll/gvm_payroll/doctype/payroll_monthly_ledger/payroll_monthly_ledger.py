@@ -0,0 +1,19 @@
+# Copyright (c) 2026, Samuael Ketema and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class PayrollMonthlyLedger(Document):
+	pass
+
+
+def on_doctype_update():
+	# One row per (company, employee, period, component); posting upserts against this key
+	frappe.db.add_unique(
+		"Payroll Monthly Ledger",
+		["company", "employee", "period", "component_type", "component"],
+		constraint_name="unique_ledger_key",
+	)
+	frappe.db.add_index("Payroll Monthly Ledger", ["company", "period"])
@@ -0,0 +1,135 @@
+# Copyright (c) 2026, Samuael Ketema and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_last_day
+
+from gvm_payroll.gvm_payroll.utils.payroll_ledger import (
+	LEDGER_DOCTYPE,
+	get_ledger_facts,
+	get_slip_entries,
+	on_salary_slip_cancel,
+	on_salary_slip_submit,
+	rebuild_payroll_ledger,
+	use_payroll_ledger,
+)
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_salary_slip_facts
+
+TEST_COMPANY = "_Test Ledger Company"
+SLIP_FIELDS = ("employee", "net_pay", "current_month_income_tax")
+
+
+class TestPayrollMonthlyLedger(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete(LEDGER_DOCTYPE, {"company": TEST_COMPANY})
+		frappe.db.delete("Salary Slip", {"company": TEST_COMPANY})
+		frappe.db.delete("Salary Detail", {"parenttype": "Salary Slip", "parent": ("like", "_T-LEDGER-%")})
+
+	def test_slip_entries(self):
+		slip = frappe._dict(exchange_rate=2, gross_pay=150, net_pay=120)
+		details = [
+			("earnings", "Basic", 100),
+			("earnings", "Basic", 50),
+			("deductions", "LIC", 30),
+			("loans", "Ignored", 10),
+		]
+
+		entries = get_slip_entries(slip, details)
+
+		self.assertEqual(entries[("Earning", "Basic")], [150, 300])
+		self.assertEqual(entries[("Deduction", "LIC")], [30, 60])
+		self.assertEqual(entries[("Slip Total", "net_pay")], [120, 240])
+		self.assertNotIn(("Slip Total", "total_deduction"), entries)
+		self.assertEqual(len(entries), 4)
+
+	def test_cancel_reverses_submit(self):
+		slip = make_salary_slip("_T-LEDGER-1", "_T-EMP-1", "2026-04-01", {"Basic": 1000}, {"LIC": 100})
+
+		on_salary_slip_submit(slip)
+		self.assertEqual(
+			get_ledger_amounts("_T-EMP-1"),
+			{"Basic": 1000, "LIC": 100, "gross_pay": 1000, "total_deduction": 100, "net_pay": 900},
+		)
+
+		on_salary_slip_cancel(slip)
+		self.assertFalse(frappe.db.exists(LEDGER_DOCTYPE, {"employee": "_T-EMP-1"}))
+
+	def test_ledger_matches_slips(self):
+		make_salary_slip("_T-LEDGER-1", "_T-EMP-1", "2026-04-01", {"Basic": 1000, "DA": 500}, {"LIC": 100})
+		make_salary_slip("_T-LEDGER-2", "_T-EMP-1", "2026-05-01", {"Basic": 1000}, {"LIC": 100})
+		make_salary_slip("_T-LEDGER-3", "_T-EMP-2", "2026-04-01", {"Basic": 800}, {"LIC": 0})
+		rebuild_payroll_ledger(TEST_COMPANY)
+
+		filters = frappe._dict(company=TEST_COMPANY, from_date="2026-04-01", to_date="2026-05-31", use_ledger=1)
+		self.assertTrue(use_payroll_ledger(filters))
+
+		slip_facts = get_salary_slip_facts(filters, SLIP_FIELDS)
+		ledger_facts = get_ledger_facts(filters, SLIP_FIELDS)
+		self.assertEqual(len(ledger_facts), len(slip_facts))
+		self.assertEqual(ledger_facts.present, slip_facts.present)
+		for parentfield in ("earnings", "deductions"):
+			self.assertEqual(ledger_facts.component_totals(parentfield), slip_facts.component_totals(parentfield))
+		self.assertEqual(sorted(ledger_facts.column("net_pay")), sorted(slip_facts.column("net_pay")))
+
+		# A component the slip has no row for reads as absent on both paths
+		slip_idx = slip_facts.column("employee").index("_T-EMP-2")
+		ledger_idx = ledger_facts.column("employee").index("_T-EMP-2")
+		self.assertIsNone(slip_facts.get(slip_idx, "DA", "earnings"))
+		self.assertIsNone(ledger_facts.get(ledger_idx, "DA", "earnings"))
+
+	def test_ledger_refused_when_it_differs_from_slips(self):
+		make_salary_slip("_T-LEDGER-1", "_T-EMP-1", "2026-04-01", {"Basic": 1000}, {})
+		rebuild_payroll_ledger(TEST_COMPANY)
+		filters = frappe._dict(company=TEST_COMPANY, from_date="2026-04-01", to_date="2026-04-30", use_ledger=1)
+
+		self.assertTrue(use_payroll_ledger(filters))
+		self.assertFalse(use_payroll_ledger(frappe._dict(filters, use_ledger=0)))
+		self.assertFalse(use_payroll_ledger(frappe._dict(filters, docstatus="Draft")))
+		self.assertFalse(use_payroll_ledger(frappe._dict(filters, from_date="2026-04-15")))
+		self.assertFalse(use_payroll_ledger(frappe._dict(filters, to_date="2026-04-20")))
+
+		# A second slip in the same month would be merged into one ledger row
+		make_salary_slip("_T-LEDGER-2", "_T-EMP-1", "2026-04-01", {"Basic": 200}, {})
+		rebuild_payroll_ledger(TEST_COMPANY)
+		self.assertFalse(use_payroll_ledger(filters))
+
+
+def make_salary_slip(name, employee, start_date, earnings, deductions):
+	"""Insert a submitted Salary Slip with its component rows, without the HRMS controller."""
+	gross_pay = sum(earnings.values())
+	total_deduction = sum(deductions.values())
+	slip = frappe.get_doc(
+		{
+			"doctype": "Salary Slip",
+			"name": name,
+			"company": TEST_COMPANY,
+			"employee": employee,
+			"employee_name": employee,
+			"start_date": start_date,
+			"end_date": get_last_day(start_date),
+			"posting_date": get_last_day(start_date),
+			"exchange_rate": 1,
+			"gross_pay": gross_pay,
+			"total_deduction": total_deduction,
+			"net_pay": gross_pay - total_deduction,
+			"docstatus": 1,
+			"earnings": [{"salary_component": c, "amount": a} for c, a in earnings.items()],
+			"deductions": [{"salary_component": c, "amount": a} for c, a in deductions.items()],
+		}
+	)
+	slip.db_insert()
+	for row in slip.earnings + slip.deductions:
+		row.parent = slip.name
+		row.parenttype = "Salary Slip"
+		row.db_insert()
+	return slip
+
+
+def get_ledger_amounts(employee):
+	return {
+		row.component: row.amount
+		for row in frappe.get_all(
+			LEDGER_DOCTYPE, filters={"employee": employee}, fields=["component", "amount"]
+		)
+	}
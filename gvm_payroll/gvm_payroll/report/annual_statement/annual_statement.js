@@ -29,6 +29,21 @@ frappe.query_reports["Annual Statement"] = {
 			options: ["Draft", "Submitted", "Cancelled"],
 			default: "Submitted",
 		},
+		{
+			fieldname: "diagnostics",
+			label: __("Log Component Diagnostics"),
+			fieldtype: "Check",
+			default: 0,
+		},
+		{
+			fieldname: "use_ledger",
+			label: __("Use Payroll Ledger"),
+			fieldtype: "Check",
+			default: 0,
+		},
 	],
-};
 
+	onload(report) {
+		gvm_payroll.reports.follow_prepared_reports();
+	},
+};
@@ -1,17 +1,79 @@
 import frappe
 from frappe import _
+from frappe.query_builder.functions import Count
 from frappe.utils import flt, getdate, formatdate
 from datetime import datetime, timedelta
 import calendar
 
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
+import numpy as np
 
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_component_roles
+from gvm_payroll.gvm_payroll.utils.payroll_ledger import get_ledger_facts, use_payroll_ledger
+from gvm_payroll.gvm_payroll.utils.prepared_report import prepare_large_report
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import get_report_diagnostics, track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_salary_slip_facts, get_salary_slip_query, salary_slip
+from gvm_payroll.gvm_payroll.utils.tax_projection import HEAD_INDEX, HEADS, project_annual_tax
 
+SALARY_SLIP_FIELDS = ("employee", "employee_name", "start_date", "current_month_income_tax")
+
+# Components summed into the "sHrent" head, in statement order
+HOUSE_RENT_PARTS = ("house_rent", "water", "garbage", "servant", "parking")
+
+
+def estimate_slip_count(filters):
+	"""Slips of the fiscal year a run reads."""
+	if not filters.get("fiscal_year"):
+		return 0
+
+	from_date, to_date = frappe.db.get_value(
+		"Fiscal Year", filters.get("fiscal_year"), ["year_start_date", "year_end_date"]
+	) or (None, None)
+	slip_filters = frappe._dict(
+		company=filters.get("company"),
+		employee=filters.get("employee"),
+		docstatus=filters.get("docstatus"),
+		from_date=from_date,
+		to_date=to_date,
+	)
+	return get_salary_slip_query(slip_filters, []).select(Count(salary_slip.name)).run()[0][0] or 0
+
+
+@track_report_fetch("Annual Statement")
+@prepare_large_report("Annual Statement", estimate_slip_count)
 def execute(filters=None):
 	if not filters:
 		filters = {}
 
+	# Opt-in component-resolution traces, written once at the end of the run
+	diagnostics = get_report_diagnostics("Annual Statement Diagnostics", filters)
+
+	statement = get_statement_amounts(filters, diagnostics)
+
+	# Store months in filters for HTML template
+	filters["_months"] = statement.months
+
+	if not statement.employees:
+		return [], []
+
+	projection = project_annual_tax(statement.amounts, statement.income_tax, statement.months_passed)
+
+	columns = get_columns(statement.months)
+	data = get_statement_rows(statement, projection)
+
+	if diagnostics:
+		diagnostics.flush()
+
+	return columns, data
+
+
+def get_statement_amounts(filters, diagnostics=None):
+	"""Load the fiscal year's salary slips as arrays for :func:`project_annual_tax`.
+
+	Returns a ``frappe._dict`` with ``months`` (YYYYMM keys in order),
+	``employees`` (``(employee, employee_name)`` pairs), ``amounts``
+	(employees × months × statement heads), ``income_tax`` (employees × months)
+	and ``months_passed`` per month.
+	"""
 	company = filters.get("company")
 	if not company:
 		frappe.throw(_("Company is required"))
@@ -29,510 +91,182 @@ def execute(filters=None):
 
 	# Get all months from April to March
 	months = get_financial_year_months(from_date, to_date)
-	
-	# Store months in filters for HTML template
-	filters["_months"] = months
 
-	salary_slips = get_salary_slips(filters, from_date, to_date)
-	if not salary_slips:
-		return [], []
+	statement = frappe._dict(
+		months=months,
+		employees=[],
+		amounts=np.zeros((0, len(months), len(HEADS))),
+		income_tax=np.zeros((0, len(months))),
+		months_passed=[get_months_passed(from_date, month_key) for month_key in months],
+	)
+
+	slip_filters = frappe._dict(
+		company=company,
+		employee=filters.get("employee"),
+		docstatus=filters.get("docstatus"),
+		from_date=from_date,
+		to_date=to_date,
+		use_ledger=filters.get("use_ledger"),
+	)
+	if use_payroll_ledger(slip_filters):
+		facts = get_ledger_facts(slip_filters, SALARY_SLIP_FIELDS)
+	else:
+		facts = get_salary_slip_facts(slip_filters, SALARY_SLIP_FIELDS)
+	if not facts:
+		return statement
+
+	# Resolve every statement head to a component column once
+	actual_components, earning_columns, house_rent_columns, deduction_columns = get_component_columns(
+		company, facts
+	)
+
+	if diagnostics:
+		diagnostics.set_context(
+			fiscal_year=fiscal_year,
+			slip_count=len(facts),
+			actual_components=actual_components,
+			earning_columns=earning_columns,
+			house_rent_columns=house_rent_columns,
+			deduction_columns=deduction_columns,
+			components=facts.components,
+		)
+		trace_slips(diagnostics, facts, months, house_rent_columns)
+
+	# Employees in order of their first slip
+	employee_index = {}
+	for employee, employee_name in zip(facts.column("employee"), facts.column("employee_name"), strict=True):
+		if employee not in employee_index:
+			employee_index[employee] = len(statement.employees)
+			statement.employees.append((employee, employee_name))
+
+	month_index = {month_key: pos for pos, month_key in enumerate(months)}
+	slip_employee = np.array([employee_index[employee] for employee in facts.column("employee")], dtype=int)
+	slip_month = np.array(
+		[month_index.get(get_month_key(start_date), -1) for start_date in facts.column("start_date")],
+		dtype=int,
+	)
+
+	# Slip × head amounts, read column-wise from the slip × component matrices
+	width = len(facts.components)
+	earnings = np.frombuffer(facts.amounts["earnings"], dtype=float).reshape(len(facts), width)
+	deductions = np.frombuffer(facts.amounts["deductions"], dtype=float).reshape(len(facts), width)
+
+	slip_values = np.zeros((len(facts), len(HEADS)))
+	for head, component_idx in earning_columns.items():
+		if component_idx is not None:
+			slip_values[:, HEAD_INDEX[head]] = earnings[:, component_idx]
+	# House Rent = House Rent + Water Charges + Garbage Maintainence + Servant Charge + Parking Charge,
+	# each part counted from both earnings and deductions
+	for _component, component_idx in house_rent_columns:
+		if component_idx is not None:
+			slip_values[:, HEAD_INDEX["house_rent"]] += earnings[:, component_idx] + deductions[:, component_idx]
+	for head, component_idx in deduction_columns.items():
+		if component_idx is not None:
+			slip_values[:, HEAD_INDEX[head]] = deductions[:, component_idx]
+
+	in_year = slip_month >= 0
+	statement.amounts = np.zeros((len(statement.employees), len(months), len(HEADS)))
+	np.add.at(statement.amounts, (slip_employee[in_year], slip_month[in_year]), slip_values[in_year])
+
+	# The month's income tax is the one on its last slip
+	statement.income_tax = np.zeros((len(statement.employees), len(months)))
+	for employee_pos, month_pos, tax in zip(
+		slip_employee, slip_month, facts.column("current_month_income_tax"), strict=True
+	):
+		if month_pos >= 0:
+			statement.income_tax[employee_pos, month_pos] = flt(tax)
+
+	return statement
+
+
+def trace_slips(diagnostics, facts, months, house_rent_columns):
+	"""Record empty slips and each slip's house rent breakup."""
+	for slip_idx, ss in facts.iter_slips():
+		month_key = get_month_key(ss.start_date)
+		if month_key not in months:
+			continue
+
+		if not (facts.slip_components(slip_idx, "earnings") or facts.slip_components(slip_idx, "deductions")):
+			diagnostics.trace("empty_slip", employee=ss.employee, salary_slip=ss.name)
+
+		house_rent_breakup = {}
+		for component, component_idx in house_rent_columns:
+			house_rent_breakup[component] = {
+				"earnings": facts.amount_at(slip_idx, component_idx, "earnings"),
+				"deductions": facts.amount_at(slip_idx, component_idx, "deductions"),
+			}
 
-	# Get salary slip details for earnings and deductions
-	ss_earning_map = get_salary_slip_details(salary_slips, "earnings")
-	ss_ded_map = get_salary_slip_details(salary_slips, "deductions")
+		diagnostics.trace(
+			"house_rent",
+			employee=ss.employee,
+			salary_slip=ss.name,
+			month_key=month_key,
+			breakup=house_rent_breakup,
+			total=sum(part["earnings"] + part["deductions"] for part in house_rent_breakup.values()),
+		)
 
-	# Get actual component names from salary slips
-	actual_components = get_actual_component_names(salary_slips, ss_earning_map, ss_ded_map)
 
-	# Group salary slips by employee
-	employee_slips = {}
-	for ss in salary_slips:
-		if ss.employee not in employee_slips:
-			employee_slips[ss.employee] = []
-		employee_slips[ss.employee].append(ss)
+def get_statement_rows(statement, projection):
+	"""Report rows: the projection summary plus compact monthly values for the HTML template.
 
-	columns = get_columns(months)
+	Each row carries ``_months = {"base": {head: amount}, "overrides": {month: {head: amount}}}``
+	where ``base`` holds the source month's amounts and ``overrides`` only the
+	heads of months that differ from it; the template expands these per month
+	and derives the monthly totals. Every row also carries ``_months_keys``, the
+	statement months in order, so the print still has them after a sort or filter.
+	"""
+	months_keys = list(statement.months)
 
 	data = []
-
-	for employee, slips in employee_slips.items():
-		# Get employee name
-		employee_name = slips[0].employee_name if slips else ""
-		
-		# Initialize monthly data
-		monthly_data = {}
-		for month_key in months.keys():
-			monthly_data[month_key] = {
-				"basic": 0.0,
-				"da": 0.0,
-				"fixall": 0.0,
-				"ta": 0.0,
-				"house_rent": 0.0,
-				"grinsur": 0.0,
-				"lic": 0.0,
-				"mpf": 0.0,
-				"current_month_income_tax": 0.0,
+	for employee_pos, row in enumerate(projection.rows(statement.employees)):
+		monthly = projection.monthly[employee_pos].tolist()
+		source_month = int(projection.source_month[employee_pos])
+		base = monthly[max(source_month, 0)]
+
+		overrides = {}
+		for month_key, values in zip(months_keys, monthly, strict=True):
+			changed = {
+				head: value
+				for head, value, base_value in zip(HEADS, values, base, strict=True)
+				if value != base_value
 			}
+			if changed:
+				overrides[month_key] = changed
 
-		# Process each salary slip
-		for ss in slips:
-			month_key = get_month_key(ss.start_date)
-			if month_key not in monthly_data:
-				continue
-
-			earnings_map = ss_earning_map.get(ss.name, {})
-			deductions_map = ss_ded_map.get(ss.name, {})
-			
-			# Debug: Check if maps are empty
-			if not earnings_map and not deductions_map:
-				frappe.log_error(
-					title="Annual Statement - Empty Maps Debug",
-					message=frappe.as_json({
-						"employee": employee,
-						"salary_slip_name": ss.name,
-						"available_keys_in_ss_ded_map": list(ss_ded_map.keys())[:10],  # First 10 keys
-						"available_keys_in_ss_earning_map": list(ss_earning_map.keys())[:10],  # First 10 keys
-					})
-				)
-
-			# Basic - use actual component name if found
-			basic = 0.0
-			if actual_components.get("basic"):
-				basic = flt(earnings_map.get(actual_components["basic"], 0))
-			else:
-				basic = get_component_amount(earnings_map, ["Basic Salary", "Basic", "BASIC"])
-			monthly_data[month_key]["basic"] += basic
-
-			# DA = Dearness Allowences - use actual component name if found
-			da = 0.0
-			if actual_components.get("da"):
-				da = flt(earnings_map.get(actual_components["da"], 0))
-			else:
-				da = get_component_amount(earnings_map, ["Dearness Allowences", "Dearness Allowence", "DA", "D.A.", "Dearness"])
-			monthly_data[month_key]["da"] += da
-
-			# TA = Travel Allowences - use actual component name if found
-			ta = 0.0
-			if actual_components.get("ta"):
-				ta = flt(earnings_map.get(actual_components["ta"], 0))
-			else:
-				ta = get_component_amount(earnings_map, ["Travel Allowences", "Travel Allowence", "TA", "T.A.", "Travel"])
-			monthly_data[month_key]["ta"] += ta
-
-			# House Rent = House Rent + Water Charges + Garbage Maintainence + Servant Charge + Parking Charge
-			# Use exact component names from actual_components (found from database)
-			house_rent_total = 0.0
-			house_rent_breakup = {}
-			
-			def add_component_total(key):
-				"""Add earnings + deductions for a component and store debug info."""
-				if not key:
-					return 0.0
-				# Access maps directly - frappe._dict supports .get()
-				earn = flt(earnings_map.get(key, 0) if earnings_map else 0)
-				ded = flt(deductions_map.get(key, 0) if deductions_map else 0)
-				house_rent_breakup[key] = {"earnings": earn, "deductions": ded}
-				total = earn + ded
-				return total
-
-			# House Rent (exact name from actual_components, avoid "House Rent Allowance")
-			if actual_components.get("house_rent"):
-				comp_name = actual_components["house_rent"]
-				if "allowance" not in comp_name.lower():
-					house_rent_total += add_component_total(comp_name) or 0
-			
-			# Water Charges
-			if actual_components.get("water"):
-				house_rent_total += add_component_total(actual_components["water"]) or 0
-			
-			# Garbage Maintainence
-			if actual_components.get("garbage"):
-				house_rent_total += add_component_total(actual_components["garbage"]) or 0
-			
-			# Servant Charge
-			if actual_components.get("servant"):
-				house_rent_total += add_component_total(actual_components["servant"]) or 0
-			
-			# Parking Charge
-			if actual_components.get("parking"):
-				house_rent_total += add_component_total(actual_components["parking"]) or 0
-
-			# Log debug info to help diagnose mismatched components/values
-			frappe.log_error(
-				title="Annual Statement - House Rent Debug",
-				message=frappe.as_json({
-					"employee": employee,
-					"employee_name": employee_name,
-					"salary_slip": ss.name,
-					"month_key": month_key,
-					"actual_components_house": {
-						"house_rent": actual_components.get("house_rent"),
-						"water": actual_components.get("water"),
-						"garbage": actual_components.get("garbage"),
-						"servant": actual_components.get("servant"),
-						"parking": actual_components.get("parking"),
-					},
-					"house_rent_breakup": house_rent_breakup,
-					"house_rent_total": house_rent_total,
-					"earnings_map_type": str(type(earnings_map)),
-					"deductions_map_type": str(type(deductions_map)),
-					"earnings_keys": list(earnings_map.keys()) if earnings_map else [],
-					"deductions_keys": list(deductions_map.keys()) if deductions_map else [],
-					"direct_access_test": {
-						"House Rent in deductions": deductions_map.get("House Rent", "NOT_FOUND") if deductions_map else "MAP_EMPTY",
-						"Water Charges in deductions": deductions_map.get("Water Charges", "NOT_FOUND") if deductions_map else "MAP_EMPTY",
-					},
-				})
-			)
-
-			monthly_data[month_key]["house_rent"] += house_rent_total
-
-			# Grinsur = Group Insurance
-			grinsur = get_component_amount(deductions_map, ["Group Insurance", "Group Ins", "Grinsur", "Group Insur"])
-			monthly_data[month_key]["grinsur"] += grinsur
-
-			# LIC = LIC
-			lic = get_component_amount(deductions_map, ["LIC", "Life Insurance", "Life Insurance Corporation"])
-			monthly_data[month_key]["lic"] += lic
-
-			# MPF = Provident Fund - Employee Contribution
-			mpf = get_component_amount(deductions_map, [
-				"Provident Fund - Employee Contribution",
-				"PF - Employee Contribution",
-				"PF Employee Contribution",
-				"Provident Fund Employee",
-			])
-			monthly_data[month_key]["mpf"] += mpf
-
-			# Current month income tax
-			monthly_data[month_key]["current_month_income_tax"] = flt(ss.current_month_income_tax or 0)
-
-		# FixAll = 40 for all months if we have at least one salary slip
-		if slips:
-			for month_key in monthly_data.keys():
-				monthly_data[month_key]["fixall"] = 40.0
-
-		# Find ANY month with data and copy to all months
-		# Prefer a month that has house_rent > 0 (so we don't lose it), else basic > 0, else any data
-		source_month = None
-
-		# 1) Prefer month with house_rent > 0
-		for month_key, month_data in monthly_data.items():
-			if month_data["house_rent"] > 0:
-				source_month = month_key
-				break
-
-		# 2) Else month with basic > 0
-		if not source_month:
-			for month_key, month_data in monthly_data.items():
-				if month_data["basic"] > 0:
-					source_month = month_key
-					break
-		
-		# 3) Else any month with any data
-		if not source_month:
-			for month_key, month_data in monthly_data.items():
-				if (month_data["basic"] > 0 or month_data["da"] > 0 or month_data["ta"] > 0 or
-					month_data["house_rent"] > 0 or month_data["grinsur"] > 0 or 
-					month_data["lic"] > 0 or month_data["mpf"] > 0):
-					source_month = month_key
-					break
-		
-		# If we found a month with data, copy its data to ALL months
-		if source_month:
-			source_data = monthly_data[source_month]
-			# Calculate totals for source month
-			source_data["total"] = (
-				source_data["basic"] + source_data["da"] + source_data["fixall"] +
-				source_data["ta"] + source_data["house_rent"]
-			)
-			source_data["savings_total"] = (
-				source_data["grinsur"] + source_data["lic"] + source_data["mpf"]
-			)
-			
-			# Copy to ALL months (including source month to ensure consistency)
-			for month_key in monthly_data.keys():
-				monthly_data[month_key]["basic"] = source_data["basic"]
-				monthly_data[month_key]["da"] = source_data["da"]
-				monthly_data[month_key]["ta"] = source_data["ta"]
-				monthly_data[month_key]["house_rent"] = source_data["house_rent"]
-				monthly_data[month_key]["grinsur"] = source_data["grinsur"]
-				monthly_data[month_key]["lic"] = source_data["lic"]
-				monthly_data[month_key]["mpf"] = source_data["mpf"]
-				# FixAll is already set to 40 for all
-				# Copy monthly totals
-				monthly_data[month_key]["total"] = source_data["total"]
-				monthly_data[month_key]["savings_total"] = source_data["savings_total"]
-
-		# Calculate totals and summary
-		# If we copied data, multiply by 12 (number of months)
-		if source_month:
-			source_data = monthly_data[source_month]
-			total_basic = flt(source_data["basic"] * 12, 2)
-			total_da = flt(source_data["da"] * 12, 2)
-			total_fixall = flt(source_data["fixall"] * 12, 2)
-			total_ta = flt(source_data["ta"] * 12, 2)
-			total_house_rent = flt(source_data["house_rent"] * 12, 2)
-			total_grinsur = flt(source_data["grinsur"] * 12, 2)
-			total_lic = flt(source_data["lic"] * 12, 2)
-			total_mpf = flt(source_data["mpf"] * 12, 2)
-		else:
-			total_basic = sum(m["basic"] for m in monthly_data.values())
-			total_da = sum(m["da"] for m in monthly_data.values())
-			total_fixall = sum(m["fixall"] for m in monthly_data.values())
-			total_ta = sum(m["ta"] for m in monthly_data.values())
-			total_house_rent = sum(m["house_rent"] for m in monthly_data.values())
-			total_grinsur = sum(m["grinsur"] for m in monthly_data.values())
-			total_lic = sum(m["lic"] for m in monthly_data.values())
-			total_mpf = sum(m["mpf"] for m in monthly_data.values())
-
-		total_earnings = total_basic + total_da + total_fixall + total_ta + total_house_rent
-		
-		# Less Std Dedn = 50000 for all
-		less_std_dedn = 50000.0
-		
-		# IncomeSal head = total - less std dedn
-		income_sal_head = total_earnings - less_std_dedn
+		row["_months"] = {"base": dict(zip(HEADS, base, strict=True)), "overrides": overrides}
+		row["_months_keys"] = months_keys
+		data.append(row)
 
-		# Total savings = Grinsur + LIC + MPF
-		total_savings = total_grinsur + total_lic + total_mpf
+	return data
 
-		# Qualifying amount = total savings with limit of 150000
-		qualifying_amt = min(total_savings, 150000.0)
 
-		# Taxable income = IncomeSal head - Qualifying amount
-		taxable_income = income_sal_head - qualifying_amt
+def get_component_columns(company, facts):
+	"""Map each statement head to its component column in ``facts``.
 
-		# Get current month (use source month if we copied data, otherwise find last month with data)
-		current_month_key = source_month if source_month else None
-		if not current_month_key:
-			for month_key in sorted(monthly_data.keys(), reverse=True):
-				if monthly_data[month_key]["basic"] > 0:
-					current_month_key = month_key
-					break
+	Components come from the company's Payroll Component Role mapping, falling
+	back to alias matching for roles it does not set. Returns
+	``(components, earning_columns, house_rent_columns, deduction_columns)``; a
+	head whose component is not on any slip maps to ``None`` and reads as 0.
+	"""
+	roles = ("basic", "da", "ta", *HOUSE_RENT_PARTS, "group_insurance", "lic", "pf_employee")
+	components = get_component_roles(company, facts, roles)
 
-		# Calculate months passed from April to current month
-		if current_month_key:
-			months_passed = get_months_passed(from_date, current_month_key)
-		else:
-			months_passed = 12
-
-		# Tax payable = 12 * current_month_income_tax (from source month or last month with data)
-		# Get the tax from the source month (the one we found with data)
-		if source_month:
-			current_month_tax = monthly_data[source_month].get("current_month_income_tax", 0.0)
-		elif current_month_key:
-			current_month_tax = monthly_data[current_month_key].get("current_month_income_tax", 0.0)
-		else:
-			current_month_tax = 0.0
-		
-		tax_payable = flt(current_month_tax * 12, 2)
-
-		# Itax paid = months_passed (from April to current month) * current_month_income_tax
-		itax_paid = flt(months_passed * current_month_tax, 2)
-
-		# Bal to pay = tax payable - itax paid
-		bal_to_pay = flt(tax_payable - itax_paid, 2)
-
-		# New Mly Dedn = bal to pay / remaining months in FY
-		remaining_months = max(1, 12 - months_passed)
-		new_mly_dedn = flt(bal_to_pay / remaining_months, 2)
-
-		# Build row data
-		row = {
-			"employee": employee,
-			"employee_name": employee_name,
-			"total_basic": total_basic,
-			"total_da": total_da,
-			"total_fixall": total_fixall,
-			"total_ta": total_ta,
-			"total_house_rent": total_house_rent,
-			"total_earnings": total_earnings,
-			"less_std_dedn": less_std_dedn,
-			"income_sal_head": income_sal_head,
-			"total_grinsur": total_grinsur,
-			"total_lic": total_lic,
-			"total_mpf": total_mpf,
-			"total_savings": total_savings,
-			"qualifying_amt": qualifying_amt,
-			"taxable_income": taxable_income,
-			"tax_payable": tax_payable,
-			"itax_paid": itax_paid,
-			"bal_to_pay": bal_to_pay,
-			"new_mly_dedn": new_mly_dedn,
-			"_months_data": monthly_data,  # Store monthly data for HTML template
-			"_months_keys": list(months.keys()),  # Store month keys in order
-		}
-
-		# Add monthly data as separate fields for easier access in HTML
-		for month_key, month_label in months.items():
-			month_data = monthly_data.get(month_key, {})
-			row[f"basic_{month_key}"] = month_data.get("basic", 0.0)
-			row[f"da_{month_key}"] = month_data.get("da", 0.0)
-			row[f"fixall_{month_key}"] = month_data.get("fixall", 0.0)
-			row[f"ta_{month_key}"] = month_data.get("ta", 0.0)
-			row[f"house_rent_{month_key}"] = month_data.get("house_rent", 0.0)
-			# Use pre-calculated total if available, otherwise calculate
-			if "total" in month_data:
-				row[f"total_{month_key}"] = month_data.get("total", 0.0)
-			else:
-				row[f"total_{month_key}"] = (
-					month_data.get("basic", 0.0) +
-					month_data.get("da", 0.0) +
-					month_data.get("fixall", 0.0) +
-					month_data.get("ta", 0.0) +
-					month_data.get("house_rent", 0.0)
-				)
-			row[f"grinsur_{month_key}"] = month_data.get("grinsur", 0.0)
-			row[f"lic_{month_key}"] = month_data.get("lic", 0.0)
-			row[f"mpf_{month_key}"] = month_data.get("mpf", 0.0)
-			# Use pre-calculated savings_total if available
-			if "savings_total" in month_data:
-				row[f"savings_total_{month_key}"] = month_data.get("savings_total", 0.0)
-			else:
-				row[f"savings_total_{month_key}"] = (
-					month_data.get("grinsur", 0.0) +
-					month_data.get("lic", 0.0) +
-					month_data.get("mpf", 0.0)
-				)
+	def column(role):
+		return facts.component_index.get(components.get(role))
 
-		data.append(row)
+	earning_columns = {head: column(head) for head in ("basic", "da", "ta")}
 
-	return columns, data
+	house_rent_columns = [
+		(components[part], column(part)) for part in HOUSE_RENT_PARTS if components.get(part)
+	]
 
+	deduction_columns = {
+		"grinsur": column("group_insurance"),
+		"lic": column("lic"),
+		"mpf": column("pf_employee"),
+	}
 
-def get_actual_component_names(salary_slips, ss_earning_map, ss_ded_map):
-	"""Get actual component names from salary slips by searching for keywords."""
-	actual_components = {}
-	
-	# Collect all unique component names from all salary slips
-	all_earnings = set()
-	all_deductions = set()
-	
-	for ss in salary_slips:
-		earnings_map = ss_earning_map.get(ss.name, {})
-		deductions_map = ss_ded_map.get(ss.name, {})
-		all_earnings.update(earnings_map.keys())
-		all_deductions.update(deductions_map.keys())
-	
-	# Find Basic - search for exact match first, then partial
-	for comp in all_earnings:
-		comp_lower = comp.lower().strip()
-		if comp_lower in ["basic", "basic salary"]:
-			actual_components["basic"] = comp
-			break
-	if "basic" not in actual_components:
-		for comp in all_earnings:
-			comp_lower = comp.lower().strip()
-			if "basic" in comp_lower:
-				actual_components["basic"] = comp
-				break
-	
-	# Find DA (Dearness Allowance)
-	for comp in all_earnings:
-		comp_lower = comp.lower().strip()
-		if "dearness" in comp_lower:
-			actual_components["da"] = comp
-			break
-	if "da" not in actual_components:
-		for comp in all_earnings:
-			comp_lower = comp.lower().strip()
-			if comp_lower == "da" or comp_lower.startswith("da "):
-				actual_components["da"] = comp
-				break
-	
-	# Find TA (Travel Allowance)
-	for comp in all_earnings:
-		comp_lower = comp.lower().strip()
-		if "travel" in comp_lower:
-			actual_components["ta"] = comp
-			break
-	if "ta" not in actual_components:
-		for comp in all_earnings:
-			comp_lower = comp.lower().strip()
-			if comp_lower == "ta" or comp_lower.startswith("ta "):
-				actual_components["ta"] = comp
-				break
-	
-	# Find House Rent components - check both earnings and deductions
-	all_components = list(all_earnings) + list(all_deductions)
-	
-	# House Rent - search for various patterns
-	for comp in all_components:
-		comp_lower = comp.lower().strip()
-		if (("house" in comp_lower and "rent" in comp_lower) or 
-			comp_lower in ["hra", "house rent", "h.rent", "h rent"] or
-			comp_lower.startswith("house rent") or comp_lower.startswith("h.rent")):
-			actual_components["house_rent"] = comp
-			break
-	
-	# Water - search for water charges, water, etc.
-	for comp in all_components:
-		comp_lower = comp.lower().strip()
-		if ("water" in comp_lower or comp_lower.startswith("w.") or 
-			comp_lower == "w" or "water charge" in comp_lower):
-			actual_components["water"] = comp
-			break
-	
-	# Garbage - search for garbage, garbage maintainence, etc.
-	for comp in all_components:
-		comp_lower = comp.lower().strip()
-		if ("garbage" in comp_lower or "garb" in comp_lower or
-			comp_lower.startswith("g.") or comp_lower == "g"):
-			actual_components["garbage"] = comp
-			break
-	
-	# Servant - search for servant charge, servant, etc.
-	for comp in all_components:
-		comp_lower = comp.lower().strip()
-		if ("servant" in comp_lower or comp_lower.startswith("serv") or
-			comp_lower.startswith("s.") or comp_lower == "s"):
-			actual_components["servant"] = comp
-			break
-	
-	# Parking - search for parking charge, parking, etc.
-	for comp in all_components:
-		comp_lower = comp.lower().strip()
-		if ("parking" in comp_lower or comp_lower.startswith("park") or
-			comp_lower.startswith("p.") or comp_lower == "p"):
-			actual_components["parking"] = comp
-			break
-	
-	return actual_components
-
-
-def get_component_amount_exact(component_map, component_names):
-	"""Sum amounts for any components that match exactly the provided names."""
-	total = 0.0
-	for name in component_names:
-		if name in component_map:
-			total += flt(component_map[name])
-	return total
-
-
-def get_component_amount(component_map, component_names):
-	"""Get amount for a component, trying multiple name variations."""
-	for comp in component_names:
-		if comp in component_map:
-			return flt(component_map[comp])
-		# Try case-insensitive match
-		for key in component_map.keys():
-			if key.lower() == comp.lower():
-				return flt(component_map[key])
-			# Try partial match
-			if comp.lower() in key.lower() or key.lower() in comp.lower():
-				return flt(component_map[key])
-	return 0.0
-
-
-def get_component_amount_by_keywords(component_map, keywords):
-	"""Sum all components whose names contain ALL keywords (case-insensitive)."""
-	total = 0.0
-	for key, val in component_map.items():
-		key_l = key.lower()
-		if all(k.lower() in key_l for k in keywords):
-			total += flt(val)
-	return total
+	return components, earning_columns, house_rent_columns, deduction_columns
 
 
 def get_financial_year_months(from_date, to_date):
@@ -621,10 +355,10 @@ def get_columns(months):
 		},
 	]
 
-	# Store months in a special field for HTML template
+	# Store compact monthly values in a special field for HTML template
 	columns.append({
 		"label": _("Months Data"),
-		"fieldname": "_months_data",
+		"fieldname": "_months",
 		"fieldtype": "Data",
 		"hidden": 1,
 	})
@@ -654,52 +388,3 @@ def get_columns(months):
 	columns.extend(summary_columns)
 
 	return columns
-
-
-def get_salary_slips(filters, from_date, to_date):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-	else:
-		query = query.where(salary_slip.docstatus == 1)
-
-	query = query.where(salary_slip.start_date >= from_date)
-	query = query.where(salary_slip.end_date <= to_date)
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
-	return query.run(as_dict=1) or []
-
-
-def get_salary_slip_details(salary_slips, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where(
-			(salary_detail.parent.isin(salary_slips))
-			& (salary_detail.parentfield == component_type)
-		)
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-		)
-	).run(as_dict=1)
-
-	ss_map = {}
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
@@ -54,5 +54,8 @@ frappe.query_reports["Bank Payment Sheet"] = {
 			default: "Submitted",
 		},
 	],
-};
 
+	onload(report) {
+		gvm_payroll.reports.add_export_buttons(report, "Bank Payment Sheet");
+	},
+};
@@ -1,11 +1,30 @@
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate, nowdate
-
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
-
-
+from frappe.utils import cint, flt, getdate, nowdate
+
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_earning_and_deduction_types
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	DEFAULT_PAGE_SIZE,
+	get_component_names,
+	get_component_totals,
+	get_salary_slip_facts,
+	iter_salary_slip_facts,
+)
+
+SALARY_SLIP_FIELDS = (
+	"employee",
+	"employee_name",
+	"bank_account_no",
+	"pan_number",
+	"gross_pay",
+	"total_deduction",
+	"total_loan_repayment",
+	"net_pay",
+)
+
+
+@track_report_fetch("Bank Payment Sheet")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -14,20 +33,22 @@ def execute(filters=None):
 	if not company:
 		frappe.throw(_("Company is required"))
 
-	salary_slips = get_salary_slips(filters)
-	if not salary_slips:
+	facts = get_salary_slip_facts(get_slip_filters(filters), SALARY_SLIP_FIELDS)
+	if not facts:
 		return [], []
 
-	earning_types, ded_types = get_earning_and_deduction_types(salary_slips)
+	earning_types, ded_types = get_earning_and_deduction_types(facts.component_names())
 	columns = get_columns(earning_types, ded_types)
 
-	ss_earning_map = get_salary_slip_details(salary_slips, "earnings")
-	ss_ded_map = get_salary_slip_details(salary_slips, "deductions")
+	data = list(get_rows(facts, earning_types, ded_types))
+	return columns, data
+
 
-	data = []
-	for idx, ss in enumerate(salary_slips, start=1):
+def get_rows(facts, earning_types, ded_types, start=0):
+	"""Yield the report row of every slip in ``facts``, numbered from ``start + 1``."""
+	for slip_idx, ss in facts.iter_slips():
 		row = {
-			"idx": idx,
+			"idx": start + slip_idx + 1,
 			"employee": ss.employee,
 			"employee_name": ss.employee_name,
 			"bank_account_no": ss.bank_account_no,
@@ -40,30 +61,35 @@ def execute(filters=None):
 		}
 
 		for e in earning_types:
-			amt = ss_earning_map.get(ss.name, {}).get(e)
+			amt = facts.get(slip_idx, e, "earnings")
 			if amt:
 				row["earnings"].append({"label": e, "amount": flt(amt)})
 			row[frappe.scrub(e)] = amt
 
 		for d in ded_types:
-			amt = ss_ded_map.get(ss.name, {}).get(d)
+			amt = facts.get(slip_idx, d, "deductions")
 			if amt:
 				row["deductions"].append({"label": d, "amount": flt(amt)})
 			row[frappe.scrub(d)] = amt
 
-		data.append(row)
-
-	return columns, data
+		yield row
 
 
-def get_earning_and_deduction_types(salary_slips):
-	salary_component_and_type = {_("Earning"): [], _("Deduction"): []}
+def get_export(filters, page_size=None):
+	"""Columns and a row generator for the streaming export, one page of slips in memory at a time."""
+	slip_filters = get_slip_filters(filters)
+	components = get_component_totals(slip_filters)
+	earning_types, ded_types = get_earning_and_deduction_types(get_component_names(components.present))
+	return get_columns(earning_types, ded_types), iter_rows(slip_filters, earning_types, ded_types, page_size)
 
-	for salary_component in get_salary_components(salary_slips):
-		component_type = get_salary_component_type(salary_component)
-		salary_component_and_type[_(component_type)].append(salary_component)
 
-	return sorted(salary_component_and_type[_("Earning")]), sorted(salary_component_and_type[_("Deduction")])
+def iter_rows(slip_filters, earning_types, ded_types, page_size=None):
+	start = 0
+	for facts in iter_salary_slip_facts(
+		slip_filters, SALARY_SLIP_FIELDS, page_size=cint(page_size) or DEFAULT_PAGE_SIZE
+	):
+		yield from get_rows(facts, earning_types, ded_types, start)
+		start += len(facts)
 
 
 def get_columns(earning_types, ded_types):
@@ -106,74 +132,10 @@ def get_columns(earning_types, ded_types):
 	return columns
 
 
-def get_salary_components(salary_slips):
-	return (
-		frappe.qb.from_(salary_detail)
-		.where((salary_detail.amount != 0) & (salary_detail.parent.isin([d.name for d in salary_slips])))
-		.select(salary_detail.salary_component)
-		.distinct()
-	).run(pluck=True)
-
-
-def get_salary_component_type(salary_component):
-	return frappe.db.get_value("Salary Component", salary_component, "type", cache=True)
-
-
-def get_salary_slips(filters):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(
-		salary_slip.star
+def get_slip_filters(filters):
+	"""Default the period to today when the filters leave it open."""
+	return frappe._dict(
+		filters,
+		from_date=getdate(filters.get("from_date") or nowdate()),
+		to_date=getdate(filters.get("to_date") or nowdate()),
 	)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-	else:
-		query = query.where(salary_slip.docstatus == 1)
-
-	from_date = getdate(filters.get("from_date") or nowdate())
-	to_date = getdate(filters.get("to_date") or nowdate())
-
-	query = query.where(salary_slip.start_date >= from_date).where(salary_slip.end_date <= to_date)
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def get_salary_slip_details(salary_slips, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where((salary_detail.parent.isin(salary_slips)) & (salary_detail.parentfield == component_type))
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-		)
-	).run(as_dict=1)
-
-	ss_map = {}
-
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
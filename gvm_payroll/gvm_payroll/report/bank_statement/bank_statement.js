@@ -27,5 +27,50 @@ frappe.query_reports["Bank Statement"] = {
 			fieldtype: "Data",
 		},
 	],
+
+	onload(report) {
+		report.page.add_inner_button(__("Bank Payment File"), () => open_bank_payment_file_dialog(report));
+	},
 };
 
+function open_bank_payment_file_dialog(report) {
+	const filters = report.get_values();
+	if (!filters) return;
+	if (!filters.bank_name) {
+		frappe.msgprint(__("Set the Bank Name filter to build its payment file"));
+		return;
+	}
+
+	const d = new frappe.ui.Dialog({
+		title: __("Bank Payment File for {0}", [filters.bank_name]),
+		fields: [
+			{
+				fieldname: "payment_type",
+				fieldtype: "Select",
+				label: __("Payment Type"),
+				options: ["", "NEFT", "RTGS"],
+				description: __("Leave empty to pay by RTGS from 2,00,000 and by NEFT below it"),
+			},
+			{
+				fieldname: "value_date",
+				fieldtype: "Date",
+				label: __("Value Date"),
+				default: frappe.datetime.get_today(),
+				reqd: 1,
+			},
+			{
+				fieldname: "debit_account",
+				fieldtype: "Data",
+				label: __("Debit Account No"),
+			},
+		],
+		primary_action_label: __("Download"),
+		primary_action(values) {
+			open_url_post("/api/method/gvm_payroll.gvm_payroll.api.bank_payment_file.download_bank_payment_file", {
+				filters: JSON.stringify({ ...filters, ...values }),
+			});
+			d.hide();
+		},
+	});
+	d.show();
+}
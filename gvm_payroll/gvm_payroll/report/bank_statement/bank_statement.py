@@ -1,7 +1,21 @@
 import frappe
 from frappe.utils import getdate, nowdate
 
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_salary_slip_facts, salary_slip
 
+SALARY_SLIP_FIELDS = (
+	"employee",
+	"employee_name",
+	"bank_name",
+	"bank_account_no",
+	"rounded_total",
+	"net_pay",
+	"posting_date",
+)
+
+
+@track_report_fetch("Bank Statement")
 def execute(filters=None):
 	filters = filters or {}
 
@@ -11,31 +25,18 @@ def execute(filters=None):
 	bank_name_filter = filters.get("bank_name")
 
 	# Use both posting_date and pay-period dates to avoid slips outside the range.
-	slip_filters = {
-		"docstatus": 1,
-		"posting_date": ["between", [from_date, to_date]],
-		"start_date": [">=", from_date],
-		"end_date": ["<=", to_date],
-	}
-	if company:
-		slip_filters["company"] = company
+	slip_filters = frappe._dict(company=company, from_date=from_date, to_date=to_date)
+	conditions = []
 	if bank_name_filter:
-		slip_filters["bank_name"] = bank_name_filter
+		conditions.append(salary_slip.bank_name == bank_name_filter)
 
-	slips = frappe.get_all(
-		"Salary Slip",
-		fields=[
-			"name",
-			"employee",
-			"employee_name",
-			"bank_name",
-			"bank_account_no",
-			"rounded_total",
-			"net_pay",
-			"posting_date",
-		],
-		filters=slip_filters,
-		order_by="employee asc",
+	facts = get_salary_slip_facts(
+		slip_filters,
+		SALARY_SLIP_FIELDS,
+		parentfields=(),
+		by_posting_date=True,
+		conditions=conditions,
+		order_by="employee",
 	)
 
 	columns = [
@@ -48,7 +49,8 @@ def execute(filters=None):
 
 	data = []
 	total = 0
-	for idx, slip in enumerate(slips, start=1):
+	for slip_idx, slip in facts.iter_slips():
+		idx = slip_idx + 1
 		amount = slip.rounded_total or slip.net_pay or 0
 		total += amount
 		data.append(
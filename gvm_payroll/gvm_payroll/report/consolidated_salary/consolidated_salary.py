@@ -4,10 +4,11 @@ from frappe.utils import flt, getdate, formatdate
 from datetime import datetime
 import erpnext
 
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_component_totals
 
 
+@track_report_fetch("Consolidated Salary")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -19,13 +20,20 @@ def execute(filters=None):
 	currency = filters.get("currency")
 	company_currency = erpnext.get_company_currency(company)
 
-	salary_slips = get_salary_slips(filters)
-	if not salary_slips:
+	slip_filters = get_slip_filters(filters)
+	# Per-component sums come back from one GROUP BY query; no detail row is loaded.
+	# The Payroll Monthly Ledger has no posting date, so this report always reads the slips.
+	components = get_component_totals(
+		slip_filters,
+		apply_exchange_rate=currency == company_currency,
+		period="overlap",
+		by_posting_date=True,
+	)
+	if not any(components.totals.values()):
 		return [], []
 
-	# Aggregate earnings and deductions by component
-	earnings = aggregate_components(salary_slips, "earnings", currency, company_currency)
-	deductions = aggregate_components(salary_slips, "deductions", currency, company_currency)
+	earnings = components.totals["earnings"]
+	deductions = components.totals["deductions"]
 
 	# Sort components alphabetically
 	earnings_sorted = dict(sorted(earnings.items()))
@@ -80,19 +88,19 @@ def execute(filters=None):
 		"deduction_amount": net_pay,
 	})
 
-	# Store metadata for print format
-	for row in rows:
-		row["_meta"] = {
-			"company": company,
-			"month": month or "",
-			"year": year or "",
-			"currency": currency or company_currency,
-			"total_earnings": total_earnings,
-			"total_deductions": total_deductions,
-			"net_pay": net_pay,
-			"earnings": [{"name": k, "amount": v} for k, v in earnings_sorted.items()],
-			"deductions": [{"name": k, "amount": v} for k, v in deductions_sorted.items()],
-		}
+	# Metadata for the print format, sent once on the Net Pay row. Readers look
+	# for the row that has it, so sorting the report does not lose it.
+	rows[-1]["_meta"] = {
+		"company": company,
+		"month": month or "",
+		"year": year or "",
+		"currency": currency or company_currency,
+		"total_earnings": total_earnings,
+		"total_deductions": total_deductions,
+		"net_pay": net_pay,
+		"earnings": [{"name": k, "amount": v} for k, v in earnings_sorted.items()],
+		"deductions": [{"name": k, "amount": v} for k, v in deductions_sorted.items()],
+	}
 
 	columns = get_columns()
 	return columns, rows
@@ -119,9 +127,16 @@ def get_print_format_html(report_name, filters=None, data=None):
 		import json
 		data = json.loads(data)
 	
+	data = data or []
+	meta = get_print_meta(data)
+	if data:
+		# Print formats written against the first row keep working
+		data[0]["_meta"] = meta
+
 	# Prepare context
 	context = {
-		"data": data or [],
+		"data": data,
+		"meta": meta,
 		"filters": filters or {},
 		"frappe": frappe,
 	}
@@ -133,73 +148,21 @@ def get_print_format_html(report_name, filters=None, data=None):
 	return f"<style>{css}</style>{html}"
 
 
-def get_salary_slips(filters):
-	query = (
-		frappe.qb.from_(salary_slip)
-		.select(salary_slip.name, salary_slip.company, salary_slip.start_date, salary_slip.end_date)
-		.where(salary_slip.docstatus == 1)
-	)
+def get_print_meta(data):
+	"""The print metadata ``execute`` puts on one row, wherever sorting has moved that row."""
+	return next((row["_meta"] for row in data if row.get("_meta")), {})
 
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters["company"])
 
+def get_slip_filters(filters):
+	"""Submitted slips posted in, and overlapping, the selected range."""
+	slip_filters = frappe._dict(filters, docstatus=None)
 	if filters.get("from_date") and filters.get("to_date"):
-		from_date = getdate(filters["from_date"])
-		to_date = getdate(filters["to_date"])
-		query = query.where(
-			(salary_slip.posting_date >= from_date) & (salary_slip.posting_date <= to_date)
-		)
-		query = query.where(
-			(salary_slip.start_date <= to_date) & (salary_slip.end_date >= from_date)
-		)
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters["employee"])
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def aggregate_components(salary_slips, component_type, currency, company_currency):
-	"""Aggregate salary components across all salary slips"""
-	salary_slip_names = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where(
-			(salary_detail.parent.isin(salary_slip_names))
-			& (salary_detail.parentfield == component_type)
-		)
-		.select(
-			salary_detail.salary_component,
-			salary_detail.amount,
-			salary_slip.exchange_rate,
-		)
-	).run(as_dict=1)
-
-	component_map = {}
-	for d in result:
-		component_name = d.salary_component
-		amount = flt(d.amount)
-		
-		# Handle currency conversion
-		if currency == company_currency:
-			amount = amount * flt(d.exchange_rate if d.exchange_rate else 1)
-		
-		component_map.setdefault(component_name, 0.0)
-		component_map[component_name] += amount
-
-	return component_map
+		slip_filters.from_date = getdate(filters["from_date"])
+		slip_filters.to_date = getdate(filters["to_date"])
+	else:
+		slip_filters.from_date = slip_filters.to_date = None
+
+	return slip_filters
 
 
 def get_columns():
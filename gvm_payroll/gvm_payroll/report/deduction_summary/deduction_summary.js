@@ -60,6 +60,15 @@ frappe.query_reports["Deduction Summary"] = {
 			options: ["Draft", "Submitted", "Cancelled"],
 			default: "Submitted",
 		},
+		{
+			fieldname: "use_ledger",
+			label: __("Use Payroll Ledger"),
+			fieldtype: "Check",
+			default: 0,
+		},
 	],
-};
 
+	onload(report) {
+		gvm_payroll.reports.add_export_buttons(report, "Deduction Summary");
+	},
+};
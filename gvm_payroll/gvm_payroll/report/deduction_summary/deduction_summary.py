@@ -1,12 +1,25 @@
 import frappe
 from frappe import _
-from frappe.utils import flt
-
-
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
-
-
+from frappe.utils import cint, flt
+
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_earning_and_deduction_types
+from gvm_payroll.gvm_payroll.utils.employee_details import get_employee_values
+from gvm_payroll.gvm_payroll.utils.payroll_ledger import get_ledger_facts, use_payroll_ledger
+from gvm_payroll.gvm_payroll.utils.report_cache import cache_report_result
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	DEFAULT_PAGE_SIZE,
+	get_component_names,
+	get_component_totals,
+	get_salary_slip_facts,
+	iter_salary_slip_facts,
+)
+
+SALARY_SLIP_FIELDS = ("employee", "employee_name", "total_deduction", "total_loan_repayment")
+
+
+@track_report_fetch("Deduction Summary")
+@cache_report_result("Deduction Summary")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -15,20 +28,27 @@ def execute(filters=None):
 	if not company:
 		frappe.throw(_("Company is required"))
 
-	salary_slips = get_salary_slips(filters)
-	if not salary_slips:
+	if use_payroll_ledger(filters):
+		facts = get_ledger_facts(filters, SALARY_SLIP_FIELDS, parentfields=("deductions",))
+	else:
+		facts = get_salary_slip_facts(filters, SALARY_SLIP_FIELDS, parentfields=("deductions",))
+	if not facts:
 		return [], []
 
-	ded_types = get_deduction_types(salary_slips)
+	ded_types = get_deduction_types(facts)
 	columns = get_columns(ded_types)
 
-	ss_ded_map = get_salary_slip_details(salary_slips, "deductions")
-	emp_pan_map = get_employee_pan_map()
+	data = list(get_rows(facts, ded_types))
+	return columns, data
 
-	data = []
-	for idx, ss in enumerate(salary_slips, start=1):
+
+def get_rows(facts, ded_types, start=0):
+	"""Yield the report row of every slip in ``facts``, numbered from ``start + 1``."""
+	emp_pan_map = get_employee_values(facts.column("employee"), "pan_number")
+
+	for slip_idx, ss in facts.iter_slips():
 		row = {
-			"idx": idx,
+			"idx": start + slip_idx + 1,
 			"employee": ss.employee,
 			"employee_name": ss.employee_name,
 			"pan_number": emp_pan_map.get(ss.employee),
@@ -36,20 +56,38 @@ def execute(filters=None):
 		}
 
 		for d in ded_types:
-			row.update({frappe.scrub(d): ss_ded_map.get(ss.name, {}).get(d)})
+			row.update({frappe.scrub(d): facts.get(slip_idx, d, "deductions")})
 
-		data.append(row)
+		yield row
 
-	return columns, data
+
+def get_export(filters, page_size=None):
+	"""Columns and a row generator for the streaming export, one page of slips in memory at a time."""
+	if use_payroll_ledger(filters):
+		# Ledger rows are already one per employee and month
+		columns, data = execute(filters)
+		return columns, iter(data)
+
+	components = get_component_totals(filters, parentfields=("deductions",))
+	_earnings, ded_types = get_earning_and_deduction_types(get_component_names(components.present))
+	return get_columns(ded_types), iter_rows(filters, ded_types, page_size)
 
 
-def get_deduction_types(salary_slips):
-	salary_component_and_type = []
-	for salary_component in get_salary_components(salary_slips):
-		component_type = get_salary_component_type(salary_component)
-		if _(component_type) == _("Deduction"):
-			salary_component_and_type.append(salary_component)
-	return sorted(salary_component_and_type)
+def iter_rows(filters, ded_types, page_size=None):
+	start = 0
+	for facts in iter_salary_slip_facts(
+		filters,
+		SALARY_SLIP_FIELDS,
+		page_size=cint(page_size) or DEFAULT_PAGE_SIZE,
+		parentfields=("deductions",),
+	):
+		yield from get_rows(facts, ded_types, start)
+		start += len(facts)
+
+
+def get_deduction_types(facts):
+	_earnings, deductions = get_earning_and_deduction_types(facts.component_names("deductions"))
+	return deductions
 
 
 def get_columns(ded_types):
@@ -101,88 +139,3 @@ def get_columns(ded_types):
 	)
 
 	return columns
-
-
-def get_salary_components(salary_slips):
-	return (
-		frappe.qb.from_(salary_detail)
-		.where(
-			(salary_detail.amount != 0)
-			& (salary_detail.parent.isin([d.name for d in salary_slips]))
-			& (salary_detail.parentfield == "deductions")
-		)
-		.select(salary_detail.salary_component)
-		.distinct()
-	).run(pluck=True)
-
-
-def get_salary_component_type(salary_component):
-	return frappe.db.get_value("Salary Component", salary_component, "type", cache=True)
-
-
-def get_salary_slips(filters):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-	else:
-		query = query.where(salary_slip.docstatus == 1)
-
-	if filters.get("from_date"):
-		query = query.where(salary_slip.start_date >= filters.get("from_date"))
-
-	if filters.get("to_date"):
-		query = query.where(salary_slip.end_date <= filters.get("to_date"))
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def get_employee_pan_map():
-	employee = frappe.qb.DocType("Employee")
-	result = (frappe.qb.from_(employee).select(employee.name, employee.pan_number)).run()
-	return frappe._dict(result)
-
-
-def get_salary_slip_details(salary_slips, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where(
-			(salary_detail.parent.isin(salary_slips))
-			& (salary_detail.parentfield == component_type)
-		)
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-		)
-	).run(as_dict=1)
-
-	ss_map = {}
-
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
@@ -2,10 +2,16 @@ import frappe
 from frappe import _
 from frappe.utils import flt, getdate, formatdate
 
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_component_columns
+from gvm_payroll.gvm_payroll.utils.report_cache import cache_report_result
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_salary_slip_facts
 
+SALARY_SLIP_FIELDS = ("employee", "employee_name")
 
+
+@track_report_fetch("ESI Report")
+@cache_report_result("ESI Report")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -14,18 +20,12 @@ def execute(filters=None):
 	if not company:
 		frappe.throw(_("Company is required"))
 
-	salary_slips = get_salary_slips(filters)
-	if not salary_slips:
+	facts = get_salary_slip_facts(filters, SALARY_SLIP_FIELDS)
+	if not facts:
 		return [], []
 
-	# Fetch earnings and deductions separately
-	ss_earning_map = get_salary_slip_details(salary_slips, "earnings")
-	ss_ded_map = get_salary_slip_details(salary_slips, "deductions")
-
-	# Salary Components (exact names)
-	BASIC_COMPONENT = "Basic Salary"
-	ESI_EMPLOYEE_COMPONENT = "ESI - Employee Contribution"
-	ESI_EMPLOYER_COMPONENT = "ESI-Employer Contribution"
+	# Salary Component columns for Basic and both ESI contributions
+	component_columns = get_component_columns(company, facts, ("basic", "esi_ee", "esi_er"))
 
 	columns = get_columns()
 
@@ -35,22 +35,17 @@ def execute(filters=None):
 	total_esi_employer = 0.0
 	total_all = 0.0
 
-	for idx, ss in enumerate(salary_slips, start=1):
+	for slip_idx, ss in facts.iter_slips():
+		idx = slip_idx + 1
 
 		# Basic Salary (from earnings, NOT part of total)
-		basic_amount = flt(
-			ss_earning_map.get(ss.name, {}).get(BASIC_COMPONENT, 0)
-		)
+		basic_amount = flt(facts.amount_at(slip_idx, component_columns["basic"], "earnings"))
 
 		# ESI Employee Contribution (from deductions)
-		esi_employee_amount = flt(
-			ss_ded_map.get(ss.name, {}).get(ESI_EMPLOYEE_COMPONENT, 0)
-		)
+		esi_employee_amount = flt(facts.amount_at(slip_idx, component_columns["esi_ee"], "deductions"))
 
 		# ESI Employer Contribution (from earnings)
-		esi_employer_amount = flt(
-			ss_earning_map.get(ss.name, {}).get(ESI_EMPLOYER_COMPONENT, 0)
-		)
+		esi_employer_amount = flt(facts.amount_at(slip_idx, component_columns["esi_er"], "earnings"))
 
 		# TOTAL = ESI Employee + ESI Employer (Basic excluded)
 		total_amount = esi_employee_amount + esi_employer_amount
@@ -103,66 +98,3 @@ def get_columns():
 		{"label": _("Employer Contribution"), "fieldname": "esi_employer_contribution", "fieldtype": "Currency", "width": 150},
 		{"label": _("Total"), "fieldname": "total", "fieldtype": "Currency", "width": 120},
 	]
-
-
-def get_salary_slips(filters):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-	else:
-		query = query.where(salary_slip.docstatus == 1)
-
-	if filters.get("from_date"):
-		query = query.where(salary_slip.start_date >= filters.get("from_date"))
-
-	if filters.get("to_date"):
-		query = query.where(salary_slip.end_date <= filters.get("to_date"))
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def get_salary_slip_details(salary_slips, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where(
-			(salary_detail.parent.isin(salary_slips))
-			& (salary_detail.parentfield == component_type)
-		)
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-		)
-	).run(as_dict=1)
-
-	ss_map = {}
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
-
-
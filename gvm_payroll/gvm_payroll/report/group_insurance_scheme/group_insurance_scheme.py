@@ -1,12 +1,20 @@
+from bisect import bisect_right
+
 import frappe
 from frappe import _
 from frappe.utils import flt, getdate, formatdate
 
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
+from gvm_payroll.gvm_payroll.utils.component_resolver import get_component_columns
+from gvm_payroll.gvm_payroll.utils.employee_details import EMPLOYEE_CHUNK_SIZE
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import get_salary_slip_facts
+
+SALARY_SLIP_FIELDS = ("employee", "employee_name", "start_date")
+
 salary_structure_assignment = frappe.qb.DocType("Salary Structure Assignment")
 
 
+@track_report_fetch("Group Insurance Scheme")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -15,44 +23,39 @@ def execute(filters=None):
 	if not company:
 		frappe.throw(_("Company is required"))
 
-	salary_slips = get_salary_slips(filters)
-	if not salary_slips:
+	facts = get_salary_slip_facts(filters, SALARY_SLIP_FIELDS, parentfields=("deductions",))
+	if not facts:
 		return [], []
 
-	# Get salary slip details for deductions
-	ss_ded_map = get_salary_slip_details(salary_slips, "deductions")
-
-	# Component name
-	group_insurance_component = "Group Insurance"
+	# Component column, resolved once for the whole run
+	group_insurance_column = get_component_columns(company, facts, ("group_insurance",))["group_insurance"]
 
 	columns = get_columns()
 
-	data = []
-	total_amount = 0.0
+	# Only include employees who have Group Insurance component
+	slips = []
+	for slip_idx, ss in facts.iter_slips():
+		group_insurance_amount = flt(facts.amount_at(slip_idx, group_insurance_column, "deductions"))
+		if group_insurance_amount > 0:
+			slips.append((ss, group_insurance_amount))
 
-	idx = 0
-	for ss in salary_slips:
-		# Get Group Insurance amount from salary slip deductions
-		group_insurance_amount = 0.0
-		if group_insurance_component:
-			group_insurance_amount = flt(ss_ded_map.get(ss.name, {}).get(group_insurance_component, 0))
+	# Policy amounts from Salary Structure Assignment, resolved for all slips at once
+	policy_amounts = get_policy_amounts([(ss.employee, ss.start_date) for ss, _amount in slips])
 
-		# Only include employees who have Group Insurance component
-		if group_insurance_amount > 0:
-			idx += 1
-			# Get Policy amount from Salary Structure Assignment
-			policy_amount = get_policy_amount(ss.employee, ss.start_date)
+	data = []
+	total_amount = 0.0
 
-			row = frappe._dict({
-				"idx": idx,
-				"employee": ss.employee,
-				"employee_name": ss.employee_name,
-				"policy_amount": policy_amount,
-				"amount": group_insurance_amount,
-			})
+	for idx, (ss, group_insurance_amount) in enumerate(slips, start=1):
+		row = frappe._dict({
+			"idx": idx,
+			"employee": ss.employee,
+			"employee_name": ss.employee_name,
+			"policy_amount": policy_amounts.get((ss.employee, ss.start_date), 0.0),
+			"amount": group_insurance_amount,
+		})
 
-			data.append(row)
-			total_amount += group_insurance_amount
+		data.append(row)
+		total_amount += group_insurance_amount
 
 	# Store metadata in first row for print format
 	if data:
@@ -86,84 +89,51 @@ def get_columns():
 	]
 
 
-def get_salary_slips(filters):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-	else:
-		query = query.where(salary_slip.docstatus == 1)
-
-	if filters.get("from_date"):
-		query = query.where(salary_slip.start_date >= filters.get("from_date"))
-
-	if filters.get("to_date"):
-		query = query.where(salary_slip.end_date <= filters.get("to_date"))
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def get_salary_slip_details(salary_slips, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where(
-			(salary_detail.parent.isin(salary_slips))
-			& (salary_detail.parentfield == component_type)
-		)
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
+def get_policy_amounts(keys):
+	"""custom_group_insurance_amount from the Salary Structure Assignment in force for each (employee, date).
+
+	All submitted assignments of the employees are fetched in a query per
+	``EMPLOYEE_CHUNK_SIZE`` employees and the one in force on each date is found by bisecting the employee's
+	assignments sorted by from_date.
+	"""
+	keys = {(employee, on_date) for employee, on_date in keys if employee and on_date}
+	if not keys:
+		return {}
+
+	employees = sorted({employee for employee, _date in keys})
+	last_date = max(getdate(on_date) for _employee, on_date in keys)
+
+	# A year of slips can name thousands of employees; keep each IN list bounded
+	assignments = []
+	for start in range(0, len(employees), EMPLOYEE_CHUNK_SIZE):
+		assignments.extend(
+			(
+				frappe.qb.from_(salary_structure_assignment)
+				.select(
+					salary_structure_assignment.employee,
+					salary_structure_assignment.from_date,
+					salary_structure_assignment.custom_group_insurance_amount,
+				)
+				.where(salary_structure_assignment.employee.isin(employees[start : start + EMPLOYEE_CHUNK_SIZE]))
+				.where(salary_structure_assignment.docstatus == 1)
+				.where(salary_structure_assignment.from_date <= last_date)
+				.orderby(salary_structure_assignment.employee)
+				.orderby(salary_structure_assignment.from_date)
+				.orderby(salary_structure_assignment.creation)
+			).run()
 		)
-	).run(as_dict=1)
-
-	ss_map = {}
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
-
-def get_policy_amount(employee, on_date):
-	"""Get custom_group_insurance_amount from Salary Structure Assignment for the employee on the given date"""
-	if not employee or not on_date:
-		return 0.0
-
-	# Get the most recent Salary Structure Assignment for this employee on or before the given date
-	assignment = (
-		frappe.qb.from_(salary_structure_assignment)
-		.select(salary_structure_assignment.custom_group_insurance_amount)
-		.where(salary_structure_assignment.employee == employee)
-		.where(salary_structure_assignment.docstatus == 1)
-		.where(salary_structure_assignment.from_date <= on_date)
-		.orderby(salary_structure_assignment.from_date, order=frappe.qb.desc)
-		.limit(1)
-	).run(as_dict=1)
 
-	if assignment and assignment[0].get("custom_group_insurance_amount"):
-		return flt(assignment[0].get("custom_group_insurance_amount"))
+	# {employee: ([from_date, ...], [amount, ...])} sorted by from_date
+	by_employee = {}
+	for employee, from_date, amount in assignments:
+		dates, amounts = by_employee.setdefault(employee, ([], []))
+		dates.append(getdate(from_date))
+		amounts.append(flt(amount))
 
-	return 0.0
+	policy_amounts = {}
+	for employee, on_date in keys:
+		dates, amounts = by_employee.get(employee, ((), ()))
+		pos = bisect_right(dates, getdate(on_date)) - 1
+		policy_amounts[(employee, on_date)] = amounts[pos] if pos >= 0 else 0.0
 
+	return policy_amounts
@@ -67,6 +67,36 @@ frappe.query_reports["Salary Summary"] = {
 			options: ["Draft", "Submitted", "Cancelled"],
 			default: "Submitted",
 		},
+		{
+			fieldname: "page_size",
+			label: __("Rows per Page"),
+			fieldtype: "Int",
+			description: __("Load the slips one page at a time; 0 loads all of them"),
+			on_change() {
+				// A new page size starts again from the first page
+				frappe.query_report.set_filter_value("after", "");
+			},
+		},
+		{
+			fieldname: "after",
+			label: __("After"),
+			fieldtype: "Data",
+			hidden: 1,
+		},
 	],
-};
 
+	onload(report) {
+		gvm_payroll.reports.follow_prepared_reports();
+
+		report.page.add_inner_button(__("Next Page"), () => {
+			const meta = report.data?.[0]?._meta;
+			if (!meta?.next_cursor) {
+				frappe.show_alert({ message: __("This is the last page"), indicator: "orange" });
+				return;
+			}
+			report.set_filter_value("after", JSON.stringify(meta.next_cursor));
+		});
+		report.page.add_inner_button(__("First Page"), () => report.set_filter_value("after", ""));
+		gvm_payroll.reports.add_export_buttons(report, "Salary Summary");
+	},
+};
@@ -1,14 +1,68 @@
 import frappe
 from frappe import _
-from frappe.utils import flt
+from frappe.query_builder.functions import Coalesce, Count, NullIf, Sum
+from frappe.utils import cint, flt
 
 import erpnext
 
-
-salary_slip = frappe.qb.DocType("Salary Slip")
-salary_detail = frappe.qb.DocType("Salary Detail")
-
-
+from gvm_payroll.gvm_payroll.utils.component_resolver import (
+	get_component_roles,
+	get_earning_and_deduction_types,
+)
+from gvm_payroll.gvm_payroll.utils.employee_details import get_employee_values
+from gvm_payroll.gvm_payroll.utils.prepared_report import prepare_large_report
+from gvm_payroll.gvm_payroll.utils.report_cache import cache_report_result
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import track_report_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	SalarySlipFacts,
+	get_component_names,
+	get_component_totals,
+	get_salary_slip_facts,
+	get_salary_slip_query,
+	iter_salary_slip_facts,
+	salary_slip,
+)
+
+SALARY_SLIP_FIELDS = (
+	"employee",
+	"employee_name",
+	"designation",
+	"total_working_days",
+	"branch",
+	"department",
+	"company",
+	"start_date",
+	"end_date",
+	"leave_without_pay",
+	"absent_days",
+	"payment_days",
+	"total_loan_repayment",
+	"gross_pay",
+	"total_deduction",
+	"net_pay",
+	"exchange_rate",
+)
+
+
+# Keyset of the paged mode; name orders an employee's slips for the same period
+PAGE_ORDER = ("employee", "start_date", "name")
+DEFAULT_PAGE_SIZE = 500
+
+
+def estimate_slip_count(filters):
+	"""Slips a full run reads; the paged mode is bounded already and always runs inline."""
+	if cint(filters.get("page_size")):
+		return 0
+
+	company_currency = erpnext.get_company_currency(filters.get("company"))
+	conditions = get_currency_conditions(filters, company_currency)
+	query = get_salary_slip_query(filters, [], default_docstatus=None, conditions=conditions)
+	return query.select(Count(salary_slip.name)).run()[0][0] or 0
+
+
+@track_report_fetch("Salary Summary")
+@prepare_large_report("Salary Summary", estimate_slip_count)
+@cache_report_result("Salary Summary")
 def execute(filters=None):
 	if not filters:
 		filters = {}
@@ -17,23 +71,37 @@ def execute(filters=None):
 	if not company:
 		frappe.throw(_("Company is required"))
 
-	currency = filters.get("currency")
 	company_currency = erpnext.get_company_currency(company)
 
-	salary_slips = get_salary_slips(filters, company_currency)
-	if not salary_slips:
+	if cint(filters.get("page_size")):
+		return get_page_result(filters, company_currency)
+
+	facts = get_salary_slip_facts(filters, SALARY_SLIP_FIELDS, **get_query_options(filters, company_currency))
+	if not facts:
 		return [], []
 
-	earning_types, ded_types = get_earning_and_deduction_types(salary_slips)
-	columns = get_columns(earning_types, ded_types)
+	earning_types, ded_types = get_earning_and_deduction_types(facts.component_names())
+	basic_component = get_component_roles(company, facts, ("basic",)).get("basic")
+	columns = get_columns(earning_types, ded_types, basic_component)
+
+	data = list(get_rows(facts, earning_types, ded_types, filters, company_currency, columns))
+	return columns, data
+
+
+def get_query_options(filters, company_currency):
+	return {
+		"apply_exchange_rate": filters.get("currency") == company_currency,
+		"default_docstatus": None,
+		"conditions": get_currency_conditions(filters, company_currency),
+	}
 
-	ss_earning_map = get_salary_slip_details(salary_slips, currency, company_currency, "earnings")
-	ss_ded_map = get_salary_slip_details(salary_slips, currency, company_currency, "deductions")
 
-	doj_map = get_employee_doj_map()
+def get_rows(facts, earning_types, ded_types, filters, company_currency, columns=None):
+	"""Yield the report row of every slip in ``facts``."""
+	currency = filters.get("currency")
+	doj_map = get_employee_values(facts.column("employee"), "date_of_joining")
 
-	data = []
-	for ss in salary_slips:
+	for idx, ss in facts.iter_slips():
 		row = {
 			"salary_slip_id": ss.name,
 			"employee": ss.employee,
@@ -56,10 +124,10 @@ def execute(filters=None):
 		update_column_width(ss, columns)
 
 		for e in earning_types:
-			row.update({frappe.scrub(e): ss_earning_map.get(ss.name, {}).get(e)})
+			row.update({frappe.scrub(e): facts.get(idx, e, "earnings")})
 
 		for d in ded_types:
-			row.update({frappe.scrub(d): ss_ded_map.get(ss.name, {}).get(d)})
+			row.update({frappe.scrub(d): facts.get(idx, d, "deductions")})
 
 		if currency == company_currency:
 			row.update(
@@ -79,19 +147,119 @@ def execute(filters=None):
 				}
 			)
 
-		data.append(row)
+		yield row
 
-	return columns, data
+
+def get_page_result(filters, company_currency):
+	"""One page of rows after the ``after`` cursor, with whole-range totals and the next cursor in ``_meta``."""
+	layout = get_layout(filters, company_currency)
+	if not layout.slip_count:
+		return [], []
+
+	after = frappe.parse_json(filters.get("after")) if filters.get("after") else None
+	data, next_cursor = get_page(filters, company_currency, layout, after, filters.get("page_size"))
+	if data:
+		data[0]["_meta"] = {
+			"totals": layout.totals,
+			"slip_count": layout.slip_count,
+			"page_size": cint(filters.get("page_size")),
+			"next_cursor": next_cursor,
+		}
+	return layout.columns, data
+
+
+def get_layout(filters, company_currency):
+	"""Columns, component types and totals of the whole range, from SQL aggregates without loading slips."""
+	options = get_query_options(filters, company_currency)
+	components = get_component_totals(filters, **options)
+
+	earning_types, ded_types = get_earning_and_deduction_types(get_component_names(components.present))
+
+	# Slip-less facts: role resolution only needs which components are present
+	component_facts = SalarySlipFacts(["name"], [], [], {}, components.present)
+	basic_component = get_component_roles(filters.get("company"), component_facts, ("basic",)).get("basic")
+
+	slip_totals = get_slip_totals(filters, options)
+	totals = {
+		**{frappe.scrub(e): components.totals["earnings"].get(e, 0.0) for e in earning_types},
+		**{frappe.scrub(d): components.totals["deductions"].get(d, 0.0) for d in ded_types},
+		**slip_totals,
+	}
+
+	return frappe._dict(
+		columns=get_columns(earning_types, ded_types, basic_component),
+		earning_types=earning_types,
+		ded_types=ded_types,
+		totals=totals,
+		slip_count=slip_totals.pop("slip_count"),
+	)
 
 
-def get_earning_and_deduction_types(salary_slips):
-	salary_component_and_type = {_("Earning"): [], _("Deduction"): []}
+def get_slip_totals(filters, options):
+	rate = Coalesce(NullIf(salary_slip.exchange_rate, 0), 1) if options["apply_exchange_rate"] else 1
+	loan = Coalesce(salary_slip.total_loan_repayment, 0)
 
-	for salary_component in get_salary_components(salary_slips):
-		component_type = get_salary_component_type(salary_component)
-		salary_component_and_type[_(component_type)].append(salary_component)
+	row = (
+		get_salary_slip_query(filters, [], default_docstatus=None, conditions=options["conditions"]).select(
+			Count(salary_slip.name),
+			Sum(salary_slip.gross_pay * rate),
+			Sum(loan),
+			Sum((salary_slip.total_deduction + loan) * rate),
+			Sum(salary_slip.net_pay * rate),
+		)
+	).run()[0]
+
+	return {
+		"slip_count": row[0] or 0,
+		"gross_pay": flt(row[1]),
+		"total_loan_repayment": flt(row[2]),
+		"total_deduction": flt(row[3]),
+		"net_pay": flt(row[4]),
+	}
+
+
+def get_page(filters, company_currency, layout, after=None, page_size=None):
+	"""``(rows, next_cursor)`` for up to ``page_size`` slips ordered by ``PAGE_ORDER`` after ``after``."""
+	page_size = cint(page_size) or DEFAULT_PAGE_SIZE
+	facts = get_salary_slip_facts(
+		filters,
+		SALARY_SLIP_FIELDS,
+		order_by=PAGE_ORDER,
+		after=after,
+		limit=page_size,
+		**get_query_options(filters, company_currency),
+	)
+	rows = list(get_rows(facts, layout.earning_types, layout.ded_types, filters, company_currency, layout.columns))
+
+	next_cursor = None
+	if len(facts) == page_size:
+		last = facts.slip(len(facts) - 1)
+		next_cursor = [last[field] for field in PAGE_ORDER]
+	return rows, next_cursor
+
+
+def iter_salary_summary_rows(filters, layout=None, page_size=None):
+	"""Yield every row of the report page by page, holding one page of slips in memory at a time."""
+	company_currency = erpnext.get_company_currency(filters.get("company"))
+	layout = layout or get_layout(filters, company_currency)
+
+	for facts in iter_salary_slip_facts(
+		filters,
+		SALARY_SLIP_FIELDS,
+		page_size=cint(page_size) or DEFAULT_PAGE_SIZE,
+		order_by=PAGE_ORDER,
+		**get_query_options(filters, company_currency),
+	):
+		yield from get_rows(
+			facts, layout.earning_types, layout.ded_types, filters, company_currency, layout.columns
+		)
 
-	return sorted(salary_component_and_type[_("Earning")]), sorted(salary_component_and_type[_("Deduction")])
+
+def get_export(filters, page_size=None):
+	"""Columns and a row generator for the streaming export."""
+	company_currency = erpnext.get_company_currency(filters.get("company"))
+	layout = get_layout(filters, company_currency)
+	return layout.columns, iter_salary_summary_rows(filters, layout, page_size)
 
 
 def update_column_width(ss, columns):
@@ -101,7 +269,7 @@ def update_column_width(ss, columns):
 	return
 
 
-def get_columns(earning_types, ded_types):
+def get_columns(earning_types, ded_types, basic_component=None):
 	def _short_label(component):
 		"""Return a compact abbreviation for a salary component label.
 
@@ -154,17 +322,9 @@ def get_columns(earning_types, ded_types):
 		},
 	]
 
-	# Ensure "Basic" (or similar) appears as the first component column
+	# Ensure the company's basic component appears as the first component column
 	# right after Employee and Employee Name.
-	basic_labels = {"Basic", "Basic Pay", "BASIC"}
-	basic_component = None
-	for lbl in earning_types:
-		if lbl in basic_labels:
-			basic_component = lbl
-			break
-
-	if basic_component:
-		earning_types.remove(basic_component)
+	if basic_component in earning_types:
 		columns.append(
 			{
 				"label": _("Basic"),
@@ -176,6 +336,8 @@ def get_columns(earning_types, ded_types):
 		)
 
 	for earning in earning_types:
+		if earning == basic_component:
+			continue
 		columns.append(
 			{
 				"label": _(_short_label(earning)),
@@ -242,88 +404,7 @@ def get_columns(earning_types, ded_types):
 	return columns
 
 
-def get_salary_components(salary_slips):
-	return (
-		frappe.qb.from_(salary_detail)
-		.where((salary_detail.amount != 0) & (salary_detail.parent.isin([d.name for d in salary_slips])))
-		.select(salary_detail.salary_component)
-		.distinct()
-	).run(pluck=True)
-
-
-def get_salary_component_type(salary_component):
-	return frappe.db.get_value("Salary Component", salary_component, "type", cache=True)
-
-
-def get_salary_slips(filters, company_currency):
-	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
-
-	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
-
-	if filters.get("from_date"):
-		query = query.where(salary_slip.start_date >= filters.get("from_date"))
-
-	if filters.get("to_date"):
-		query = query.where(salary_slip.end_date <= filters.get("to_date"))
-
-	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
-
-	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
-
+def get_currency_conditions(filters, company_currency):
 	if filters.get("currency") and filters.get("currency") != company_currency:
-		query = query.where(salary_slip.currency == filters.get("currency"))
-
-	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
-
-	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
-
-	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
-
-	return query.run(as_dict=1) or []
-
-
-def get_employee_doj_map():
-	employee = frappe.qb.DocType("Employee")
-
-	result = (frappe.qb.from_(employee).select(employee.name, employee.date_of_joining)).run()
-
-	return frappe._dict(result)
-
-
-def get_salary_slip_details(salary_slips, currency, company_currency, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
-
-	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where((salary_detail.parent.isin(salary_slips)) & (salary_detail.parentfield == component_type))
-		.select(
-			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-			salary_slip.exchange_rate,
-		)
-	).run(as_dict=1)
-
-	ss_map = {}
-
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		if currency == company_currency:
-			ss_map[d.parent][d.salary_component] += flt(d.amount) * flt(
-				d.exchange_rate if d.exchange_rate else 1
-			)
-		else:
-			ss_map[d.parent][d.salary_component] += flt(d.amount)
-
-	return ss_map
-
+		return [salary_slip.currency == filters.get("currency")]
+	return []
@@ -0,0 +1,424 @@
+"""Batched creation and submission of Additional Salary records.
+
+Creating Additional Salaries one ``get_doc(...).insert()`` at a time takes
+the naming-series lock for every row. Monthly runs create tens of thousands
+of rows, so this module checks a whole batch up front with a handful of set
+queries, reserves one naming-series range for it and writes the drafts with
+multi-row inserts, committing every ``commit_interval`` chunks. Those
+inserts bypass the Additional Salary controller: its ``validate`` and the
+``before_insert``/``after_insert`` hooks and insert ``doc_events`` of other
+apps do not run for the drafts, only for their submission.
+
+Submission always goes through the Additional Salary controller, one
+document at a time under its own savepoint, so its validation, ``on_submit``,
+the ``doc_events`` of every app and the version trail all run, and a draft
+edited since it was created is validated again. A row the controller
+rejects stays in draft and is reported with the reason.
+
+The up-front checks catch the common problems for the rows these jobs create
+(fixed amounts on a single payroll date, not recurring) before anything is
+written: active employee of the company on the payroll date with a submitted
+Salary Structure Assignment, enabled Salary Component, non-negative amount
+and no other overwriting Additional Salary for the same employee, component
+and date.
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.model.naming import parse_naming_series
+from frappe.utils import cint, flt, getdate, now
+
+from gvm_payroll.gvm_payroll.utils.report_cache import bump_payroll_data_version
+
+ADDITIONAL_SALARY = "Additional Salary"
+DEFAULT_NAMING_SERIES = "HR-ADS-.YY.-.MM.-"
+# Appended by Frappe to a naming series without a number placeholder
+DEFAULT_SERIES_NUMBER = "#####"
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_COMMIT_INTERVAL = 1
+
+SUBMIT_SAVEPOINT = "additional_salary_submit"
+
+
+def get_batch_settings(batch_size=None, commit_interval=None):
+	"""Batch size and commit interval (in chunks), from arguments or site config."""
+	batch_size = cint(batch_size) or cint(frappe.conf.get("gvm_payroll_additional_salary_batch_size"))
+	commit_interval = cint(commit_interval) or cint(
+		frappe.conf.get("gvm_payroll_additional_salary_commit_interval")
+	)
+	return batch_size or DEFAULT_BATCH_SIZE, commit_interval or DEFAULT_COMMIT_INTERVAL
+
+
+def validate_additional_salary_rows(rows, company, payroll_date):
+	"""Split ``rows`` into ``(valid_rows, errors)`` using set queries for the whole batch.
+
+	``rows`` are dicts with ``employee``, ``salary_component`` and ``amount``;
+	``errors`` are the invalid rows with a ``reason``. Valid rows gain the
+	employee and component fields the Additional Salary copies.
+	"""
+	payroll_date = getdate(payroll_date)
+	employees = get_employee_details({row["employee"] for row in rows})
+	assigned = get_employees_with_salary_structure({row["employee"] for row in rows}, payroll_date)
+	components = get_component_details({row["salary_component"] for row in rows})
+	overwritten = get_overwriting_additional_salaries(
+		{row["employee"] for row in rows}, {row["salary_component"] for row in rows}, payroll_date
+	)
+
+	valid_rows = []
+	errors = []
+	seen = set()
+
+	for row in rows:
+		employee = employees.get(row["employee"])
+		component = components.get(row["salary_component"])
+		key = (row["employee"], row["salary_component"])
+
+		if not employee:
+			reason = _("Employee {0} not found").format(row["employee"])
+		elif employee.company != company:
+			reason = _("Employee {0} does not belong to company {1}").format(row["employee"], company)
+		elif employee.status != "Active":
+			reason = _("Employee {0} is not active").format(row["employee"])
+		elif employee.date_of_joining and getdate(employee.date_of_joining) > payroll_date:
+			reason = _("Payroll date is before the joining date of employee {0}").format(row["employee"])
+		elif employee.relieving_date and getdate(employee.relieving_date) < payroll_date:
+			reason = _("Payroll date is after the relieving date of employee {0}").format(row["employee"])
+		elif row["employee"] not in assigned:
+			reason = _("There is no Salary Structure assigned to {0} on the payroll date").format(row["employee"])
+		elif not component:
+			reason = _("Salary Component {0} not found").format(row["salary_component"])
+		elif component.disabled:
+			reason = _("Salary Component {0} is disabled").format(row["salary_component"])
+		elif row.get("amount") is None or flt(row["amount"]) < 0:
+			reason = _("Amount should not be less than zero")
+		elif key in overwritten or key in seen:
+			reason = _("An Additional Salary overwriting {0} for {1} on this date already exists").format(
+				row["salary_component"], row["employee"]
+			)
+		else:
+			seen.add(key)
+			valid_rows.append(
+				{
+					**row,
+					"employee_name": employee.employee_name,
+					"department": employee.department,
+					"type": component.type,
+				}
+			)
+			continue
+
+		errors.append({**row, "reason": reason})
+
+	return valid_rows, errors
+
+
+def get_employee_details(employees):
+	if not employees:
+		return {}
+
+	return {
+		employee.name: employee
+		for employee in frappe.get_all(
+			"Employee",
+			filters={"name": ["in", list(employees)]},
+			fields=[
+				"name",
+				"employee_name",
+				"department",
+				"company",
+				"status",
+				"date_of_joining",
+				"relieving_date",
+			],
+		)
+	}
+
+
+def get_employees_with_salary_structure(employees, payroll_date):
+	"""Those of ``employees`` with a submitted Salary Structure Assignment effective on ``payroll_date``."""
+	if not employees:
+		return set()
+
+	return set(
+		frappe.get_all(
+			"Salary Structure Assignment",
+			filters={
+				"employee": ["in", list(employees)],
+				"from_date": ["<=", payroll_date],
+				"docstatus": 1,
+			},
+			pluck="employee",
+			distinct=True,
+		)
+	)
+
+
+def get_component_details(components):
+	if not components:
+		return {}
+
+	return {
+		component.name: component
+		for component in frappe.get_all(
+			"Salary Component",
+			filters={"name": ["in", list(components)]},
+			fields=["name", "type", "disabled"],
+		)
+	}
+
+
+def get_overwriting_additional_salaries(employees, components, payroll_date):
+	"""``(employee, salary_component)`` pairs with a submitted overwriting Additional Salary on ``payroll_date``."""
+	if not employees or not components:
+		return set()
+
+	return set(
+		frappe.get_all(
+			ADDITIONAL_SALARY,
+			filters={
+				"employee": ["in", list(employees)],
+				"salary_component": ["in", list(components)],
+				"payroll_date": payroll_date,
+				"overwrite_salary_structure_amount": 1,
+				"docstatus": 1,
+			},
+			fields=["employee", "salary_component"],
+			as_list=True,
+		)
+	)
+
+
+def get_existing_additional_salaries(ref_doctype, ref_docname):
+	"""Set of ``(employee, salary_component)`` with a non-cancelled Additional Salary for the reference."""
+	return set(
+		frappe.get_all(
+			ADDITIONAL_SALARY,
+			filters={"ref_doctype": ref_doctype, "ref_docname": ref_docname, "docstatus": ["!=", 2]},
+			fields=["employee", "salary_component"],
+			as_list=True,
+		)
+	)
+
+
+def get_existing_drafts(ref_doctype, ref_docname):
+	"""``{(employee, salary_component): name}`` of the reference's draft Additional Salaries."""
+	return {
+		(employee, salary_component): name
+		for name, employee, salary_component in frappe.get_all(
+			ADDITIONAL_SALARY,
+			filters={"ref_doctype": ref_doctype, "ref_docname": ref_docname, "docstatus": 0},
+			fields=["name", "employee", "salary_component"],
+			as_list=True,
+		)
+	}
+
+
+def get_naming_series():
+	naming_series = frappe.get_meta(ADDITIONAL_SALARY).get_field("naming_series")
+	if naming_series and naming_series.default:
+		return naming_series.default
+	if naming_series and naming_series.options:
+		return naming_series.options.split("\n")[0]
+	return DEFAULT_NAMING_SERIES
+
+
+def reserve_series_names(naming_series, count):
+	"""Reserve ``count`` consecutive names of ``naming_series`` with one locked update of ``tabSeries``.
+
+	The number is padded to as many digits as the series has ``#``, like
+	Frappe's own naming; a series without them gets five.
+	"""
+	naming_series = naming_series.rstrip(".")
+	if "#" not in naming_series:
+		naming_series = f"{naming_series}.{DEFAULT_SERIES_NUMBER}"
+	template, _sep, number = naming_series.rpartition(".")
+	if not template or number.strip("#"):
+		frappe.throw(_("Naming series {0} must end with its number, e.g. .#####").format(naming_series))
+	digits = len(number)
+	prefix = parse_naming_series(template)
+
+	current = frappe.db.sql("select `current` from `tabSeries` where `name`=%s for update", prefix)
+	if current:
+		start = cint(current[0][0])
+		frappe.db.sql("update `tabSeries` set `current` = `current` + %s where `name`=%s", (count, prefix))
+	else:
+		start = 0
+		frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, %s)", (prefix, count))
+
+	return [f"{prefix}{str(start + i).zfill(digits)}" for i in range(1, count + 1)]
+
+
+def insert_additional_salaries(
+	rows,
+	company,
+	payroll_date,
+	ref_doctype,
+	ref_docname,
+	submit=False,
+	batch_size=None,
+	commit_interval=None,
+	on_chunk=None,
+):
+	"""Insert validated ``rows`` as draft Additional Salaries, submitting each chunk when ``submit``.
+
+	Names for all rows are reserved up front; rows are written ``batch_size``
+	at a time and committed every ``commit_interval`` chunks. With ``submit``
+	each chunk is submitted through the controller right after it is written,
+	see :func:`submit_additional_salaries`. ``on_chunk`` is called after each
+	chunk, before its commit, with its stats. Returns the created names, the
+	submitted names, the rows that failed to submit (``name`` and ``reason``)
+	and the per-chunk stats (``rows``, ``seconds``, ``rows_per_second``).
+	"""
+	batch_size, commit_interval = get_batch_settings(batch_size, commit_interval)
+	result = frappe._dict(created=[], submitted=[], failed=[], chunks=[])
+	if not rows:
+		return result
+
+	naming_series = get_naming_series()
+	names = reserve_series_names(naming_series, len(rows))
+	currency = frappe.get_cached_value("Company", company, "default_currency")
+
+	columns = set(frappe.db.get_table_columns(ADDITIONAL_SALARY))
+	values = {
+		"naming_series": naming_series,
+		"company": company,
+		"currency": currency,
+		"payroll_date": getdate(payroll_date),
+		"overwrite_salary_structure_amount": 1,
+		"deduct_full_tax_on_selected_payroll_date": 0,
+		"is_recurring": 0,
+		"ref_doctype": ref_doctype,
+		"ref_docname": ref_docname,
+		"docstatus": 0,
+	}
+	row_fields = ("employee", "employee_name", "department", "salary_component", "type", "amount")
+	fields = [
+		"name",
+		"creation",
+		"modified",
+		"owner",
+		"modified_by",
+		*[field for field in values if field in columns],
+		*[field for field in row_fields if field in columns],
+	]
+
+	user = frappe.session.user
+	for chunk_no, start in enumerate(range(0, len(rows), batch_size), start=1):
+		started = time.monotonic()
+		timestamp = now()
+		chunk = rows[start : start + batch_size]
+		chunk_names = names[start : start + batch_size]
+
+		frappe.db.bulk_insert(
+			ADDITIONAL_SALARY,
+			fields,
+			[
+				(
+					name,
+					timestamp,
+					timestamp,
+					user,
+					user,
+					*[values[field] for field in values if field in columns],
+					*[row.get(field) for field in row_fields if field in columns],
+				)
+				for name, row in zip(chunk_names, chunk, strict=True)
+			],
+		)
+		result.created.extend(chunk_names)
+		# The drafts are written without their controller, so no doc_event invalidates the report cache
+		bump_payroll_data_version(company)
+
+		if submit:
+			submitted, failed = submit_drafts(chunk_names)
+			result.submitted.extend(submitted)
+			result.failed.extend(failed)
+
+		stats = get_chunk_stats(chunk_no, len(chunk), started)
+		result.chunks.append(stats)
+		log_chunk("insert", stats)
+		if on_chunk:
+			# Runs before the commit so checkpoints land in the same transaction as the chunk
+			on_chunk(stats)
+
+		if chunk_no % commit_interval == 0:
+			frappe.db.commit()
+
+	return result
+
+
+def submit_additional_salaries(names, batch_size=None, commit_interval=None, on_chunk=None):
+	"""Submit draft Additional Salaries ``names`` through the controller, ``batch_size`` at a time.
+
+	Drafts the controller rejects, e.g. because they would now clash with a
+	submitted overwriting Additional Salary, are left in draft and returned in
+	``failed`` with the reason. Returns the submitted names and per-chunk
+	stats, like :func:`insert_additional_salaries`.
+	"""
+	batch_size, commit_interval = get_batch_settings(batch_size, commit_interval)
+	result = frappe._dict(submitted=[], failed=[], chunks=[])
+
+	for chunk_no, start in enumerate(range(0, len(names), batch_size), start=1):
+		started = time.monotonic()
+		chunk = names[start : start + batch_size]
+
+		submitted, failed = submit_drafts(chunk)
+		result.submitted.extend(submitted)
+		result.failed.extend(failed)
+
+		stats = get_chunk_stats(chunk_no, len(chunk), started)
+		result.chunks.append(stats)
+		log_chunk("submit", stats)
+		if on_chunk:
+			on_chunk(stats)
+
+		if chunk_no % commit_interval == 0:
+			frappe.db.commit()
+
+	return result
+
+
+def submit_drafts(names):
+	"""Submit each draft in ``names`` under its own savepoint; ``(submitted, failed)``.
+
+	A row that fails is rolled back to its savepoint and stays in draft, so
+	one bad row does not undo the rest of the chunk.
+	"""
+	submitted = []
+	failed = []
+
+	for name in names:
+		frappe.db.savepoint(SUBMIT_SAVEPOINT)
+		try:
+			doc = frappe.get_doc(ADDITIONAL_SALARY, name)
+			if doc.docstatus != 0:
+				continue
+			doc.submit()
+		except Exception as e:
+			frappe.db.rollback(save_point=SUBMIT_SAVEPOINT)
+			failed.append({"name": name, "reason": str(e)})
+			continue
+
+		submitted.append(name)
+
+	return submitted, failed
+
+
+def get_chunk_stats(chunk_no, row_count, started):
+	seconds = time.monotonic() - started
+	return {
+		"chunk": chunk_no,
+		"rows": row_count,
+		"seconds": round(seconds, 3),
+		"rows_per_second": round(row_count / seconds, 1) if seconds else None,
+	}
+
+
+def log_chunk(action, stats):
+	frappe.logger("gvm_payroll").info(
+		f"Additional Salary {action} chunk {stats['chunk']}: {stats['rows']} rows "
+		f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+	)
@@ -0,0 +1,222 @@
+"""Bulk annual increment on an IND Payroll Setting increment date.
+
+On each increment date (1st April / 1st October) every eligible employee moves
+one cell up their Pay Matrix level. This module selects the employees due on
+a date with one query, computes every new basic through the compiled Pay
+Matrix index and creates the new Salary Structure Assignments in batches,
+committing and timing each batch.
+
+An employee is due when they are active in the company, have a Pay Matrix
+and level, and their increment date falls on the same day of the year on or
+before the run date. Employees that already have a Salary Structure
+Assignment from the run date are left out, so a failed run can be repeated.
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate
+
+from gvm_payroll.gvm_payroll.utils.additional_salary_batch import get_chunk_stats
+from gvm_payroll.gvm_payroll.utils.pay_matrix_index import get_pay_matrix_indexes
+from gvm_payroll.gvm_payroll.utils.report_cache import bump_payroll_data_version
+
+DEFAULT_BATCH_SIZE = 200
+
+
+def get_increment_batch_size(batch_size=None):
+	return (
+		cint(batch_size) or cint(frappe.conf.get("gvm_payroll_increment_batch_size")) or DEFAULT_BATCH_SIZE
+	)
+
+
+def get_increment_plan(company, increment_date):
+	"""``(rows, skipped)`` for the increment run of ``company`` on ``increment_date``.
+
+	Each row holds the employee's current and new cell and basic plus the
+	Salary Structure Assignment it is carried over from; ``skipped`` lists
+	due employees that cannot be incremented with a ``reason``.
+	"""
+	increment_date = getdate(increment_date)
+	employees = get_due_employees(company, increment_date)
+	if not employees:
+		return [], []
+
+	assignments = get_current_assignments([employee.name for employee in employees], increment_date)
+	indexes = get_pay_matrix_indexes({employee.custom_pay_matrix for employee in employees})
+
+	rows = []
+	skipped = []
+	pending = []
+	for employee in employees:
+		assignment = assignments.get(employee.name)
+		if not assignment:
+			reason = _("No Salary Structure Assignment before the increment date")
+			skipped.append(get_skipped_row(employee, reason))
+		elif getdate(assignment.from_date) == increment_date:
+			skipped.append(get_skipped_row(employee, _("Already incremented on this date")))
+		elif not flt(employee.custom_basic_salary):
+			skipped.append(get_skipped_row(employee, _("No basic salary set")))
+		else:
+			pending.append(employee)
+
+	for pay_matrix, index in indexes.items():
+		matrix_employees = [employee for employee in pending if employee.custom_pay_matrix == pay_matrix]
+		if not matrix_employees:
+			continue
+
+		cells, amounts = index.bulk_next_higher_cell(
+			[employee.custom_level for employee in matrix_employees],
+			[flt(employee.custom_basic_salary) for employee in matrix_employees],
+		)
+		for employee, cell, amount in zip(matrix_employees, cells.tolist(), amounts.tolist(), strict=True):
+			if not index.get_level(employee.custom_level):
+				reason = _("Level {0} not found in {1}").format(employee.custom_level, pay_matrix)
+				skipped.append(get_skipped_row(employee, reason))
+				continue
+			if cell < 0:
+				reason = _("Already at the top of level {0}").format(employee.custom_level)
+				skipped.append(get_skipped_row(employee, reason))
+				continue
+
+			assignment = assignments[employee.name]
+			rows.append(
+				frappe._dict(
+					employee=employee.name,
+					employee_name=employee.employee_name,
+					pay_matrix=pay_matrix,
+					level=employee.custom_level,
+					current_basic=flt(employee.custom_basic_salary),
+					new_cell=cell,
+					new_basic=amount,
+					salary_structure=assignment.salary_structure,
+					variable=assignment.variable,
+					income_tax_slab=assignment.income_tax_slab,
+					payroll_payable_account=assignment.payroll_payable_account,
+					currency=assignment.currency,
+					previous_assignment=assignment.name,
+				)
+			)
+
+	return rows, skipped
+
+
+def get_due_employees(company, increment_date):
+	"""Active employees of ``company`` on a Pay Matrix whose increment falls on ``increment_date``."""
+	employees = frappe.get_all(
+		"Employee",
+		filters={
+			"company": company,
+			"status": "Active",
+			"custom_pay_matrix": ["is", "set"],
+			"custom_level": ["is", "set"],
+			"custom_date_of_increment": ["<=", increment_date],
+		},
+		fields=[
+			"name",
+			"employee_name",
+			"custom_pay_matrix",
+			"custom_level",
+			"custom_basic_salary",
+			"custom_date_of_increment",
+		],
+		order_by="name",
+	)
+	return [
+		employee
+		for employee in employees
+		if (getdate(employee.custom_date_of_increment).month, getdate(employee.custom_date_of_increment).day)
+		== (increment_date.month, increment_date.day)
+	]
+
+
+def get_current_assignments(employees, increment_date):
+	"""Latest submitted Salary Structure Assignment of each employee on or before ``increment_date``."""
+	assignments = {}
+	for assignment in frappe.get_all(
+		"Salary Structure Assignment",
+		filters={"employee": ["in", employees], "from_date": ["<=", increment_date], "docstatus": 1},
+		fields=[
+			"name",
+			"employee",
+			"from_date",
+			"salary_structure",
+			"variable",
+			"income_tax_slab",
+			"payroll_payable_account",
+			"currency",
+		],
+		order_by="from_date desc, creation desc",
+	):
+		assignments.setdefault(assignment.employee, assignment)
+	return assignments
+
+
+def get_skipped_row(employee, reason):
+	return {"employee": employee.name, "employee_name": employee.employee_name, "reason": reason}
+
+
+def apply_increment_plan(company, increment_date, rows, batch_size=None, on_batch=None):
+	"""Create and submit the Salary Structure Assignments for ``rows`` in batches.
+
+	Each batch is committed on its own; a row that fails validation is rolled
+	back to its savepoint and reported in ``failed`` without stopping the
+	batch. The employee's ``custom_basic_salary`` is moved to the new basic,
+	and the company's cached report results are invalidated after each batch.
+	Returns ``created``, ``failed`` and per-batch stats (``rows``,
+	``seconds``, ``rows_per_second``).
+	"""
+	batch_size = get_increment_batch_size(batch_size)
+	result = frappe._dict(created=[], failed=[], batches=[])
+	if not rows:
+		return result
+
+	for batch_no, start in enumerate(range(0, len(rows), batch_size), start=1):
+		started = time.monotonic()
+		batch = rows[start : start + batch_size]
+
+		for row in batch:
+			frappe.db.savepoint("annual_increment")
+			try:
+				result.created.append(make_increment_assignment(company, increment_date, row))
+				frappe.db.set_value(
+					"Employee", row.employee, "custom_basic_salary", row.new_basic, update_modified=False
+				)
+			except Exception as e:
+				frappe.db.rollback(save_point="annual_increment")
+				result.failed.append({"employee": row.employee, "reason": str(e)})
+
+		stats = get_chunk_stats(batch_no, len(batch), started)
+		result.batches.append(stats)
+		frappe.logger("gvm_payroll").info(
+			f"Annual increment batch {batch_no}: {stats['rows']} employees "
+			f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+		)
+		if on_batch:
+			on_batch(stats)
+		frappe.db.commit()
+		# The basic salary is written with set_value, which runs no doc_events
+		bump_payroll_data_version(company)
+
+	return result
+
+
+def make_increment_assignment(company, increment_date, row):
+	assignment = frappe.get_doc(
+		{
+			"doctype": "Salary Structure Assignment",
+			"employee": row.employee,
+			"company": company,
+			"salary_structure": row.salary_structure,
+			"from_date": getdate(increment_date),
+			"base": row.new_basic,
+			"variable": row.variable,
+			"income_tax_slab": row.income_tax_slab,
+			"payroll_payable_account": row.payroll_payable_account,
+			"currency": row.currency,
+		}
+	)
+	assignment.insert()
+	assignment.submit()
+	return assignment.name
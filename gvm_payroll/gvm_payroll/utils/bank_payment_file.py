@@ -0,0 +1,389 @@
+"""Bank payment files (NEFT/RTGS bulk upload) built from the salary slips.
+
+The Bank Statement report reads the slips of one bank for a period; this module
+turns the same slips into the bank's bulk upload file. A layout formats an
+optional header, one line per payment and an optional trailer. The built-in
+layouts are ``CSV`` and ``Fixed Width``; the layout of a bank is looked up by
+the slip's ``bank_name`` in the ``gvm_payroll_bank_payment_layouts`` hook and
+then in the site config key of the same name, each mapping a bank name to a
+built-in layout name or to the dotted path of a :class:`BankPaymentLayout`.
+
+Payments are read in keyset pages and written as they come, so a file of tens
+of thousands of lines is built in one pass with one page of slips in memory.
+The header carries the batch-control totals from an SQL aggregate taken
+before writing; the trailer carries the totals counted while writing, with the
+hash total of the account numbers, and a mismatch between the two aborts the
+file. The SHA-256 of the written bytes is returned with the batch.
+"""
+
+import csv
+import hashlib
+import io
+import unicodedata
+
+import frappe
+from frappe import _
+from frappe.query_builder.functions import Coalesce, Count, NullIf, Sum
+from frappe.utils import flt, getdate, nowdate
+
+from gvm_payroll.gvm_payroll.utils.employee_details import get_employee_values
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	get_salary_slip_query,
+	iter_salary_slip_facts,
+	salary_slip,
+)
+
+SALARY_SLIP_FIELDS = (
+	"employee",
+	"employee_name",
+	"bank_name",
+	"bank_account_no",
+	"rounded_total",
+	"net_pay",
+)
+
+PAYMENT_TYPES = ("NEFT", "RTGS")
+
+# RBI floor for an RTGS transfer; smaller payments go by NEFT
+RTGS_MINIMUM_AMOUNT = 200000
+
+# Hash totals are kept to this many digits, as most bank trailers allow
+HASH_TOTAL_MODULUS = 10**15
+
+PAYMENT_PAGE_SIZE = 2000
+
+
+class BankPaymentLayout:
+	"""Formats a payment batch as lines of text; subclasses define the three line kinds.
+
+	``header`` and ``trailer`` receive the batch (``company``, ``bank_name``,
+	``value_date``, ``payment_type``, ``debit_account``, ``batch_reference``,
+	``record_count``, ``total_amount`` and, in the trailer, ``hash_total``) and
+	may return ``None`` for no line. ``record`` receives one payment.
+	"""
+
+	extension = "txt"
+	mimetype = "text/plain"
+	encoding = "ascii"
+	line_ending = "\r\n"
+
+	def header(self, batch):
+		return None
+
+	def record(self, payment):
+		raise NotImplementedError
+
+	def trailer(self, batch):
+		return None
+
+
+class CSVLayout(BankPaymentLayout):
+	"""One comma separated row per payment under a row of column labels.
+
+	``fields`` are ``(label, key)`` pairs read from the payment; ``trailer_fields``
+	are read from the batch and written as a last row when given.
+	"""
+
+	extension = "csv"
+	mimetype = "text/csv"
+	encoding = "utf-8"
+
+	def __init__(self, fields, trailer_fields=None, delimiter=","):
+		self.fields = fields
+		self.trailer_fields = trailer_fields
+		self.delimiter = delimiter
+
+	def header(self, batch):
+		return self.format_row(label for label, _key in self.fields)
+
+	def record(self, payment):
+		return self.format_row(format_value(payment, key) for _label, key in self.fields)
+
+	def trailer(self, batch):
+		if self.trailer_fields:
+			return self.format_row(format_value(batch, key) for key in self.trailer_fields)
+
+	def format_row(self, values):
+		line = io.StringIO()
+		csv.writer(line, delimiter=self.delimiter, lineterminator="").writerow(list(values))
+		return line.getvalue()
+
+
+class FixedWidthLayout(BankPaymentLayout):
+	"""Fixed-width lines built from ``(key, width, kind)`` field specs.
+
+	``kind`` is ``"text"`` (left aligned, space padded, cut to width),
+	``"number"`` (right aligned, zero padded), ``"amount"`` (in paise, zero
+	padded) or ``"date"`` (DDMMYYYY). A key starting with ``=`` is a literal.
+	Numbers and amounts that do not fit their width raise instead of being cut.
+	"""
+
+	def __init__(self, record_fields, header_fields=None, trailer_fields=None):
+		self.record_fields = record_fields
+		self.header_fields = header_fields
+		self.trailer_fields = trailer_fields
+
+	def header(self, batch):
+		if self.header_fields:
+			return self.format_line(batch, self.header_fields)
+
+	def record(self, payment):
+		return self.format_line(payment, self.record_fields)
+
+	def trailer(self, batch):
+		if self.trailer_fields:
+			return self.format_line(batch, self.trailer_fields)
+
+	def format_line(self, values, fields):
+		return "".join(format_fixed(values, key, width, kind) for key, width, kind in fields)
+
+
+BANK_PAYMENT_LAYOUTS = {
+	"CSV": CSVLayout(
+		fields=(
+			("Sl No", "sequence"),
+			("Payment Type", "payment_type"),
+			("Beneficiary Name", "employee_name"),
+			("Beneficiary Account No", "bank_account_no"),
+			("IFSC", "ifsc_code"),
+			("Amount", "amount"),
+			("Value Date", "value_date"),
+			("Debit Account No", "debit_account"),
+			("Reference", "employee"),
+		),
+		trailer_fields=("=TOTAL", "record_count", "total_amount", "hash_total", "batch_reference"),
+	),
+	"Fixed Width": FixedWidthLayout(
+		header_fields=(
+			("=H", 1, "text"),
+			("batch_reference", 20, "text"),
+			("value_date", 8, "date"),
+			("debit_account", 20, "text"),
+			("record_count", 9, "number"),
+			("total_amount", 17, "amount"),
+		),
+		record_fields=(
+			("=D", 1, "text"),
+			("sequence", 9, "number"),
+			("payment_type", 4, "text"),
+			("ifsc_code", 11, "text"),
+			("bank_account_no", 20, "text"),
+			("employee_name", 35, "text"),
+			("amount", 17, "amount"),
+			("employee", 20, "text"),
+		),
+		trailer_fields=(
+			("=T", 1, "text"),
+			("record_count", 9, "number"),
+			("total_amount", 17, "amount"),
+			("hash_total", 15, "number"),
+		),
+	),
+}
+
+DEFAULT_LAYOUT = "CSV"
+
+
+def get_bank_payment_layout(bank_name):
+	"""Layout of ``bank_name`` from the hooks, then site config, else the default CSV layout."""
+	layouts = dict(frappe.get_hooks("gvm_payroll_bank_payment_layouts") or {})
+	layouts.update(frappe.conf.get("gvm_payroll_bank_payment_layouts") or {})
+
+	layout = layouts.get(bank_name) or DEFAULT_LAYOUT
+	if isinstance(layout, list):
+		# Hook values are collected across apps; the last installed app wins
+		layout = layout[-1]
+	if layout in BANK_PAYMENT_LAYOUTS:
+		return BANK_PAYMENT_LAYOUTS[layout]
+
+	layout = frappe.get_attr(layout)
+	return layout() if isinstance(layout, type) else layout
+
+
+def write_bank_payment_file(output, filters, layout=None):
+	"""Write the payment file of ``filters`` to the binary ``output`` in one pass.
+
+	``filters`` need ``company``, ``bank_name``, ``from_date`` and ``to_date``;
+	``payment_type`` (NEFT or RTGS, else chosen per payment by amount),
+	``value_date``, ``debit_account`` and ``batch_reference`` are optional.
+	Returns the batch with its control totals and ``checksum``.
+	"""
+	filters = get_payment_filters(filters)
+	layout = layout or get_bank_payment_layout(filters.bank_name)
+	validate_bank_accounts(filters)
+
+	batch = get_payment_batch(filters)
+	if not batch.record_count:
+		frappe.throw(_("No salary slips to pay for {0} in this period").format(filters.bank_name))
+
+	digest = hashlib.sha256()
+
+	def write(line):
+		if line is None:
+			return
+		data = (line + layout.line_ending).encode(layout.encoding)
+		digest.update(data)
+		output.write(data)
+
+	write(layout.header(batch))
+
+	counted = frappe._dict(record_count=0, total_amount=0.0, hash_total=0)
+	for payment in iter_payments(filters):
+		counted.record_count += 1
+		counted.total_amount += payment.amount
+		counted.hash_total = (counted.hash_total + get_account_hash(payment.bank_account_no)) % HASH_TOTAL_MODULUS
+		payment.sequence = counted.record_count
+		write(layout.record(payment))
+
+	if counted.record_count != batch.record_count or flt(counted.total_amount, 2) != flt(batch.total_amount, 2):
+		frappe.throw(
+			_("Salary slips changed while the payment file was written: expected {0} slips for {1}, wrote {2} for {3}").format(
+				batch.record_count, batch.total_amount, counted.record_count, flt(counted.total_amount, 2)
+			)
+		)
+
+	batch.hash_total = counted.hash_total
+	write(layout.trailer(batch))
+
+	batch.checksum = digest.hexdigest()
+	return batch
+
+
+def get_payment_filters(filters):
+	filters = frappe._dict(filters or {})
+	if not filters.get("company") or not filters.get("bank_name"):
+		frappe.throw(_("Company and Bank Name are required"))
+	if filters.get("payment_type") and filters.payment_type not in PAYMENT_TYPES:
+		frappe.throw(_("Payment Type must be one of {0}").format(", ".join(PAYMENT_TYPES)))
+
+	filters.from_date = getdate(filters.get("from_date") or nowdate())
+	filters.to_date = getdate(filters.get("to_date") or nowdate())
+	filters.value_date = getdate(filters.get("value_date") or nowdate())
+	filters.batch_reference = filters.get("batch_reference") or f"SAL{filters.to_date.strftime('%Y%m%d')}"
+	return filters
+
+
+def get_payment_amount():
+	"""Amount paid for a slip: ``rounded_total``, or ``net_pay`` when it is not rounded."""
+	return Coalesce(NullIf(salary_slip.rounded_total, 0), salary_slip.net_pay)
+
+
+def get_slip_query_args(filters):
+	"""``(slip_filters, options)`` selecting the slips of the bank paid in the period, as Bank Statement does."""
+	slip_filters = frappe._dict(company=filters.company, from_date=filters.from_date, to_date=filters.to_date)
+
+	amount = get_payment_amount()
+	conditions = [salary_slip.bank_name == filters.bank_name, amount > 0]
+	if filters.get("payment_type") == "RTGS":
+		conditions.append(amount >= RTGS_MINIMUM_AMOUNT)
+
+	return slip_filters, {"by_posting_date": True, "conditions": conditions}
+
+
+def get_payment_query(filters, fields, **options):
+	slip_filters, slip_options = get_slip_query_args(filters)
+	return get_salary_slip_query(slip_filters, fields, **slip_options, **options)
+
+
+def get_payment_batch(filters):
+	"""Batch details with the control totals of every slip the file will pay."""
+	record_count, total_amount = (
+		get_payment_query(filters, []).select(Count(salary_slip.name), Sum(get_payment_amount()))
+	).run()[0]
+
+	return frappe._dict(
+		company=filters.company,
+		bank_name=filters.bank_name,
+		value_date=filters.value_date,
+		payment_type=filters.get("payment_type") or "",
+		debit_account=filters.get("debit_account") or "",
+		batch_reference=filters.batch_reference,
+		record_count=record_count or 0,
+		total_amount=flt(total_amount, 2),
+	)
+
+
+def validate_bank_accounts(filters):
+	"""Stop before writing anything when a slip to pay has no bank account."""
+	missing = (
+		get_payment_query(filters, ["employee"], limit=20)
+		.where(Coalesce(salary_slip.bank_account_no, "") == "")
+	).run(pluck=True)
+
+	if missing:
+		frappe.throw(
+			_("Salary slips of these employees have no bank account: {0}").format(", ".join(missing))
+		)
+
+
+def iter_payments(filters):
+	"""Yield a payment for every slip of the batch, reading the slips in keyset pages."""
+	has_ifsc = frappe.get_meta("Employee").has_field("ifsc_code")
+
+	slip_filters, slip_options = get_slip_query_args(filters)
+	for facts in iter_salary_slip_facts(
+		slip_filters,
+		SALARY_SLIP_FIELDS,
+		page_size=PAYMENT_PAGE_SIZE,
+		order_by=("employee", "name"),
+		parentfields=(),
+		**slip_options,
+	):
+		ifsc_codes = get_employee_values(facts.column("employee"), "ifsc_code") if has_ifsc else {}
+
+		for _slip_idx, slip in facts.iter_slips():
+			amount = flt(flt(slip.rounded_total) or flt(slip.net_pay), 2)
+			yield frappe._dict(
+				employee=slip.employee,
+				employee_name=slip.employee_name,
+				bank_name=slip.bank_name,
+				bank_account_no=(slip.bank_account_no or "").strip(),
+				ifsc_code=(ifsc_codes.get(slip.employee) or "").strip().upper(),
+				amount=amount,
+				payment_type=filters.get("payment_type") or get_payment_type(amount),
+				value_date=filters.value_date,
+				debit_account=filters.get("debit_account") or "",
+			)
+
+
+def get_payment_type(amount):
+	return "RTGS" if amount >= RTGS_MINIMUM_AMOUNT else "NEFT"
+
+
+def get_account_hash(account_no):
+	"""Digits of the account number as an integer, for the hash total."""
+	digits = "".join(ch for ch in account_no or "" if ch.isdigit())
+	return int(digits[-15:] or 0)
+
+
+def format_value(values, key):
+	"""Value of ``key`` as CSV text: literals after ``=``, dates as DD/MM/YYYY, amounts to two decimals."""
+	if key.startswith("="):
+		return key[1:]
+
+	value = values.get(key)
+	if value is None:
+		return ""
+	if key == "value_date":
+		return getdate(value).strftime("%d/%m/%Y")
+	if isinstance(value, float):
+		return f"{value:.2f}"
+	return value
+
+
+def format_fixed(values, key, width, kind):
+	value = key[1:] if key.startswith("=") else values.get(key)
+
+	if kind == "date":
+		return getdate(value).strftime("%d%m%Y").ljust(width) if value else " " * width
+
+	if kind in ("number", "amount"):
+		number = round(flt(value) * 100) if kind == "amount" else int(value or 0)
+		text = str(number).rjust(width, "0")
+		if len(text) > width:
+			frappe.throw(_("{0} does not fit in {1} digits of the payment file").format(value, width))
+		return text
+
+	# Bank upload formats take plain ASCII text only; accented letters keep their base letter
+	text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode()
+	return text[:width].ljust(width)
@@ -0,0 +1,212 @@
+"""Resolve payroll roles (basic, DA, LIC, …) to Salary Component names.
+
+A company's "Payroll Component Role" mapping always wins. Roles it leaves out
+fall back to alias matching. Reports turn the resolved names into column
+indexes of :class:`SalarySlipFacts`.
+
+The module also keeps the site's Salary Component catalog (type,
+abbreviation, depends on payment days and the alias roles of the name),
+loaded with one query and cached until a Salary Component changes, so alias
+matching runs once per Salary Component and the cache is bounded by the
+number of components.
+"""
+
+import frappe
+
+from gvm_payroll.gvm_payroll.doctype.payroll_component_role.payroll_component_role import (
+	get_component_role_map,
+)
+
+COMPONENT_CATALOG_CACHE_KEY = "gvm_payroll:component_catalog"
+
+# Candidate names per role, in order of preference
+COMPONENT_ALIASES = {
+	"basic": ["Basic Salary", "Basic", "BASIC", "Basic Pay"],
+	"da": ["Dearness Allowences", "Dearness Allowence", "DA", "D.A.", "Dearness"],
+	"ta": ["Travel Allowences", "Travel Allowence", "TA", "T.A.", "Travel"],
+	"group_insurance": ["Group Insurance", "Group Ins", "Grinsur", "Group Insur"],
+	"lic": ["LIC", "Life Insurance", "Life Insurance Corporation"],
+	"pf_employee": [
+		"Provident Fund - Employee Contribution",
+		"PF - Employee Contribution",
+		"PF Employee Contribution",
+		"Provident Fund Employee",
+	],
+	"eps": ["Employee Pension Scheme", "EPS", "Employee Pension"],
+	"edli": ["EDLI", "Employee Deposit Linked Insurance"],
+	"esi_ee": ["ESI - Employee Contribution", "ESI-Employee Contribution", "ESI Employee"],
+	"esi_er": ["ESI-Employer Contribution", "ESI - Employer Contribution", "ESI Employer"],
+	"house_rent": ["House Rent", "HRA", "H.Rent", "H Rent"],
+	"water": ["Water Charges", "Water", "W"],
+	"garbage": ["Garbage Maintainence", "Garbage", "Garb", "G"],
+	"servant": ["Servant Charge", "Servant", "Serv", "S"],
+	"parking": ["Parking Charge", "Parking", "Park", "P"],
+}
+
+# Name prefixes that also identify a role, matched after all aliases ("p. charge", "da arrear")
+COMPONENT_PREFIXES = {
+	"da": ["da "],
+	"ta": ["ta "],
+	"water": ["w."],
+	"garbage": ["g."],
+	"servant": ["s."],
+	"parking": ["p."],
+}
+
+# Words that rule a component out of a role, e.g. "House Rent Allowance" is an earning, not recovered rent
+COMPONENT_EXCLUDES = {
+	"house_rent": ["allowance"],
+}
+
+# Salary Detail table a role is read from; None means either
+ROLE_PARENTFIELDS = {
+	"basic": "earnings",
+	"da": "earnings",
+	"ta": "earnings",
+	"eps": "earnings",
+	"edli": "earnings",
+	"esi_er": "earnings",
+	"house_rent": None,
+	"water": None,
+	"garbage": None,
+	"servant": None,
+	"parking": None,
+	"pf_employee": "deductions",
+	"esi_ee": "deductions",
+	"group_insurance": "deductions",
+	"lic": "deductions",
+}
+
+# Aliases this short ("DA", "TA", "LIC") only ever match whole names; as substrings
+# they would hit unrelated components such as "Holiday Pay".
+MIN_PARTIAL_LENGTH = 4
+
+EXACT, CASE_INSENSITIVE, PARTIAL, PREFIX = 0, 1, 2, 3
+
+
+def get_alias_rank(component, aliases, prefixes=(), excludes=()):
+	"""Rank of ``component`` against an ordered alias list, or ``None`` if it does not match.
+
+	Ranks compare as ``(alias position, match kind)`` so an exact match on an
+	earlier alias beats a partial match on any later one.
+	"""
+	lowered = component.lower().strip()
+	if any(word in lowered for word in excludes):
+		return None
+
+	for pos, alias in enumerate(aliases):
+		alias_lower = alias.lower()
+		if component == alias:
+			return (pos, EXACT)
+		if lowered == alias_lower:
+			return (pos, CASE_INSENSITIVE)
+		if len(alias_lower) >= MIN_PARTIAL_LENGTH and alias_lower in lowered:
+			return (pos, PARTIAL)
+		if len(lowered) >= MIN_PARTIAL_LENGTH and lowered in alias_lower:
+			return (pos, PARTIAL)
+	for pos, prefix in enumerate(prefixes, start=len(aliases)):
+		if lowered.startswith(prefix):
+			return (pos, PREFIX)
+	return None
+
+
+def match_component_roles(component):
+	"""``{role: rank}`` for every role whose aliases match ``component``."""
+	roles = {}
+	for role, aliases in COMPONENT_ALIASES.items():
+		rank = get_alias_rank(
+			component, aliases, COMPONENT_PREFIXES.get(role, ()), COMPONENT_EXCLUDES.get(role, ())
+		)
+		if rank is not None:
+			roles[role] = rank
+	return roles
+
+
+def get_component_aliases(components):
+	"""Role matches for each name in ``components``, read from the cached component catalog.
+
+	Names that are not a Salary Component (anymore) are matched on the spot.
+	"""
+	catalog = get_component_catalog()
+	aliases = {}
+	for component in components:
+		details = catalog.get(component)
+		aliases[component] = details.roles if details else match_component_roles(component)
+	return aliases
+
+
+def resolve_component_roles(components, roles=None):
+	"""Best matching component name for each role among ``components``.
+
+	Ties between equally ranked names are broken by name so the result does not
+	depend on query order.
+	"""
+	roles = roles or COMPONENT_ALIASES.keys()
+	best = {}
+	for component, matches in sorted(get_component_aliases(components).items()):
+		for role in roles:
+			rank = matches.get(role)
+			if rank is not None and (role not in best or rank < best[role][0]):
+				best[role] = (rank, component)
+
+	return {role: component for role, (_rank, component) in best.items()}
+
+
+def get_component_roles(company, facts, roles):
+	"""Salary Component for each of ``roles``: the company's mapping, else the best alias match on the loaded slips."""
+	role_map = get_component_role_map(company)
+
+	resolved = {}
+	unmapped = {}
+	for role in roles:
+		if role_map.get(role):
+			resolved[role] = role_map[role]
+		else:
+			unmapped.setdefault(ROLE_PARENTFIELDS.get(role), []).append(role)
+
+	for parentfield, parentfield_roles in unmapped.items():
+		resolved.update(resolve_component_roles(facts.component_names(parentfield), parentfield_roles))
+
+	return resolved
+
+
+def get_component_columns(company, facts, roles):
+	"""Column index in ``facts`` for each of ``roles``; ``None`` when the component is on no slip."""
+	components = get_component_roles(company, facts, roles)
+	return {role: facts.component_index.get(components.get(role)) for role in roles}
+
+
+def get_component_catalog():
+	"""``{salary_component: {type, abbr, depends_on_payment_days, roles}}`` for every Salary Component, cached per site."""
+	return frappe.cache().get_value(COMPONENT_CATALOG_CACHE_KEY, generator=load_component_catalog)
+
+
+def load_component_catalog():
+	return {
+		component.name: frappe._dict(
+			type=component.type,
+			abbr=component.salary_component_abbr,
+			depends_on_payment_days=component.depends_on_payment_days,
+			roles=match_component_roles(component.name),
+		)
+		for component in frappe.get_all(
+			"Salary Component",
+			fields=["name", "type", "salary_component_abbr", "depends_on_payment_days"],
+		)
+	}
+
+
+def get_earning_and_deduction_types(components):
+	"""``(earnings, deductions)``: the names in ``components`` split by component type, each sorted."""
+	catalog = get_component_catalog()
+	types = {"Earning": [], "Deduction": []}
+	for component in components:
+		details = catalog.get(component)
+		if details and details.type in types:
+			types[details.type].append(component)
+	return sorted(types["Earning"]), sorted(types["Deduction"])
+
+
+def clear_component_cache(doc=None, method=None):
+	"""doc_event handler: drop the cached catalog, and the alias matches in it, when a Salary Component changes."""
+	frappe.cache().delete_value(COMPONENT_CATALOG_CACHE_KEY)
@@ -0,0 +1,39 @@
+"""Employee attributes for the employees on a report's salary slips.
+
+Reports used to select a column for every Employee on the site to show it next
+to a few hundred slips. These helpers fetch only the employees asked for, in
+chunks of ``EMPLOYEE_CHUNK_SIZE`` names per ``IN`` list, and remember every
+value for the rest of the request so one render never reads the same
+employee attribute twice.
+"""
+
+import frappe
+
+EMPLOYEE_CHUNK_SIZE = 1000
+
+
+def get_employee_values(employees, fieldname):
+	"""``{employee: value}`` of Employee ``fieldname`` for ``employees``; unknown employees map to ``None``."""
+	memo = get_request_memo().setdefault(fieldname, {})
+
+	missing = list({employee for employee in employees if employee and employee not in memo})
+	for start in range(0, len(missing), EMPLOYEE_CHUNK_SIZE):
+		chunk = missing[start : start + EMPLOYEE_CHUNK_SIZE]
+		memo.update(dict.fromkeys(chunk))
+		memo.update(
+			frappe.get_all(
+				"Employee",
+				filters={"name": ["in", chunk]},
+				fields=["name", fieldname],
+				as_list=True,
+			)
+		)
+
+	return frappe._dict({employee: memo.get(employee) for employee in employees})
+
+
+def get_request_memo():
+	"""``{fieldname: {employee: value}}`` kept on ``frappe.local`` for the current request or job."""
+	if not hasattr(frappe.local, "gvm_payroll_employee_values"):
+		frappe.local.gvm_payroll_employee_values = {}
+	return frappe.local.gvm_payroll_employee_values
@@ -0,0 +1,286 @@
+"""Compiled lookup index over a Pay Matrix.
+
+A Pay Matrix is stored as Pay Matrix Level documents whose ``years`` rows hold
+the cell number as a Data string and the amount as a Float. Pay fixation and
+the April/October increment runs need to answer "amount at level L, cell N",
+"next cell above X at level L" and "where does level L, cell N land on
+promotion" for thousands of employees, so this module compiles each matrix
+once into sorted arrays per level and answers those questions with binary
+search. Bulk lookups run per level on NumPy arrays.
+
+Indexes are kept in process memory and rebuilt only when the version stored
+in the site cache for their Pay Matrix changes; saving a level of the matrix
+or a Designation that maps to it bumps that version.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+
+import frappe
+import numpy as np
+from frappe.utils import cint, flt
+
+PAY_MATRIX_VERSION_CACHE_KEY = "gvm_payroll:pay_matrix_version"
+
+LEVEL_PATTERN = re.compile(r"^(\d+)([A-Za-z]*)$")
+
+# {(site, pay_matrix): (version, PayMatrixIndex)}, kept for the life of the worker
+_pay_matrix_indexes = {}
+
+
+def get_level_sort_key(level):
+	"""Numeric part first, then the alpha suffix (1 < 1A < 2); other values sort last."""
+	match = LEVEL_PATTERN.match(str(level or "").strip())
+	if not match:
+		return (1, 0, str(level or ""))
+	return (0, int(match.group(1)), match.group(2))
+
+
+def get_year_sort_key(year):
+	year = str(year or "").strip()
+	return (0, int(year), "") if year.isdigit() else (1, 0, year)
+
+
+class PayMatrixLevelCells:
+	"""Cells of one level: ``cells`` ascending with their ``amounts``, plus the amounts sorted for search."""
+
+	def __init__(self, name, label, cells):
+		cells = sorted(cells)
+		self.name = name
+		self.label = label
+		self.cells = [cell for cell, _amount in cells]
+		self.amounts = [amount for _cell, amount in cells]
+
+		by_amount = sorted(zip(self.amounts, self.cells, strict=True))
+		self.sorted_amounts = [amount for amount, _cell in by_amount]
+		self.sorted_cells = [cell for _amount, cell in by_amount]
+
+	def amount_at(self, cell):
+		"""``(cell, amount)`` at ``cell``, or at the closest lower cell; ``None`` below the first cell."""
+		pos = bisect_right(self.cells, cint(cell)) - 1
+		if pos < 0:
+			return None
+		return self.cells[pos], self.amounts[pos]
+
+	def next_higher(self, amount, inclusive=False):
+		"""First ``(cell, amount)`` above ``amount`` (or equal to it when ``inclusive``); ``None`` past the top."""
+		search = bisect_left if inclusive else bisect_right
+		pos = search(self.sorted_amounts, flt(amount))
+		if pos == len(self.sorted_amounts):
+			return None
+		return self.sorted_cells[pos], self.sorted_amounts[pos]
+
+
+class PayMatrixIndex:
+	"""Sorted lookup arrays for every level of one Pay Matrix.
+
+	Levels are addressed by their Pay Matrix Level name (what Designation
+	Matrix Level and ``Employee.custom_level`` store) or by their level label.
+	"""
+
+	def __init__(self, pay_matrix, levels, designation_levels=None):
+		self.pay_matrix = pay_matrix
+		self.levels = sorted(levels.values(), key=lambda level: get_level_sort_key(level.label))
+		self.level_names = [level.name for level in self.levels]
+		self._levels = {level.name: level for level in self.levels}
+		self._labels = {level.label: level for level in self.levels}
+		self._positions = {level.name: pos for pos, level in enumerate(self.levels)}
+		self.designation_levels = designation_levels or {}
+
+	def get_level(self, level):
+		return self._levels.get(level) or self._labels.get(level)
+
+	def get_designation_level(self, designation):
+		"""Pay Matrix Level mapped to ``designation`` for this matrix."""
+		return self.designation_levels.get(designation)
+
+	def amount_at(self, level, cell):
+		"""``(cell, amount)`` at ``level``/``cell`` or the closest lower cell; ``None`` if there is none."""
+		level = self.get_level(level)
+		return level.amount_at(cell) if level else None
+
+	def next_cell(self, level, cell):
+		"""The cell after ``cell`` at ``level`` (an annual increment); ``None`` at the top of the level."""
+		level = self.get_level(level)
+		if not level:
+			return None
+		pos = bisect_right(level.cells, cint(cell))
+		if pos == len(level.cells):
+			return None
+		return level.cells[pos], level.amounts[pos]
+
+	def next_higher_cell(self, level, amount, inclusive=False):
+		"""First cell at ``level`` paying more than ``amount`` (or the same when ``inclusive``)."""
+		level = self.get_level(level)
+		return level.next_higher(amount, inclusive) if level else None
+
+	def next_level(self, level):
+		"""The level after ``level`` in matrix order, ``None`` for the last level."""
+		level = self.get_level(level)
+		if not level:
+			return None
+		pos = self._positions[level.name] + 1
+		return self.levels[pos].name if pos < len(self.levels) else None
+
+	def promote(self, level, cell, to_level=None):
+		"""Fix pay on promotion from ``level``/``cell`` to ``to_level`` (default: the next level).
+
+		One notional increment is given in the current level, then pay is fixed
+		at the cell of the new level equal to or next above it. Returns
+		``(to_level, cell, amount)`` or ``None`` if either level cannot place it.
+		"""
+		current = self.amount_at(level, cell)
+		to_level = to_level or self.next_level(level)
+		if not current or not self.get_level(to_level):
+			return None
+
+		notional = self.next_cell(level, current[0]) or current
+		target = self.next_higher_cell(to_level, notional[1], inclusive=True)
+		if not target:
+			return None
+		return self.get_level(to_level).name, target[0], target[1]
+
+	def promotion_map(self, level, to_level=None):
+		"""``{cell: (to_level, cell, amount)}`` for every cell of ``level``."""
+		level = self.get_level(level)
+		if not level:
+			return {}
+		return {cell: self.promote(level.name, cell, to_level) for cell in level.cells}
+
+	def bulk_amount_at(self, levels, cells):
+		"""Amounts at ``levels[i]``/``cells[i]`` (closest lower cell) for many employees at once.
+
+		Returns ``(cells, amounts)`` arrays aligned with the input; positions
+		that cannot be resolved hold ``-1`` and ``nan``.
+		"""
+		return self._bulk(levels, cells, "cells", "amounts", side="right", offset=-1)
+
+	def bulk_next_higher_cell(self, levels, amounts, inclusive=False):
+		"""Cell and amount next above ``amounts[i]`` at ``levels[i]``, like :meth:`bulk_amount_at`."""
+		return self._bulk(
+			levels, amounts, "sorted_amounts", "sorted_amounts", side="left" if inclusive else "right", offset=0
+		)
+
+	def _bulk(self, levels, values, search_attr, amount_attr, side, offset):
+		levels = np.asarray(levels, dtype=object)
+		values = np.asarray(values, dtype=float)
+		out_cells = np.full(len(values), -1, dtype=int)
+		out_amounts = np.full(len(values), np.nan)
+
+		for name in set(levels.tolist()):
+			level = self.get_level(name)
+			if not level or not level.cells:
+				continue
+
+			rows = np.flatnonzero(levels == name)
+			keys = np.asarray(getattr(level, search_attr), dtype=float)
+			pos = np.searchsorted(keys, values[rows], side=side) + offset
+			found = (pos >= 0) & (pos < len(keys))
+
+			cells = level.cells if search_attr == "cells" else level.sorted_cells
+			out_cells[rows[found]] = np.asarray(cells)[pos[found]]
+			out_amounts[rows[found]] = np.asarray(getattr(level, amount_attr))[pos[found]]
+
+		return out_cells, out_amounts
+
+
+def get_pay_matrix_index(pay_matrix):
+	"""Compiled :class:`PayMatrixIndex` for ``pay_matrix``, or ``None`` if it is not set."""
+	if not pay_matrix:
+		return None
+	return get_pay_matrix_indexes([pay_matrix])[pay_matrix]
+
+
+def get_pay_matrix_indexes(pay_matrices):
+	"""``{pay_matrix: PayMatrixIndex}``, compiling every stale matrix with one query."""
+	pay_matrices = {pay_matrix for pay_matrix in pay_matrices if pay_matrix}
+	if not pay_matrices:
+		return {}
+
+	versions = get_pay_matrix_versions(pay_matrices)
+	indexes = {}
+	stale = set()
+	for pay_matrix in pay_matrices:
+		cached = _pay_matrix_indexes.get((frappe.local.site, pay_matrix))
+		if cached and cached[0] == versions[pay_matrix]:
+			indexes[pay_matrix] = cached[1]
+		else:
+			stale.add(pay_matrix)
+
+	for pay_matrix, index in build_pay_matrix_indexes(stale).items():
+		_pay_matrix_indexes[(frappe.local.site, pay_matrix)] = (versions[pay_matrix], index)
+		indexes[pay_matrix] = index
+
+	return indexes
+
+
+def build_pay_matrix_indexes(pay_matrices):
+	if not pay_matrices:
+		return {}
+
+	level = frappe.qb.DocType("Pay Matrix Level")
+	item = frappe.qb.DocType("Matrix Level Items")
+	rows = (
+		frappe.qb.from_(level)
+		.left_join(item)
+		.on((item.parent == level.name) & (item.parenttype == "Pay Matrix Level") & (item.parentfield == "years"))
+		.select(level.pay_matrix, level.name, level.level, item.year, item.amount)
+		.where(level.pay_matrix.isin(list(pay_matrices)))
+	).run(as_dict=True)
+
+	levels = {pay_matrix: {} for pay_matrix in pay_matrices}
+	cells = {}
+	for row in rows:
+		levels[row.pay_matrix].setdefault(row.name, row.level)
+		year = str(row.year or "").strip()
+		# Cells are numbered; a non-numeric year cannot be placed on the scale
+		if year.isdigit():
+			cells.setdefault(row.name, {})[int(year)] = flt(row.amount)
+
+	designation_levels = get_designation_levels(pay_matrices)
+
+	return {
+		pay_matrix: PayMatrixIndex(
+			pay_matrix,
+			{
+				name: PayMatrixLevelCells(name, label, cells.get(name, {}).items())
+				for name, label in levels[pay_matrix].items()
+			},
+			designation_levels.get(pay_matrix),
+		)
+		for pay_matrix in pay_matrices
+	}
+
+
+def get_designation_levels(pay_matrices):
+	"""``{pay_matrix: {designation: level}}`` from the Designation Matrix Level rows."""
+	designation_levels = {}
+	for designation, pay_matrix, level in frappe.get_all(
+		"Designation Matrix Level",
+		filters={"parenttype": "Designation", "pay_matrix": ["in", list(pay_matrices)]},
+		fields=["parent", "pay_matrix", "level"],
+		order_by="idx",
+		as_list=True,
+	):
+		# The first row for a matrix wins, as in the Employee form
+		designation_levels.setdefault(pay_matrix, {}).setdefault(designation, level)
+	return designation_levels
+
+
+def get_pay_matrix_versions(pay_matrices):
+	cache = frappe.cache()
+	return {pay_matrix: cache.hget(PAY_MATRIX_VERSION_CACHE_KEY, pay_matrix) for pay_matrix in pay_matrices}
+
+
+def bump_pay_matrix_version(*pay_matrices):
+	"""Invalidate every worker's compiled index of ``pay_matrices``."""
+	cache = frappe.cache()
+	for pay_matrix in {pay_matrix for pay_matrix in pay_matrices if pay_matrix}:
+		cache.hset(PAY_MATRIX_VERSION_CACHE_KEY, pay_matrix, frappe.generate_hash(length=10))
+
+
+def on_designation_update(doc, method=None):
+	"""doc_event handler: a Designation's matrix levels feed the indexes of the matrices it maps to."""
+	previous = doc.get_doc_before_save() if method == "on_update" else None
+	rows = list(doc.get("custom_matrix_levels") or []) + list(previous and previous.get("custom_matrix_levels") or [])
+	bump_pay_matrix_version(*[row.pay_matrix for row in rows])
@@ -0,0 +1,353 @@
+"""Pre-aggregated monthly payroll totals.
+
+Submitting a Salary Slip adds its component amounts to "Payroll Monthly Ledger"
+rows keyed by (company, employee, period, component); cancelling subtracts
+them again. Reports that opt in read the ledger instead of the raw Salary
+Detail rows, so their cost scales with employees × months. The ledger only
+covers submitted slips and has month granularity: ``period`` is the first day
+of the slip's pay period.
+"""
+
+from array import array
+
+import frappe
+from frappe.utils import cint, flt, get_first_day, get_last_day, getdate, now
+
+from gvm_payroll.gvm_payroll.utils.report_cache import bump_payroll_data_version, clear_report_cache
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import record_fetch
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	COMPONENT_TYPES,
+	SalarySlipFacts,
+	salary_detail,
+	salary_slip,
+)
+
+LEDGER_DOCTYPE = "Payroll Monthly Ledger"
+ledger = frappe.qb.DocType(LEDGER_DOCTYPE)
+
+# Salary Detail parentfield -> ledger component_type
+LEDGER_COMPONENT_TYPES = {"earnings": "Earning", "deductions": "Deduction"}
+SLIP_TOTAL = "Slip Total"
+
+# Salary Slip amounts kept as "Slip Total" rows, component = field name
+SLIP_TOTAL_FIELDS = (
+	"gross_pay",
+	"total_deduction",
+	"total_loan_repayment",
+	"net_pay",
+	"current_month_income_tax",
+)
+
+# Employee attributes copied onto every ledger row so reports can filter on them
+EMPLOYEE_FIELDS = ("employee_name", "department", "designation", "branch")
+
+LEDGER_COLUMNS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"company",
+	"employee",
+	*EMPLOYEE_FIELDS,
+	"period",
+	"component_type",
+	"component",
+	"amount",
+	"base_amount",
+	"slip_count",
+)
+
+DEFAULT_REBUILD_BATCH_SIZE = 500
+
+# Ledger rows per INSERT statement
+UPSERT_CHUNK_SIZE = 1000
+
+
+def use_payroll_ledger(filters):
+	"""Whether a report run should read the ledger rather than raw Salary Details.
+
+	Enabled by a truthy ``use_ledger`` filter or the ``gvm_payroll_use_ledger``
+	site config key, for runs the ledger returns the same figures for; any
+	other run reads the slips. The ledger is refused when the run is not over
+	submitted slips, when a date filter is not on a month boundary and when
+	an employee in scope has more than one slip in a month, since the ledger
+	keeps one row per employee and month. The ledger has no posting date, so
+	reports that restrict it (Consolidated Salary) never call this.
+	"""
+	enabled = filters.get("use_ledger") or frappe.conf.get("gvm_payroll_use_ledger")
+	if not cint(enabled) or filters.get("docstatus") not in (None, "", "Submitted"):
+		return False
+
+	from_date = filters.get("from_date")
+	to_date = filters.get("to_date")
+	if from_date and getdate(from_date) != get_first_day(from_date):
+		return False
+	if to_date and getdate(to_date) != get_last_day(to_date):
+		return False
+
+	return not has_merged_slips(filters)
+
+
+def has_merged_slips(filters):
+	"""Whether any ledger row in scope sums more than one slip of an employee and month."""
+	query = frappe.qb.from_(ledger).select(ledger.name).where(ledger.slip_count > 1).limit(1)
+	return bool(apply_ledger_filters(query, filters).run())
+
+
+def get_slip_entries(slip, details):
+	"""``{(component_type, component): [amount, base_amount]}`` for one slip.
+
+	``slip`` is any mapping with the Salary Slip fields, ``details`` an iterable
+	of ``(parentfield, salary_component, amount)``.
+	"""
+	exchange_rate = flt(slip.get("exchange_rate")) or 1
+	entries = {}
+
+	for parentfield, component, amount in details:
+		component_type = LEDGER_COMPONENT_TYPES.get(parentfield)
+		if not component_type:
+			continue
+		entry = entries.setdefault((component_type, component), [0.0, 0.0])
+		entry[0] += flt(amount)
+		entry[1] += flt(amount) * exchange_rate
+
+	for field in SLIP_TOTAL_FIELDS:
+		amount = flt(slip.get(field))
+		if amount:
+			entries[(SLIP_TOTAL, field)] = [amount, amount * exchange_rate]
+
+	return entries
+
+
+def post_slip_entries(slips, sign=1):
+	"""Add (``sign=1``) or subtract (``sign=-1``) ``[(slip, entries)]`` on the ledger in one upsert."""
+	timestamp = now()
+	user = frappe.session.user
+	values = []
+
+	for slip, entries in slips:
+		period = get_first_day(slip.get("start_date"))
+		for (component_type, component), (amount, base_amount) in entries.items():
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					user,
+					user,
+					slip.get("company"),
+					slip.get("employee"),
+					*(slip.get(field) for field in EMPLOYEE_FIELDS),
+					period,
+					component_type,
+					component,
+					sign * amount,
+					sign * base_amount,
+					sign,
+				)
+			)
+
+	if not values:
+		return
+
+	row_placeholder = "(" + ", ".join(["%s"] * len(LEDGER_COLUMNS)) + ")"
+	for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+		upsert_ledger_rows(values[start : start + UPSERT_CHUNK_SIZE], row_placeholder)
+
+	if sign < 0:
+		# Drop rows no submitted slip contributes to any more
+		frappe.qb.from_(ledger).delete().where(ledger.slip_count <= 0).where(
+			ledger.employee.isin(list({slip.get("employee") for slip, _entries in slips}))
+		).run()
+
+
+def upsert_ledger_rows(values, row_placeholder):
+	frappe.db.sql(
+		f"""
+		insert into `tab{LEDGER_DOCTYPE}` ({", ".join(f"`{column}`" for column in LEDGER_COLUMNS)})
+		values {", ".join([row_placeholder] * len(values))}
+		on duplicate key update
+			`amount` = `amount` + values(`amount`),
+			`base_amount` = `base_amount` + values(`base_amount`),
+			`slip_count` = `slip_count` + values(`slip_count`),
+			`employee_name` = values(`employee_name`),
+			`department` = values(`department`),
+			`designation` = values(`designation`),
+			`branch` = values(`branch`),
+			`modified` = values(`modified`),
+			`modified_by` = values(`modified_by`)
+		""",
+		[value for row in values for value in row],
+	)
+
+
+def post_salary_slip(doc, sign):
+	details = [(row.parentfield, row.salary_component, row.amount) for row in doc.earnings + doc.deductions]
+	post_slip_entries([(doc, get_slip_entries(doc, details))], sign)
+
+
+def on_salary_slip_submit(doc, method=None):
+	"""doc_event handler: add a submitted Salary Slip to the ledger."""
+	post_salary_slip(doc, 1)
+
+
+def on_salary_slip_cancel(doc, method=None):
+	"""doc_event handler: take a cancelled Salary Slip back out of the ledger."""
+	post_salary_slip(doc, -1)
+
+
+def rebuild_payroll_ledger(company=None, batch_size=DEFAULT_REBUILD_BATCH_SIZE):
+	"""Recompute the ledger from submitted Salary Slips, optionally for one company.
+
+	Slips are read and posted ``batch_size`` at a time. Returns the number of
+	slips posted.
+	"""
+	delete = frappe.qb.from_(ledger).delete()
+	if company:
+		delete = delete.where(ledger.company == company)
+	delete.run()
+
+	columns = set(frappe.db.get_table_columns("Salary Slip"))
+	fields = [
+		field
+		for field in (
+			"name",
+			"company",
+			"employee",
+			*EMPLOYEE_FIELDS,
+			"start_date",
+			"exchange_rate",
+			*SLIP_TOTAL_FIELDS,
+		)
+		if field in columns
+	]
+
+	query = frappe.qb.from_(salary_slip).select(*[salary_slip[field] for field in fields]).where(
+		salary_slip.docstatus == 1
+	)
+	if company:
+		query = query.where(salary_slip.company == company)
+	slips = query.orderby(salary_slip.name).run(as_dict=True)
+
+	for start in range(0, len(slips), batch_size):
+		batch = slips[start : start + batch_size]
+		details = {}
+		for parent, parentfield, component, amount in (
+			frappe.qb.from_(salary_detail)
+			.select(
+				salary_detail.parent,
+				salary_detail.parentfield,
+				salary_detail.salary_component,
+				salary_detail.amount,
+			)
+			.where(salary_detail.parenttype == "Salary Slip")
+			.where(salary_detail.parent.isin([slip.name for slip in batch]))
+			.run()
+		):
+			details.setdefault(parent, []).append((parentfield, component, amount))
+
+		post_slip_entries([(slip, get_slip_entries(slip, details.get(slip.name, ()))) for slip in batch])
+
+	# Reports reading the ledger must not serve results cached before the rebuild
+	if company:
+		bump_payroll_data_version(company)
+	else:
+		clear_report_cache()
+
+	return len(slips)
+
+
+def get_ledger_facts(filters, fields, parentfields=COMPONENT_TYPES, apply_exchange_rate=False):
+	"""Load ledger rows for ``filters`` as a :class:`SalarySlipFacts`.
+
+	Each (employee, period) pair becomes one pseudo-slip named
+	``"<employee>:<period>"`` with ``start_date`` set to the period. Slip-level
+	``fields`` in :data:`SLIP_TOTAL_FIELDS` are read from the "Slip Total" rows;
+	with ``apply_exchange_rate`` all amounts are in company currency. Callers
+	check :func:`use_payroll_ledger` first, so each pseudo-slip stands for
+	exactly one Salary Slip.
+	"""
+	fields = ["name", *(field for field in fields if field != "name")]
+	amount_field = ledger.base_amount if apply_exchange_rate else ledger.amount
+
+	component_types = [LEDGER_COMPONENT_TYPES[parentfield] for parentfield in parentfields]
+	if any(field in SLIP_TOTAL_FIELDS for field in fields):
+		component_types.append(SLIP_TOTAL)
+
+	query = (
+		frappe.qb.from_(ledger)
+		.select(
+			ledger.employee,
+			ledger.period,
+			ledger.component_type,
+			ledger.component,
+			amount_field,
+			*[ledger[field] for field in EMPLOYEE_FIELDS],
+			ledger.company,
+		)
+		.where(ledger.component_type.isin(component_types))
+		.orderby(ledger.employee)
+		.orderby(ledger.period)
+	)
+
+	rows = apply_ledger_filters(query, filters).run()
+	record_fetch(LEDGER_DOCTYPE, rows)
+
+	parentfield_by_type = {
+		component_type: parentfield for parentfield, component_type in LEDGER_COMPONENT_TYPES.items()
+	}
+	slip_rows = {}
+	components = []
+	component_index = {}
+	present = {}
+	cells = []
+
+	for employee, period, component_type, component, amount, *employee_values, company in rows:
+		key = f"{employee}:{period}"
+		slip = slip_rows.get(key)
+		if slip is None:
+			slip = slip_rows[key] = dict(
+				zip(EMPLOYEE_FIELDS, employee_values, strict=True),
+				name=key,
+				employee=employee,
+				company=company,
+				start_date=period,
+			)
+
+		if component_type == SLIP_TOTAL:
+			slip[component] = flt(slip.get(component)) + flt(amount)
+			continue
+
+		parentfield = parentfield_by_type[component_type]
+		if component not in component_index:
+			component_index[component] = len(components)
+			components.append(component)
+		seen = present.setdefault(parentfield, {})
+		seen[component] = seen.get(component) or bool(amount)
+		cells.append((key, parentfield, component, flt(amount)))
+
+	slips = [tuple(slip.get(field) for field in fields) for slip in slip_rows.values()]
+	facts = SalarySlipFacts(fields, slips, components, {}, present)
+
+	width = len(components)
+	for parentfield in parentfields:
+		facts.amounts[parentfield] = array("d", bytes(8 * width * len(slips)))
+		facts.filled[parentfield] = bytearray(width * len(slips))
+	for key, parentfield, component, amount in cells:
+		cell = facts.slip_index[key] * width + component_index[component]
+		facts.amounts[parentfield][cell] += amount
+		facts.filled[parentfield][cell] = 1
+
+	return facts
+
+
+def apply_ledger_filters(query, filters):
+	if filters.get("from_date"):
+		query = query.where(ledger.period >= get_first_day(filters.get("from_date")))
+	if filters.get("to_date"):
+		query = query.where(ledger.period <= getdate(filters.get("to_date")))
+	for field in ("company", "employee", "department", "designation", "branch"):
+		if filters.get(field):
+			query = query.where(ledger[field] == filters.get(field))
+	return query
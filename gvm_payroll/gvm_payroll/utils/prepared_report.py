@@ -0,0 +1,161 @@
+"""Background preparation of payroll reports over large slip sets.
+
+A fiscal-year Annual Statement or a quarterly Salary Summary can take longer
+than a web request is allowed to run. Reports wrapped with
+:func:`prepare_large_report` estimate their slip count with one ``COUNT``
+first; below ``gvm_payroll_prepared_report_threshold`` slips (site config,
+default 5000) they run inline as before. Above it the run is queued on the
+long queue and the request returns at once with a message; the job publishes
+its progress to the user while the Salary Detail chunks load, and stores the
+result compressed in Redis under the same key as the report cache (report,
+filters and the company's payroll data version). Reopening the report with
+the same filters serves the stored result until the payroll data changes or
+the result expires.
+
+Frappe's own Prepared Report (``prepared_report`` on the Report) queues every
+run of a report, including one-month and paged runs that finish in a
+request, and keeps each result until it is rebuilt by hand, even after the
+slips under it changed. A site that prefers it can still turn it on for a
+report; the report then always runs inline here and Frappe queues it.
+"""
+
+import functools
+import pickle
+import zlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+from frappe.utils.background_jobs import is_job_enqueued
+
+from gvm_payroll.gvm_payroll.utils.report_cache import get_report_cache_key
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import set_report_progress_handler
+
+PREPARED_REPORT_PREFIX = "gvm_payroll:prepared_report"
+PREPARED_REPORTS = {
+	"Annual Statement": "gvm_payroll.gvm_payroll.report.annual_statement.annual_statement.execute",
+	"Salary Summary": "gvm_payroll.gvm_payroll.report.salary_summary.salary_summary.execute",
+}
+
+DEFAULT_THRESHOLD = 5000
+PREPARED_REPORT_TTL = 24 * 60 * 60
+PREPARED_REPORT_JOB_TIMEOUT = 3600
+
+
+def prepare_large_report(report_name, estimate_slip_count):
+	"""Decorate a report's ``execute`` to queue runs over more slips than the threshold.
+
+	``estimate_slip_count(filters)`` returns the number of slips the run would
+	read; returning 0 keeps the run inline.
+	"""
+
+	def decorator(execute):
+		@functools.wraps(execute)
+		def wrapper(filters=None):
+			filters = filters or {}
+			if (
+				getattr(frappe.local, "gvm_payroll_preparing_report", False)
+				or cint(filters.get("diagnostics"))
+				or frappe.get_cached_value("Report", report_name, "prepared_report")
+			):
+				return execute(filters)
+
+			slip_count = estimate_slip_count(filters) if filters.get("company") else 0
+			threshold = cint(frappe.conf.get("gvm_payroll_prepared_report_threshold")) or DEFAULT_THRESHOLD
+			if slip_count < threshold:
+				return execute(filters)
+
+			return get_prepared_result(report_name, filters, slip_count)
+
+		return wrapper
+
+	return decorator
+
+
+def get_prepared_result(report_name, filters, slip_count):
+	"""The stored result of these filters, or a message while it is being prepared."""
+	key = get_report_cache_key(report_name, filters)
+	data = frappe.cache().get(get_result_key(key))
+	if data is not None:
+		return pickle.loads(zlib.decompress(data))
+
+	status = frappe.cache().get_value(get_status_key(key)) or {}
+	if status.get("status") == "Failed":
+		# Show the failure once; opening the report again queues a new run
+		frappe.cache().delete_value(get_status_key(key))
+		frappe.throw(_("Preparing {0} failed: {1}").format(report_name, status.get("error")))
+
+	if not is_job_enqueued(get_job_id(key)):
+		set_prepared_report_status(key, report_name, status="Queued", slip_count=slip_count)
+		frappe.enqueue(
+			"gvm_payroll.gvm_payroll.utils.prepared_report.run_prepared_report_job",
+			queue="long",
+			timeout=PREPARED_REPORT_JOB_TIMEOUT,
+			job_id=get_job_id(key),
+			deduplicate=True,
+			report_name=report_name,
+			filters=dict(filters),
+			key=key,
+			user=frappe.session.user,
+		)
+
+	message = _(
+		"This report covers about {0} salary slips and is being prepared in the background. It will load here when it is ready."
+	).format(slip_count)
+	return [], [], message
+
+
+def run_prepared_report_job(report_name, filters, key, user):
+	"""Background job: run the report, store its result compressed and tell the user."""
+	frappe.local.gvm_payroll_preparing_report = True
+	set_prepared_report_status(key, report_name, status="Running")
+
+	def on_progress(done, total):
+		set_prepared_report_status(key, report_name, done=done, total=total)
+		publish_prepared_report_progress(key, user)
+
+	set_report_progress_handler(on_progress)
+	try:
+		result = frappe.get_attr(PREPARED_REPORTS[report_name])(frappe._dict(filters))
+		data = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+		frappe.cache().set(get_result_key(key), data, ex=PREPARED_REPORT_TTL)
+	except Exception as e:
+		set_prepared_report_status(key, report_name, status="Failed", error=str(e))
+		frappe.log_error(title=f"Preparing {report_name} failed")
+		publish_prepared_report_progress(key, user)
+		raise
+	finally:
+		set_report_progress_handler(None)
+		frappe.local.gvm_payroll_preparing_report = False
+
+	set_prepared_report_status(key, report_name, status="Completed")
+	publish_prepared_report_progress(key, user)
+
+
+def get_result_key(key):
+	return frappe.cache().make_key(f"{PREPARED_REPORT_PREFIX}:result:{key}")
+
+
+def get_status_key(key):
+	return f"{PREPARED_REPORT_PREFIX}:status:{key}"
+
+
+def get_job_id(key):
+	return f"prepared_report::{key}"
+
+
+def set_prepared_report_status(key, report_name, **status):
+	"""Merge ``status`` into the run checkpoint kept in the site cache."""
+	checkpoint = frappe.cache().get_value(get_status_key(key)) or {}
+	if status.get("status") == "Queued":
+		checkpoint = {}
+	checkpoint.update(status, report_name=report_name)
+	frappe.cache().set_value(get_status_key(key), checkpoint, expires_in_sec=PREPARED_REPORT_TTL)
+
+
+def publish_prepared_report_progress(key, user):
+	frappe.publish_realtime(
+		"gvm_payroll_prepared_report",
+		{"key": key, **(frappe.cache().get_value(get_status_key(key)) or {})},
+		user=user,
+	)
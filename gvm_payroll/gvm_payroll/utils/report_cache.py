@@ -0,0 +1,188 @@
+"""Redis result cache for the gvm_payroll reports.
+
+Reconciling a closed month means reopening the same report with the same
+filters many times. Reports wrapped with :func:`cache_report_result` keep
+their result in Redis under a key made of the report name, the normalized
+filters, the language and the company's payroll data version. The version is
+replaced whenever a Salary Slip or Additional Salary of the company changes
+(see ``doc_events`` in hooks.py) and by every job that writes payroll data
+without the document controller (batched Additional Salary drafts, the
+annual increment, the ledger rebuild), so a cached result is never served
+after the data under it moved; entries of old versions are simply never read again
+and age out.
+
+Entries are compressed pickles with a TTL. A sorted set scored by last access
+time gives LRU order and a second one keeps each entry's size; after every
+write the least recently used entries are evicted until the cache is within
+its entry count and byte limits. Results larger than the per-entry limit are
+not cached. Limits come from site config:
+
+- ``gvm_payroll_report_cache``: set to 0 to disable the cache
+- ``gvm_payroll_report_cache_ttl``: seconds an entry lives (6 hours)
+- ``gvm_payroll_report_cache_max_entries`` (200)
+- ``gvm_payroll_report_cache_max_bytes`` (64 MB)
+- ``gvm_payroll_report_cache_max_entry_bytes`` (8 MB)
+"""
+
+import functools
+import hashlib
+import json
+import pickle
+import time
+import zlib
+
+import frappe
+from frappe.utils import cint
+
+PAYROLL_DATA_VERSION_CACHE_KEY = "gvm_payroll:payroll_data_version"
+REPORT_CACHE_PREFIX = "gvm_payroll:report_cache"
+
+DEFAULT_TTL = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# Filters that change how a run is traced, not what it returns
+IGNORED_FILTERS = ("diagnostics",)
+
+
+def cache_report_result(report_name):
+	"""Decorate a report's ``execute`` to serve repeated runs from the report cache."""
+
+	def decorator(execute):
+		@functools.wraps(execute)
+		def wrapper(filters=None):
+			filters = filters or {}
+			if not is_report_cache_enabled() or not filters.get("company") or cint(filters.get("diagnostics")):
+				return execute(filters)
+
+			key = get_report_cache_key(report_name, filters)
+			result = get_cached_result(key)
+			if result is None:
+				result = execute(filters)
+				set_cached_result(key, result)
+			return result
+
+		return wrapper
+
+	return decorator
+
+
+def is_report_cache_enabled():
+	return cint(frappe.conf.get("gvm_payroll_report_cache", 1))
+
+
+def get_report_cache_key(report_name, filters):
+	"""Digest of the report, its non-empty filters, the language and the company's data version."""
+	normalized = {
+		key: value
+		for key, value in filters.items()
+		if key not in IGNORED_FILTERS and value not in (None, "", [])
+	}
+	payload = json.dumps(
+		{
+			"report": report_name,
+			"filters": normalized,
+			"lang": frappe.local.lang,
+			"version": get_payroll_data_version(filters.get("company")),
+		},
+		sort_keys=True,
+		default=str,
+	)
+	return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_payroll_data_version(company):
+	version = frappe.cache().hget(PAYROLL_DATA_VERSION_CACHE_KEY, company)
+	if not version:
+		version = bump_payroll_data_version(company)
+	return version
+
+
+def bump_payroll_data_version(company):
+	"""Give ``company`` a new data version so none of its cached results is read again."""
+	version = frappe.generate_hash(length=10)
+	frappe.cache().hset(PAYROLL_DATA_VERSION_CACHE_KEY, company, version)
+	return version
+
+
+def clear_report_cache(doc=None, method=None):
+	"""Drop every company's data version, for changes that are not tied to one company."""
+	frappe.cache().delete_value(PAYROLL_DATA_VERSION_CACHE_KEY)
+
+
+def on_payroll_data_change(doc, method=None):
+	"""doc_event handler: a slip or additional salary changed, so the company's cached results are stale."""
+	company = doc.get("company")
+	if company:
+		bump_payroll_data_version(company)
+	else:
+		clear_report_cache()
+
+
+def get_cache_keys(digest=None):
+	cache = frappe.cache()
+	return (
+		cache.make_key(f"{REPORT_CACHE_PREFIX}:entry:{digest}") if digest else None,
+		cache.make_key(f"{REPORT_CACHE_PREFIX}:lru"),
+		cache.make_key(f"{REPORT_CACHE_PREFIX}:sizes"),
+	)
+
+
+def get_cached_result(digest):
+	cache = frappe.cache()
+	entry_key, lru_key, sizes_key = get_cache_keys(digest)
+
+	data = cache.get(entry_key)
+	if data is None:
+		# Expired by its TTL, or never cached
+		cache.zrem(lru_key, digest)
+		cache.zrem(sizes_key, digest)
+		return None
+
+	cache.zadd(lru_key, {digest: time.time()})
+	return pickle.loads(zlib.decompress(data))
+
+
+def set_cached_result(digest, result):
+	data = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+	max_entry_bytes = cint(frappe.conf.get("gvm_payroll_report_cache_max_entry_bytes")) or DEFAULT_MAX_ENTRY_BYTES
+	if len(data) > max_entry_bytes:
+		return
+
+	cache = frappe.cache()
+	entry_key, lru_key, sizes_key = get_cache_keys(digest)
+	ttl = cint(frappe.conf.get("gvm_payroll_report_cache_ttl")) or DEFAULT_TTL
+
+	pipeline = cache.pipeline()
+	pipeline.set(entry_key, data, ex=ttl)
+	pipeline.zadd(lru_key, {digest: time.time()})
+	pipeline.zadd(sizes_key, {digest: len(data)})
+	pipeline.execute()
+
+	evict_report_cache()
+
+
+def evict_report_cache():
+	"""Remove least recently used entries until the cache is within its count and size limits."""
+	cache = frappe.cache()
+	_entry_key, lru_key, sizes_key = get_cache_keys()
+	max_entries = cint(frappe.conf.get("gvm_payroll_report_cache_max_entries")) or DEFAULT_MAX_ENTRIES
+	max_bytes = cint(frappe.conf.get("gvm_payroll_report_cache_max_bytes")) or DEFAULT_MAX_BYTES
+
+	sizes = dict(cache.zrange(sizes_key, 0, -1, withscores=True))
+	total = sum(sizes.values())
+	count = len(sizes)
+	if count <= max_entries and total <= max_bytes:
+		return
+
+	for digest in cache.zrange(lru_key, 0, -1):
+		if count <= max_entries and total <= max_bytes:
+			break
+		digest = frappe.safe_decode(digest)
+		entry_key = get_cache_keys(digest)[0]
+		cache.delete(entry_key)
+		cache.zrem(lru_key, digest)
+		cache.zrem(sizes_key, digest)
+		total -= sizes.get(digest.encode(), 0)
+		count -= 1
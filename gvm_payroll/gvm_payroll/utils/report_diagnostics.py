@@ -0,0 +1,144 @@
+"""Opt-in, per-run diagnostics for the gvm_payroll reports.
+
+Reports collect traces in memory while they run and write a single Error Log
+record at the end, instead of logging from inside their per-slip loops.
+Diagnostics are enabled by a truthy ``diagnostics`` report filter or by the
+``gvm_payroll_report_diagnostics`` site config key; when disabled,
+:func:`get_report_diagnostics` returns ``None`` and callers skip all trace work.
+
+Reports wrapped with :func:`track_report_fetch` also measure what their shared
+slip and ledger queries fetch: rows and an estimate of the bytes of the values
+returned. At the end of a run the totals are passed to every function of the
+``gvm_payroll_report_fetch_stats`` hook as ``fn(report_name, stats)``, and to
+the Error Log when the ``gvm_payroll_log_report_fetch`` site config key is
+set, so a report that starts reading wider rows shows up. Nothing is measured
+when neither is configured. A background run can likewise register a progress
+handler that the loaders call as they fetch the Salary Detail chunks.
+"""
+
+import functools
+from datetime import date, datetime
+
+import frappe
+from frappe.utils import cint
+
+DEFAULT_TRACE_LIMIT = 200
+
+
+class ReportDiagnostics:
+	"""Bounded in-memory trace buffer flushed as one Error Log record."""
+
+	def __init__(self, title, limit=DEFAULT_TRACE_LIMIT):
+		self.title = title
+		self.limit = limit
+		self.traces = []
+		self.dropped = 0
+		self.counters = {}
+		self.context = {}
+
+	def trace(self, kind, **details):
+		"""Record one trace, keeping at most ``limit`` of them."""
+		self.count(kind)
+		if len(self.traces) < self.limit:
+			self.traces.append({"kind": kind, **details})
+		else:
+			self.dropped += 1
+
+	def count(self, key, increment=1):
+		self.counters[key] = self.counters.get(key, 0) + increment
+
+	def set_context(self, **context):
+		"""Attach run-level values (filters, resolved components, …) to the summary."""
+		self.context.update(context)
+
+	def flush(self):
+		"""Write the collected traces as a single Error Log record."""
+		frappe.log_error(
+			title=self.title,
+			message=frappe.as_json(
+				{
+					"context": self.context,
+					"counters": self.counters,
+					"traces": self.traces,
+					"dropped_traces": self.dropped,
+				}
+			),
+		)
+
+
+def get_report_diagnostics(title, filters=None):
+	"""Return a :class:`ReportDiagnostics` when diagnostics are enabled, else ``None``."""
+	enabled = (filters or {}).get("diagnostics") or frappe.conf.get("gvm_payroll_report_diagnostics")
+	if not cint(enabled):
+		return None
+
+	limit = cint(frappe.conf.get("gvm_payroll_report_diagnostics_limit")) or DEFAULT_TRACE_LIMIT
+	return ReportDiagnostics(title, limit=limit)
+
+
+def track_report_fetch(report_name):
+	"""Decorate a report's ``execute`` to report the rows and bytes its queries fetched."""
+
+	def decorator(execute):
+		@functools.wraps(execute)
+		def wrapper(*args, **kwargs):
+			listeners = frappe.get_hooks("gvm_payroll_report_fetch_stats") or []
+			log = cint(frappe.conf.get("gvm_payroll_log_report_fetch"))
+			if not listeners and not log:
+				return execute(*args, **kwargs)
+
+			outer = getattr(frappe.local, "gvm_payroll_fetch_stats", None)
+			stats = frappe.local.gvm_payroll_fetch_stats = {"queries": 0, "rows": 0, "bytes": 0, "sources": {}}
+			try:
+				return execute(*args, **kwargs)
+			finally:
+				frappe.local.gvm_payroll_fetch_stats = outer
+				for listener in listeners:
+					frappe.get_attr(listener)(report_name, stats)
+				if log:
+					frappe.log_error(title=f"{report_name} Fetch Stats", message=frappe.as_json(stats))
+
+		return wrapper
+
+	return decorator
+
+
+def record_fetch(source, rows):
+	"""Add ``rows`` fetched by the query ``source`` to the stats of the running report, if any."""
+	stats = getattr(frappe.local, "gvm_payroll_fetch_stats", None)
+	if stats is None:
+		return
+
+	size = sum(get_value_size(value) for row in rows for value in row)
+	stats["queries"] += 1
+	stats["rows"] += len(rows)
+	stats["bytes"] += size
+
+	source_stats = stats["sources"].setdefault(source, {"queries": 0, "rows": 0, "bytes": 0})
+	source_stats["queries"] += 1
+	source_stats["rows"] += len(rows)
+	source_stats["bytes"] += size
+
+
+def get_value_size(value):
+	"""Approximate wire size of one fetched value."""
+	if value is None:
+		return 0
+	if isinstance(value, str | bytes):
+		return len(value)
+	if isinstance(value, datetime):
+		return 8
+	if isinstance(value, date):
+		return 4
+	return 8
+
+
+def set_report_progress_handler(handler):
+	"""Have the shared loaders call ``handler(done, total)`` as they fetch; ``None`` stops it."""
+	frappe.local.gvm_payroll_report_progress = handler
+
+
+def report_progress(done, total):
+	handler = getattr(frappe.local, "gvm_payroll_report_progress", None)
+	if handler:
+		handler(done, total)
@@ -0,0 +1,101 @@
+"""Composite indexes for the report access pattern on Salary Slip and Salary Detail.
+
+Every report selects slips by company, docstatus and pay period, then reads
+their component rows by (parent, parentfield). The standard indexes only cover
+single columns, so these composites are added by a patch:
+
+- Salary Slip (company, docstatus, start_date, end_date) for the slip query;
+- Salary Detail (parent, parentfield, salary_component, amount), which covers
+  the component fetch so it never reads the Salary Detail rows themselves.
+
+:func:`check_report_indexes` runs ``EXPLAIN`` on the queries the reports
+actually build and tells whether each one picks its index.
+"""
+
+import frappe
+from frappe.utils import add_months, get_first_day, get_last_day, nowdate
+
+from gvm_payroll.gvm_payroll.utils.salary_slip_facts import (
+	get_component_totals_query,
+	get_salary_detail_query,
+	get_salary_slip_query,
+	salary_slip,
+)
+
+REPORT_INDEXES = {
+	"Salary Slip": ("gvm_payroll_report_period", ("company", "docstatus", "start_date", "end_date")),
+	"Salary Detail": (
+		"gvm_payroll_report_component",
+		("parent", "parentfield", "salary_component", "amount"),
+	),
+}
+
+# Slip names used for the EXPLAIN of the component fetch
+SAMPLE_SLIP_COUNT = 100
+
+
+def add_report_indexes():
+	"""Create the report indexes that do not exist yet; safe to run again."""
+	for doctype, (index_name, fields) in REPORT_INDEXES.items():
+		frappe.db.add_index(doctype, list(fields), index_name=index_name)
+
+
+def check_report_indexes(company=None, from_date=None, to_date=None):
+	"""``EXPLAIN`` the report queries for a company and period; one result per (query, table)."""
+	company = company or frappe.db.get_single_value("Global Defaults", "default_company")
+	from_date = from_date or get_first_day(add_months(nowdate(), -1))
+	to_date = to_date or get_last_day(from_date)
+	filters = frappe._dict(company=company, from_date=from_date, to_date=to_date)
+
+	slip_query = get_salary_slip_query(filters, ["name"])
+	slip_names = slip_query.limit(SAMPLE_SLIP_COUNT).run(pluck=True) or [""]
+
+	queries = (
+		("Salary Slip by period", slip_query, ("Salary Slip",)),
+		("Salary Detail of slips", get_salary_detail_query(slip_names), ("Salary Detail",)),
+		("Component totals", get_component_totals_query(filters), ("Salary Slip", "Salary Detail")),
+		(
+			"Salary Slip by posting date",
+			get_salary_slip_query(filters, ["name"], by_posting_date=True).orderby(salary_slip.employee),
+			("Salary Slip",),
+		),
+	)
+
+	results = []
+	for label, query, doctypes in queries:
+		plan = explain(query)
+		for doctype in doctypes:
+			index_name = REPORT_INDEXES[doctype][0]
+			used = get_used_index(plan, doctype)
+			results.append(
+				frappe._dict(
+					query=label,
+					doctype=doctype,
+					index=index_name,
+					used_index=used,
+					ok=used == index_name,
+				)
+			)
+	return results
+
+
+def explain(query):
+	if frappe.db.db_type == "postgres":
+		return "\n".join(row[0] for row in frappe.db.sql(f"EXPLAIN {query}"))
+	return frappe.db.sql(f"EXPLAIN {query}", as_dict=True)
+
+
+def get_used_index(plan, doctype):
+	"""Index the plan reads ``doctype`` through, or ``None`` for a full scan."""
+	if isinstance(plan, str):
+		# Postgres prints the plan as text: "Index Scan using <index> on <table>"
+		table = f'"tab{doctype}"'
+		for line in plan.splitlines():
+			if table in line and " using " in line:
+				return line.split(" using ", 1)[1].split(" ", 1)[0]
+		return None
+
+	for row in plan:
+		if row.get("table") == f"tab{doctype}":
+			return row.get("key")
+	return None
@@ -0,0 +1,369 @@
+"""Shared salary slip loader for the gvm_payroll reports.
+
+Every report used to run its own ``select(salary_slip.star)`` followed by one
+Salary Slip ⨝ Salary Detail query for earnings and another for deductions,
+building a ``frappe._dict`` per slip per component. This module runs the slip
+query once with only the columns a report asks for, fetches all component rows
+in bounded ``IN`` chunks and keeps the amounts in flat ``array("d")`` buffers.
+"""
+
+from array import array
+
+import frappe
+from frappe.query_builder.functions import Abs, Coalesce, Max, NullIf, Sum
+from frappe.utils import flt
+
+from gvm_payroll.gvm_payroll.utils.report_diagnostics import record_fetch, report_progress
+
+salary_slip = frappe.qb.DocType("Salary Slip")
+salary_detail = frappe.qb.DocType("Salary Detail")
+
+DOC_STATUS = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
+COMPONENT_TYPES = ("earnings", "deductions")
+
+# Slips per page when a report walks its range page by page
+DEFAULT_PAGE_SIZE = 1000
+
+# Slip names per Salary Detail IN list; a year of slips in one statement is slow
+# to parse and can exceed max_allowed_packet
+DETAIL_CHUNK_SIZE = 1000
+
+
+class SalarySlipFacts:
+	"""Columnar view over the salary slips matched by one filter set.
+
+	``slips`` holds the raw result tuples of the slip query in ``fields`` order.
+	For each parentfield, ``amounts[parentfield]`` is a dense slip × component
+	matrix stored row-major, so the amount of component ``j`` on slip ``i`` is
+	``amounts[parentfield][i * len(components) + j]``. ``present[parentfield]``
+	maps every component that has a detail row under that parentfield to whether
+	any of those rows is non-zero. ``filled[parentfield]`` is a byte mask of the
+	same shape as the amounts, set where the slip has a detail row, so a
+	component missing from a slip can be told apart from one paid as zero.
+	"""
+
+	def __init__(self, fields, slips, components, amounts, present, filled=None):
+		self.fields = fields
+		self.slips = slips
+		self.components = components
+		self.amounts = amounts
+		self.present = present
+		self.filled = filled if filled is not None else {}
+
+		self.field_index = {field: pos for pos, field in enumerate(fields)}
+		self.slip_index = {row[0]: idx for idx, row in enumerate(slips)}
+		self.component_index = {component: idx for idx, component in enumerate(components)}
+
+	def __len__(self):
+		return len(self.slips)
+
+	def __bool__(self):
+		return bool(self.slips)
+
+	def slip(self, idx):
+		"""Return slip ``idx`` as a ``frappe._dict`` of the selected fields."""
+		return frappe._dict(zip(self.fields, self.slips[idx], strict=True))
+
+	def iter_slips(self):
+		for idx in range(len(self.slips)):
+			yield idx, self.slip(idx)
+
+	def column(self, field):
+		pos = self.field_index[field]
+		return [row[pos] for row in self.slips]
+
+	def get(self, idx, component, parentfield):
+		"""Amount of ``component`` under ``parentfield`` on slip ``idx``; ``None`` when the slip has no such row."""
+		component_idx = self.component_index.get(component)
+		if not self.has_row(idx, component_idx, parentfield):
+			return None
+		return self.amount_at(idx, component_idx, parentfield)
+
+	def has_row(self, idx, component_idx, parentfield):
+		"""Whether slip ``idx`` has a detail row for column ``component_idx`` under ``parentfield``."""
+		mask = self.filled.get(parentfield)
+		if component_idx is None or mask is None:
+			return False
+		return bool(mask[idx * len(self.components) + component_idx])
+
+	def amount_at(self, idx, component_idx, parentfield):
+		"""Amount in column ``component_idx`` of slip ``idx``; a ``None`` column reads as 0.0."""
+		if component_idx is None or parentfield not in self.amounts:
+			return 0.0
+		return self.amounts[parentfield][idx * len(self.components) + component_idx]
+
+	def slip_components(self, idx, parentfield):
+		"""Non-zero ``{component: amount}`` map of one slip, in component order."""
+		width = len(self.components)
+		offset = idx * width
+		values = self.amounts.get(parentfield)
+		if values is None:
+			return {}
+
+		return {
+			component: values[offset + component_idx]
+			for component_idx, component in enumerate(self.components)
+			if values[offset + component_idx]
+		}
+
+	def component_names(self, parentfield=None):
+		"""Components that have at least one non-zero detail row, optionally for one parentfield."""
+		return get_component_names(self.present, parentfield)
+
+	def component_totals(self, parentfield):
+		"""Sum of each component under ``parentfield`` across all slips."""
+		width = len(self.components)
+		values = self.amounts.get(parentfield)
+		totals = {}
+		if not width or values is None:
+			return totals
+
+		for component in self.present.get(parentfield, ()):
+			component_idx = self.component_index[component]
+			totals[component] = sum(values[component_idx::width])
+
+		return totals
+
+
+def get_component_names(present, parentfield=None):
+	"""Sorted components of a ``present`` map with a non-zero row, optionally for one parentfield."""
+	parentfields = [parentfield] if parentfield else list(present)
+
+	names = set()
+	for parentfield in parentfields:
+		names.update(component for component, non_zero in present.get(parentfield, {}).items() if non_zero)
+	return sorted(names)
+
+
+def get_slip_fields(fields, apply_exchange_rate=False):
+	"""``name`` followed by the requested fields that exist as Salary Slip columns."""
+	columns = set(frappe.db.get_table_columns("Salary Slip"))
+
+	slip_fields = ["name"]
+	for field in fields:
+		if field in columns and field not in slip_fields:
+			slip_fields.append(field)
+	if apply_exchange_rate and "exchange_rate" not in slip_fields:
+		slip_fields.append("exchange_rate")
+
+	return slip_fields
+
+
+def get_salary_slip_query(
+	filters,
+	fields,
+	default_docstatus=1,
+	period="within",
+	by_posting_date=False,
+	conditions=None,
+	order_by=None,
+	after=None,
+	limit=None,
+):
+	"""Build the Salary Slip query shared by all reports.
+
+	``period`` controls how ``from_date``/``to_date`` apply to the pay period:
+	``"within"`` keeps slips whose period lies inside the range, ``"overlap"``
+	keeps slips whose period touches it. ``by_posting_date`` additionally
+	restricts ``posting_date`` to the range. ``conditions`` are extra criteria
+	appended as-is. ``order_by`` is a field or a tuple of fields; with ``after``
+	(values of those fields) the query continues past that row, which together
+	with ``limit`` pages through the slips by keyset.
+	"""
+	query = frappe.qb.from_(salary_slip).select(*[salary_slip[field] for field in fields])
+
+	if filters.get("docstatus"):
+		query = query.where(salary_slip.docstatus == DOC_STATUS[filters.get("docstatus")])
+	elif default_docstatus is not None:
+		query = query.where(salary_slip.docstatus == default_docstatus)
+
+	from_date = filters.get("from_date")
+	to_date = filters.get("to_date")
+
+	if period == "overlap":
+		if from_date and to_date:
+			query = query.where((salary_slip.start_date <= to_date) & (salary_slip.end_date >= from_date))
+	else:
+		if from_date:
+			query = query.where(salary_slip.start_date >= from_date)
+		if to_date:
+			query = query.where(salary_slip.end_date <= to_date)
+
+	if by_posting_date and from_date and to_date:
+		query = query.where((salary_slip.posting_date >= from_date) & (salary_slip.posting_date <= to_date))
+
+	for field in ("company", "employee", "department", "designation", "branch"):
+		if filters.get(field):
+			query = query.where(salary_slip[field] == filters.get(field))
+
+	for condition in conditions or []:
+		query = query.where(condition)
+
+	order_by = (order_by,) if isinstance(order_by, str) else tuple(order_by or ())
+	if after:
+		query = query.where(get_keyset_condition(order_by, after))
+	for field in order_by:
+		query = query.orderby(salary_slip[field])
+
+	if limit:
+		query = query.limit(limit)
+
+	return query
+
+
+def get_keyset_condition(fields, values):
+	"""Rows sorting after ``values`` on ``fields``: ``(a, b) > (x, y)`` spelt out as OR terms."""
+	condition = None
+	for pos in range(len(fields) - 1, -1, -1):
+		term = salary_slip[fields[pos]] > values[pos]
+		if condition is not None:
+			term = term | ((salary_slip[fields[pos]] == values[pos]) & condition)
+		condition = term
+	return condition
+
+
+def get_salary_slip_facts(
+	filters,
+	fields,
+	parentfields=COMPONENT_TYPES,
+	apply_exchange_rate=False,
+	**query_options,
+):
+	"""Load salary slips and their component amounts for ``filters``.
+
+	``fields`` are the Salary Slip columns the report reads; ``name`` is always
+	selected first and columns missing on this site read back as ``None``. ``parentfields`` lists the Salary Detail tables to load, all
+	in one query. With ``apply_exchange_rate`` every amount is multiplied by the
+	slip's ``exchange_rate`` (company currency view). Remaining keyword arguments
+	are passed to :func:`get_salary_slip_query`.
+	"""
+	fields = get_slip_fields(fields, apply_exchange_rate)
+
+	slips = get_salary_slip_query(filters, fields, **query_options).run() or []
+	record_fetch("Salary Slip", slips)
+
+	components = []
+	amounts = {}
+	present = {}
+	filled = {}
+	facts = SalarySlipFacts(fields, slips, components, amounts, present, filled)
+	if not slips or not parentfields:
+		return facts
+
+	details = get_salary_details(list(facts.slip_index), parentfields)
+
+	component_index = facts.component_index
+	for _parent, parentfield, component, amount in details:
+		if component not in component_index:
+			component_index[component] = len(components)
+			components.append(component)
+		seen = present.setdefault(parentfield, {})
+		seen[component] = seen.get(component) or bool(amount)
+
+	width = len(components)
+	for parentfield in parentfields:
+		amounts[parentfield] = array("d", bytes(8 * width * len(slips)))
+		filled[parentfield] = bytearray(width * len(slips))
+
+	exchange_rate_pos = facts.field_index.get("exchange_rate") if apply_exchange_rate else None
+	for parent, parentfield, component, amount in details:
+		slip_idx = facts.slip_index[parent]
+		amount = flt(amount)
+		if exchange_rate_pos is not None:
+			amount *= flt(slips[slip_idx][exchange_rate_pos] or 1)
+		cell = slip_idx * width + component_index[component]
+		amounts[parentfield][cell] += amount
+		filled[parentfield][cell] = 1
+
+	return facts
+
+
+def get_salary_details(slip_names, parentfields=COMPONENT_TYPES):
+	"""Component rows of the slips, fetched ``DETAIL_CHUNK_SIZE`` slip names per statement.
+
+	The chunks run one after another, not concurrently: ``frappe.db`` is one
+	connection per request and is not thread-safe, so worker threads would have
+	to share it or open connections of their own outside the request.
+	"""
+	details = []
+	for start in range(0, len(slip_names), DETAIL_CHUNK_SIZE):
+		rows = get_salary_detail_query(slip_names[start : start + DETAIL_CHUNK_SIZE], parentfields).run()
+		record_fetch("Salary Detail", rows)
+		details.extend(rows)
+		report_progress(min(start + DETAIL_CHUNK_SIZE, len(slip_names)), len(slip_names))
+	return details
+
+
+def get_salary_detail_query(slip_names, parentfields=COMPONENT_TYPES):
+	"""Component rows of the slips, answered from the covering Salary Detail report index."""
+	return (
+		frappe.qb.from_(salary_detail)
+		.where((salary_detail.parent.isin(slip_names)) & (salary_detail.parentfield.isin(list(parentfields))))
+		.select(
+			salary_detail.parent,
+			salary_detail.parentfield,
+			salary_detail.salary_component,
+			salary_detail.amount,
+		)
+	)
+
+
+def iter_salary_slip_facts(filters, fields, page_size=DEFAULT_PAGE_SIZE, order_by=("name",), **options):
+	"""Yield :class:`SalarySlipFacts` pages of up to ``page_size`` slips in ``order_by`` keyset order.
+
+	Only one page of slips and amounts is held at a time. ``order_by`` fields
+	must be among ``fields`` (``name`` always is); other options are those of
+	:func:`get_salary_slip_facts`.
+	"""
+	after = None
+	while True:
+		facts = get_salary_slip_facts(
+			filters, fields, order_by=order_by, after=after, limit=page_size, **options
+		)
+		if facts:
+			yield facts
+		if len(facts) < page_size:
+			return
+
+		last = facts.slip(len(facts) - 1)
+		after = [last[field] for field in order_by]
+
+
+def get_component_totals(filters, parentfields=COMPONENT_TYPES, apply_exchange_rate=False, **query_options):
+	"""Sum every component over the slips matched by ``filters`` with one ``GROUP BY`` query.
+
+	Returns ``totals`` as ``{parentfield: {component: total}}`` and
+	``present`` as ``{parentfield: {component: has_non_zero_row}}``, the same
+	shapes :class:`SalarySlipFacts` keeps, without loading any slip. Options
+	are those of :func:`get_salary_slip_facts`.
+	"""
+	rows = get_component_totals_query(filters, parentfields, apply_exchange_rate, **query_options).run()
+	record_fetch("Salary Detail Totals", rows)
+
+	totals = {parentfield: {} for parentfield in parentfields}
+	present = {}
+	for parentfield, component, total, largest in rows:
+		totals[parentfield][component] = flt(total)
+		present.setdefault(parentfield, {})[component] = bool(flt(largest))
+
+	return frappe._dict(totals=totals, present=present)
+
+
+def get_component_totals_query(filters, parentfields=COMPONENT_TYPES, apply_exchange_rate=False, **query_options):
+	amount = salary_detail.amount
+	if apply_exchange_rate:
+		amount = amount * Coalesce(NullIf(salary_slip.exchange_rate, 0), 1)
+
+	return (
+		get_salary_slip_query(filters, [], **query_options)
+		.join(salary_detail)
+		.on(salary_detail.parent == salary_slip.name)
+		.where(salary_detail.parentfield.isin(list(parentfields)))
+		.select(
+			salary_detail.parentfield,
+			salary_detail.salary_component,
+			Sum(amount),
+			Max(Abs(salary_detail.amount)),
+		)
+		.groupby(salary_detail.parentfield, salary_detail.salary_component)
+	)
@@ -0,0 +1,172 @@
+"""Batch annual income tax projection.
+
+The Annual Statement projects each employee's salary for the whole financial
+year from one representative month and derives the TDS still to be deducted.
+This module runs that projection for every employee at once on NumPy arrays
+shaped ``(employees, months, heads)``, so the same numbers can be produced for
+the report, for a quarterly TDS review of a whole company or for a what-if run
+with adjusted amounts.
+"""
+
+import numpy as np
+
+# Statement heads, in array order along the last axis
+HEADS = ("basic", "da", "fixall", "ta", "house_rent", "grinsur", "lic", "mpf")
+HEAD_INDEX = {head: pos for pos, head in enumerate(HEADS)}
+
+EARNING_HEADS = ("basic", "da", "fixall", "ta", "house_rent")
+SAVINGS_HEADS = ("grinsur", "lic", "mpf")
+
+# Heads that mark a month as having salary data (FixAll is a constant)
+DATA_HEADS = ("basic", "da", "ta", "house_rent", "grinsur", "lic", "mpf")
+
+MONTHS_IN_YEAR = 12
+FIXED_ALLOWANCE = 40.0
+STANDARD_DEDUCTION = 50000.0
+SECTION_80C_LIMIT = 150000.0
+
+# Row fields produced by TaxProjection.rows(), besides employee and employee_name
+SUMMARY_FIELDS = (
+	"total_basic",
+	"total_da",
+	"total_fixall",
+	"total_ta",
+	"total_house_rent",
+	"total_earnings",
+	"less_std_dedn",
+	"income_sal_head",
+	"total_grinsur",
+	"total_lic",
+	"total_mpf",
+	"total_savings",
+	"qualifying_amt",
+	"taxable_income",
+	"tax_payable",
+	"itax_paid",
+	"bal_to_pay",
+	"new_mly_dedn",
+)
+
+
+def head_sum(values, heads):
+	return values[..., [HEAD_INDEX[head] for head in heads]].sum(axis=-1)
+
+
+def first_true(mask):
+	"""Index of the first ``True`` along the last axis, ``-1`` where there is none."""
+	return np.where(mask.any(axis=-1), mask.argmax(axis=-1), -1)
+
+
+class TaxProjection:
+	"""Result of :func:`project_annual_tax`; every attribute is an array over employees."""
+
+	def __init__(self, monthly, source_month, totals, summary):
+		# (employees, months, heads) amounts after the source month is copied to all months
+		self.monthly = monthly
+		# (employees,) index of the month the year was projected from, -1 if none
+		self.source_month = source_month
+		# {head: (employees,)} annual totals
+		self.totals = totals
+		# {field: (employees,)} for every name in SUMMARY_FIELDS
+		self.summary = summary
+
+	def __len__(self):
+		return len(self.source_month)
+
+	def monthly_totals(self):
+		"""``(employees, months)`` earnings and savings totals of each month."""
+		return head_sum(self.monthly, EARNING_HEADS), head_sum(self.monthly, SAVINGS_HEADS)
+
+	def rows(self, employees):
+		"""One dict of SUMMARY_FIELDS per ``(employee, employee_name)`` in ``employees``."""
+		columns = [self.summary[field].tolist() for field in SUMMARY_FIELDS]
+		return [
+			{
+				"employee": employee,
+				"employee_name": employee_name,
+				**dict(zip(SUMMARY_FIELDS, values, strict=True)),
+			}
+			for (employee, employee_name), *values in zip(employees, *columns, strict=True)
+		]
+
+
+def project_annual_tax(amounts, income_tax, months_passed=None):
+	"""Project annual salary and TDS for a batch of employees.
+
+	``amounts`` is a ``(employees, months, len(HEADS))`` array of monthly head
+	amounts, ``income_tax`` a ``(employees, months)`` array of the income tax
+	deducted each month. ``months_passed[m]`` is the number of financial year
+	months elapsed up to and including month ``m`` (``m + 1`` by default).
+
+	For each employee the projection picks a source month: the first with
+	house rent, else the first with basic, else the first with any amount.
+	That month is copied to all months and annualised; tax payable is twelve
+	times its income tax and the balance is spread over the remaining months.
+	"""
+	amounts = np.asarray(amounts, dtype=float)
+	income_tax = np.asarray(income_tax, dtype=float)
+	employee_count, month_count, _head_count = amounts.shape
+	if months_passed is None:
+		months_passed = np.arange(1, month_count + 1)
+	months_passed = np.asarray(months_passed, dtype=float)
+
+	amounts = amounts.copy()
+	amounts[..., HEAD_INDEX["fixall"]] = FIXED_ALLOWANCE
+
+	source_month = first_true(amounts[..., HEAD_INDEX["house_rent"]] > 0)
+	for mask in (
+		amounts[..., HEAD_INDEX["basic"]] > 0,
+		(amounts[..., [HEAD_INDEX[head] for head in DATA_HEADS]] > 0).any(axis=-1),
+	):
+		source_month = np.where(source_month < 0, first_true(mask), source_month)
+
+	has_source = source_month >= 0
+	employee_index = np.arange(employee_count)
+	source_values = amounts[employee_index, np.maximum(source_month, 0)]
+
+	monthly = np.where(has_source[:, None, None], source_values[:, None, :], amounts)
+	annual = np.where(
+		has_source[:, None],
+		np.round(source_values * MONTHS_IN_YEAR, 2),
+		amounts.sum(axis=1),
+	)
+	totals = {head: annual[:, pos] for pos, head in enumerate(HEADS)}
+
+	total_earnings = head_sum(annual, EARNING_HEADS)
+	less_std_dedn = np.full(employee_count, STANDARD_DEDUCTION)
+	income_sal_head = total_earnings - less_std_dedn
+	total_savings = head_sum(annual, SAVINGS_HEADS)
+	qualifying_amt = np.minimum(total_savings, SECTION_80C_LIMIT)
+	taxable_income = income_sal_head - qualifying_amt
+
+	elapsed = np.where(has_source, months_passed[np.maximum(source_month, 0)], MONTHS_IN_YEAR)
+	current_month_tax = np.where(has_source, income_tax[employee_index, np.maximum(source_month, 0)], 0.0)
+
+	tax_payable = np.round(current_month_tax * MONTHS_IN_YEAR, 2)
+	itax_paid = np.round(elapsed * current_month_tax, 2)
+	bal_to_pay = np.round(tax_payable - itax_paid, 2)
+	remaining_months = np.maximum(1, MONTHS_IN_YEAR - elapsed)
+	new_mly_dedn = np.round(bal_to_pay / remaining_months, 2)
+
+	summary = {
+		"total_basic": totals["basic"],
+		"total_da": totals["da"],
+		"total_fixall": totals["fixall"],
+		"total_ta": totals["ta"],
+		"total_house_rent": totals["house_rent"],
+		"total_earnings": total_earnings,
+		"less_std_dedn": less_std_dedn,
+		"income_sal_head": income_sal_head,
+		"total_grinsur": totals["grinsur"],
+		"total_lic": totals["lic"],
+		"total_mpf": totals["mpf"],
+		"total_savings": total_savings,
+		"qualifying_amt": qualifying_amt,
+		"taxable_income": taxable_income,
+		"tax_payable": tax_payable,
+		"itax_paid": itax_paid,
+		"bal_to_pay": bal_to_pay,
+		"new_mly_dedn": new_mly_dedn,
+	}
+
+	return TaxProjection(monthly, source_month, totals, summary)
@@ -0,0 +1,50 @@
+# Copyright (c) 2026, Samuael Ketema and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from gvm_payroll.gvm_payroll.utils.component_resolver import (
+	CASE_INSENSITIVE,
+	EXACT,
+	PARTIAL,
+	PREFIX,
+	get_alias_rank,
+	match_component_roles,
+	resolve_component_roles,
+)
+
+
+class TestComponentResolver(FrappeTestCase):
+	def test_alias_rank(self):
+		aliases = ["Basic Salary", "Basic"]
+
+		self.assertEqual(get_alias_rank("Basic Salary", aliases), (0, EXACT))
+		self.assertEqual(get_alias_rank("basic salary", aliases), (0, CASE_INSENSITIVE))
+		self.assertEqual(get_alias_rank("Basic Salary Arrear", aliases), (0, PARTIAL))
+		self.assertEqual(get_alias_rank("Basic", aliases), (0, PARTIAL))
+		self.assertEqual(get_alias_rank("DA Arrear", ["DA"], prefixes=["da "]), (1, PREFIX))
+		self.assertIsNone(get_alias_rank("Overtime", aliases))
+
+	def test_short_aliases_match_whole_names_only(self):
+		self.assertEqual(match_component_roles("DA").get("da"), (2, EXACT))
+		self.assertNotIn("da", match_component_roles("Holiday Pay"))
+		self.assertNotIn("ta", match_component_roles("Total Allowance"))
+		self.assertNotIn("lic", match_component_roles("Public Holiday"))
+
+	def test_excluded_words(self):
+		self.assertIn("house_rent", match_component_roles("House Rent"))
+		self.assertNotIn("house_rent", match_component_roles("House Rent Allowance"))
+
+	def test_resolve_prefers_earlier_alias(self):
+		components = ["Basic", "Basic Salary", "Dearness", "DA Arrear", "Water Charges"]
+
+		self.assertEqual(
+			resolve_component_roles(components, ["basic", "da", "water"]),
+			{"basic": "Basic Salary", "da": "Dearness", "water": "Water Charges"},
+		)
+
+	def test_resolve_breaks_ties_by_name(self):
+		self.assertEqual(
+			resolve_component_roles(["Parking Fee", "Parking Bay"], ["parking"]),
+			{"parking": "Parking Bay"},
+		)
@@ -0,0 +1,81 @@
+# Copyright (c) 2026, Samuael Ketema and Contributors
+# See license.txt
+
+import numpy as np
+from frappe.tests.utils import FrappeTestCase
+
+from gvm_payroll.gvm_payroll.utils.tax_projection import (
+	FIXED_ALLOWANCE,
+	HEAD_INDEX,
+	HEADS,
+	SECTION_80C_LIMIT,
+	STANDARD_DEDUCTION,
+	project_annual_tax,
+)
+
+MONTHS = 12
+
+
+def make_amounts(employees, months=MONTHS):
+	return np.zeros((employees, months, len(HEADS)))
+
+
+class TestTaxProjection(FrappeTestCase):
+	def test_source_month_preference(self):
+		amounts = make_amounts(3)
+		# House rent wins over an earlier month with basic
+		amounts[0, 1, HEAD_INDEX["basic"]] = 1000
+		amounts[0, 3, HEAD_INDEX["house_rent"]] = 200
+		# Basic wins over an earlier month with only savings
+		amounts[1, 0, HEAD_INDEX["lic"]] = 50
+		amounts[1, 2, HEAD_INDEX["basic"]] = 1000
+		# Nothing but savings: the first month with any amount
+		amounts[2, 5, HEAD_INDEX["lic"]] = 50
+
+		projection = project_annual_tax(amounts, np.zeros((3, MONTHS)))
+
+		self.assertEqual(projection.source_month.tolist(), [3, 2, 5])
+
+	def test_annual_totals_and_tax(self):
+		amounts = make_amounts(1)
+		amounts[0, 2:, HEAD_INDEX["basic"]] = 30000
+		amounts[0, 2:, HEAD_INDEX["da"]] = 10000
+		amounts[0, 2:, HEAD_INDEX["lic"]] = 15000
+		income_tax = np.zeros((1, MONTHS))
+		income_tax[0, 2:] = 2000
+
+		summary = project_annual_tax(amounts, income_tax).summary
+
+		self.assertEqual(summary["total_basic"][0], 360000)
+		self.assertEqual(summary["total_fixall"][0], FIXED_ALLOWANCE * MONTHS)
+		total_earnings = 360000 + 120000 + FIXED_ALLOWANCE * MONTHS
+		self.assertEqual(summary["total_earnings"][0], total_earnings)
+		# Savings are capped at the 80C limit
+		self.assertEqual(summary["total_savings"][0], 180000)
+		self.assertEqual(summary["qualifying_amt"][0], SECTION_80C_LIMIT)
+		self.assertEqual(
+			summary["taxable_income"][0], total_earnings - STANDARD_DEDUCTION - SECTION_80C_LIMIT
+		)
+
+		# Projected from the third month: three months paid, nine left
+		self.assertEqual(summary["tax_payable"][0], 24000)
+		self.assertEqual(summary["itax_paid"][0], 6000)
+		self.assertEqual(summary["bal_to_pay"][0], 18000)
+		self.assertEqual(summary["new_mly_dedn"][0], 2000)
+
+	def test_employee_without_salary(self):
+		projection = project_annual_tax(make_amounts(1), np.zeros((1, MONTHS)))
+
+		self.assertEqual(projection.source_month.tolist(), [-1])
+		self.assertEqual(projection.summary["total_basic"][0], 0)
+		self.assertEqual(projection.summary["tax_payable"][0], 0)
+		self.assertEqual(projection.summary["new_mly_dedn"][0], 0)
+
+	def test_rows(self):
+		amounts = make_amounts(2)
+		amounts[:, 0, HEAD_INDEX["basic"]] = [1000, 2000]
+
+		rows = project_annual_tax(amounts, np.zeros((2, MONTHS))).rows([("EMP-1", "One"), ("EMP-2", "Two")])
+
+		self.assertEqual([row["employee"] for row in rows], ["EMP-1", "EMP-2"])
+		self.assertEqual([row["total_basic"] for row in rows], [12000, 24000])
@@ -26,7 +26,7 @@ app_license = "mit"
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/gvm_payroll/css/gvm_payroll.css"
-# app_include_js = "/assets/gvm_payroll/js/gvm_payroll.js"
+app_include_js = "/assets/gvm_payroll/js/gvm_payroll.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/gvm_payroll/css/gvm_payroll.css"
@@ -145,6 +145,51 @@ app_license = "mit"
 # 	}
 # }
 
+doc_events = {
+	"Salary Component": {
+		"on_update": [
+			"gvm_payroll.gvm_payroll.utils.component_resolver.clear_component_cache",
+			"gvm_payroll.gvm_payroll.utils.report_cache.clear_report_cache",
+		],
+		"on_trash": [
+			"gvm_payroll.gvm_payroll.utils.component_resolver.clear_component_cache",
+			"gvm_payroll.gvm_payroll.utils.report_cache.clear_report_cache",
+		],
+		"after_rename": [
+			"gvm_payroll.gvm_payroll.utils.component_resolver.clear_component_cache",
+			"gvm_payroll.gvm_payroll.doctype.payroll_component_role.payroll_component_role.bump_component_role_version",
+			"gvm_payroll.gvm_payroll.utils.report_cache.clear_report_cache",
+		],
+	},
+	"Designation": {
+		"on_update": "gvm_payroll.gvm_payroll.utils.pay_matrix_index.on_designation_update",
+		"on_trash": "gvm_payroll.gvm_payroll.utils.pay_matrix_index.on_designation_update",
+		"after_rename": "gvm_payroll.gvm_payroll.utils.pay_matrix_index.on_designation_update",
+	},
+	"Salary Slip": {
+		"on_update": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		"on_submit": [
+			"gvm_payroll.gvm_payroll.utils.payroll_ledger.on_salary_slip_submit",
+			"gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		],
+		"on_cancel": [
+			"gvm_payroll.gvm_payroll.utils.payroll_ledger.on_salary_slip_cancel",
+			"gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		],
+		"on_trash": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+	},
+	"Additional Salary": {
+		"on_update": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		"on_submit": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		"on_cancel": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		"on_trash": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+	},
+	"Payroll Component Role": {
+		"on_update": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+		"on_trash": "gvm_payroll.gvm_payroll.utils.report_cache.on_payroll_data_change",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -247,6 +292,14 @@ app_license = "mit"
 # List of apps whose translatable strings should be excluded from this app's translations.
 # ignore_translatable_strings_from = []
 
+# Payroll Reports
+# ---------------
+# Called as fn(report_name, stats) with the rows and bytes a report run fetched
+# gvm_payroll_report_fetch_stats = ["myapp.monitoring.record_report_fetch"]
+
+# Bank payment file layout per Salary Slip bank_name: a built-in layout name or a dotted path
+# gvm_payroll_bank_payment_layouts = {"State Bank of India": "Fixed Width"}
+
 fixtures = [
     {
         "dt": "Custom Field",
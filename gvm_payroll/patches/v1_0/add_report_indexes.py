@@ -0,0 +1,6 @@
+from gvm_payroll.gvm_payroll.utils.report_indexes import add_report_indexes
+
+
+def execute():
+	"""Add the composite Salary Slip and Salary Detail indexes used by the payroll reports"""
+	add_report_indexes()
@@ -0,0 +1,6 @@
+from gvm_payroll.gvm_payroll.utils.payroll_ledger import rebuild_payroll_ledger
+
+
+def execute():
+	"""Post every submitted Salary Slip to the new Payroll Monthly Ledger"""
+	rebuild_payroll_ledger()
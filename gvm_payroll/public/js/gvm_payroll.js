@@ -0,0 +1,65 @@
+// Copyright (c) 2026, Samuael Ketema and contributors
+// For license information, please see license.txt
+
+// Helpers shared by the gvm_payroll query reports, loaded on every desk page through app_include_js
+
+frappe.provide("gvm_payroll.reports");
+
+$.extend(gvm_payroll.reports, {
+	// Streams every row into the file on the server instead of exporting the loaded grid
+	add_export_buttons(report, report_name) {
+		for (const file_format of ["CSV", "Excel"]) {
+			report.page.add_inner_button(
+				__(file_format),
+				() => gvm_payroll.reports.export_report(report, report_name, file_format),
+				__("Export")
+			);
+		}
+	},
+
+	// Runs over many slips are prepared in the background (utils/prepared_report.py). One listener,
+	// registered by the first report that needs it, follows them and reloads the report when it is open.
+	follow_prepared_reports() {
+		if (gvm_payroll.reports.following_prepared_reports) return;
+		gvm_payroll.reports.following_prepared_reports = true;
+
+		frappe.realtime.on("gvm_payroll_prepared_report", (data) => {
+			const [view, report_name] = frappe.get_route();
+			if (view !== "query-report" || report_name !== data?.report_name) return;
+			gvm_payroll.reports.show_prepared_report_progress(frappe.query_report, data);
+		});
+	},
+
+	show_prepared_report_progress(report, data) {
+		if (["Completed", "Failed"].includes(data.status)) {
+			frappe.hide_progress();
+			if (data.status === "Failed") {
+				frappe.msgprint({
+					title: __("Error"),
+					message: data.error || __("Could not prepare the report"),
+					indicator: "red",
+				});
+				return;
+			}
+			report.refresh();
+			return;
+		}
+
+		frappe.show_progress(
+			__("Preparing {0}", [__(data.report_name)]),
+			data.done || 0,
+			data.total || 1,
+			__("Loading salary slips")
+		);
+	},
+
+	export_report(report, report_name, file_format) {
+		const filters = report.get_values();
+		if (!filters) return;
+		open_url_post("/api/method/gvm_payroll.gvm_payroll.api.report_export.export_report", {
+			report_name,
+			filters: JSON.stringify(filters),
+			file_format,
+		});
+	},
+});